@@ -0,0 +1,234 @@
+import os
+import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, cast, func
+from sqlmodel import Session, select
+
+from . import data_version, stats
+from .models import Transaction
+from .rollup import UNKNOWN_CATEGORY
+
+ANALYTICS_MEMORY_BYTES = int(os.environ.get("ANALYTICS_MEMORY_BYTES", str(128 * 1024 * 1024)))
+LOAD_RETRIES = 3
+# so viele Änderungen werden höchstens angehängt; danach wird der Snapshot verworfen und beim nächsten Lesen neu geladen
+MAX_PENDING_CHANGES = int(os.environ.get("ANALYTICS_MAX_PENDING_CHANGES", "1024"))
+PENDING_CHANGE_BYTES = 128
+LOCK_STRIPES = 64
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+UNIX_JULIAN_DAY = 2440587.5
+
+
+def day_number(d: date) -> int:
+    return d.toordinal() - EPOCH_ORDINAL
+
+
+# (id, None) für gelöschte, (id, (Tag, Betrag, Kategorie)) für angelegte oder geänderte Zeilen
+Change = Tuple[int, Optional[Tuple[int, float, Optional[str]]]]
+
+
+class ColumnarSnapshot:
+    """Transaktionen eines Nutzers als Spalten, sortiert nach id; Änderungen seit dem Laden liegen in `pending`."""
+
+    def __init__(self, version: int, ids: np.ndarray, days: np.ndarray, amounts: np.ndarray, codes: np.ndarray, categories: List[str],
+                 pending: Tuple[Change, ...] = ()):
+        self.version = version
+        self.ids = ids
+        self.days = days
+        self.amounts = amounts
+        self.codes = codes
+        self.categories = categories
+        self.pending = pending
+        self._groups: Optional[List[Tuple[str, str, float]]] = None
+
+    @classmethod
+    def from_rows(cls, version: int, rows: List[tuple]) -> "ColumnarSnapshot":
+        n = len(rows)
+        codes_by_name: Dict[str, int] = {}
+        codes = np.fromiter((codes_by_name.setdefault(r[3] or UNKNOWN_CATEGORY, len(codes_by_name)) for r in rows), dtype=np.int32, count=n)
+        return cls(
+            version,
+            np.fromiter((r[0] for r in rows), dtype=np.int64, count=n),
+            np.fromiter((r[1] for r in rows), dtype=np.int32, count=n),
+            np.fromiter((r[2] for r in rows), dtype=np.float64, count=n),
+            codes,
+            list(codes_by_name),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        arrays = self.ids.nbytes + self.days.nbytes + self.amounts.nbytes + self.codes.nbytes
+        return arrays + sum(sys.getsizeof(c) for c in self.categories) + len(self.pending) * PENDING_CHANGE_BYTES
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def with_changes(self, version: int, changes: Iterable[Change]) -> "ColumnarSnapshot":
+        """Neue Version mit denselben Spalten; die Änderungen werden nur angehängt, nichts wird kopiert."""
+        return ColumnarSnapshot(version, self.ids, self.days, self.amounts, self.codes, self.categories, self.pending + tuple(changes))
+
+    def compacted(self) -> "ColumnarSnapshot":
+        """Spalten einmal neu aufbauen, mit allen angehängten Änderungen; der letzte Stand je id gilt."""
+        if not self.pending:
+            return self
+        final = dict(self.pending)
+        keep = ~np.isin(self.ids, np.fromiter(final, dtype=np.int64, count=len(final)))
+        rows = [(i, row) for i, row in final.items() if row is not None]
+        codes_by_name = {name: i for i, name in enumerate(self.categories)}
+        n = len(rows)
+        added_codes = np.fromiter((codes_by_name.setdefault(r[2] or UNKNOWN_CATEGORY, len(codes_by_name)) for _, r in rows), dtype=np.int32, count=n)
+        ids = np.concatenate([self.ids[keep], np.fromiter((i for i, _ in rows), dtype=np.int64, count=n)])
+        order = np.argsort(ids, kind="stable")
+        return ColumnarSnapshot(
+            self.version,
+            ids[order],
+            np.concatenate([self.days[keep], np.fromiter((r[0] for _, r in rows), dtype=np.int32, count=n)])[order],
+            np.concatenate([self.amounts[keep], np.fromiter((r[1] for _, r in rows), dtype=np.float64, count=n)])[order],
+            np.concatenate([self.codes[keep], added_codes])[order],
+            list(codes_by_name),
+        )
+
+    def groups(self) -> List[Tuple[str, str, float]]:
+        """(Monat, Kategorie, Summe) sortiert wie in SQL; einmal je Snapshot berechnet."""
+        if self.pending:
+            raise ValueError("Snapshot vor dem Gruppieren kompaktieren")
+        if self._groups is not None:
+            return self._groups
+        if not len(self.days):
+            self._groups = []
+            return self._groups
+        months = self.days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        # dichtes Raster Monat × Kategorie statt Sortierung: O(n) per bincount
+        first = int(months.min())
+        width = len(self.categories)
+        keys = (months - first) * width + self.codes
+        counts = np.bincount(keys)
+        sums = np.bincount(keys, weights=self.amounts, minlength=len(counts))
+        present = np.flatnonzero(counts)
+        labels = np.datetime_as_string((present // width + first).astype("datetime64[M]"), unit="M").tolist()
+        self._groups = sorted(zip(labels, (self.categories[c] for c in (present % width).tolist()), sums[present].tolist()))
+        return self._groups
+
+    def monthly_category(self, year: Optional[int] = None) -> List[dict]:
+        groups = self.groups()
+        if year:
+            lo, hi = bisect_left(groups, (f"{year:04d}-01",)), bisect_left(groups, (f"{year + 1:04d}-01",))
+            groups = groups[lo:hi]
+        return [{"month": m, "category": c, "sum": round(s, 2)} for m, c, s in groups]
+
+
+def snapshot_statement(user_id: int):
+    day = cast(func.julianday(Transaction.date) - UNIX_JULIAN_DAY, Integer)
+    return select(Transaction.id, day, Transaction.amount, Transaction.category).where(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.id)
+
+
+def load_snapshot(session: Session, user_id: int) -> ColumnarSnapshot:
+    # Version vor und nach dem Lesen vergleichen: nur dann passen Zeilen und Version sicher zusammen
+    for _ in range(LOAD_RETRIES):
+        version = data_version.current(session, user_id)
+        rows = session.execute(snapshot_statement(user_id)).all()
+        if data_version.current(session, user_id) == version:
+            break
+    else:
+        version = -1
+    return ColumnarSnapshot.from_rows(version, rows)
+
+
+class SnapshotStore:
+    def __init__(self, max_bytes: int = ANALYTICS_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[int, ColumnarSnapshot]" = OrderedDict()
+        # der globale Lock schützt nur das Verzeichnis; Laden und Kompaktieren laufen unter dem Lock des Nutzers
+        self._lock = threading.Lock()
+        self._user_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.hits = 0
+        self.loads = 0
+        self.deltas = 0
+        self.compactions = 0
+        self.evictions = 0
+
+    def _user_lock(self, user_id: int) -> threading.Lock:
+        return self._user_locks[user_id % LOCK_STRIPES]
+
+    def get(self, session: Session, user_id: int, version: int) -> ColumnarSnapshot:
+        with self._lock:
+            snapshot = self._data.get(user_id)
+            if snapshot is not None and snapshot.version == version and not snapshot.pending:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return snapshot
+        with self._user_lock(user_id):
+            with self._lock:
+                snapshot = self._data.get(user_id)
+            if snapshot is not None and snapshot.version == version:
+                if not snapshot.pending:
+                    with self._lock:
+                        self.hits += 1
+                    return snapshot
+                compacted = snapshot.compacted()
+                with self._lock:
+                    self.compactions += 1
+                    # inzwischen angehängte Deltas nicht überschreiben; dann bleibt der Eintrag für den nächsten Leser
+                    if self._data.get(user_id) is snapshot:
+                        self._store(user_id, compacted)
+                return compacted
+            snapshot = load_snapshot(session, user_id)
+            with self._lock:
+                self.loads += 1
+                self._store(user_id, snapshot)
+            return snapshot
+
+    def _store(self, user_id: int, snapshot: ColumnarSnapshot):
+        self._data.pop(user_id, None)
+        if snapshot.version < 0 or snapshot.nbytes > self.max_bytes:
+            return
+        self._data[user_id] = snapshot
+        while sum(s.nbytes for s in self._data.values()) > self.max_bytes:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def apply(self, user_id: int, version: int, upserts: Iterable[Transaction] = (), deleted_ids: Iterable[int] = ()):
+        """Delta nach dem Commit anhängen, ohne die Spalten zu kopieren; passt die Version nicht lückenlos, wird neu geladen."""
+        changes: List[Change] = [(transaction_id, None) for transaction_id in deleted_ids]
+        changes += [(t.id, (day_number(t.date), t.amount, t.category)) for t in upserts]
+        with self._lock:
+            snapshot = self._data.get(user_id)
+            if snapshot is None:
+                return
+            if snapshot.version != version - 1 or len(snapshot.pending) + len(changes) > MAX_PENDING_CHANGES:
+                del self._data[user_id]
+                return
+            self.deltas += 1
+            self._data[user_id] = snapshot.with_changes(version, changes)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"users": len(self._data), "rows": sum(len(s) for s in self._data.values()),
+                    "bytes": sum(s.nbytes for s in self._data.values()), "max_bytes": self.max_bytes,
+                    "hits": self.hits, "loads": self.loads, "deltas": self.deltas, "compactions": self.compactions,
+                    "evictions": self.evictions}
+
+
+snapshots = SnapshotStore()
+
+
+def monthly_category_stats(session: Session, user_id: int, year: Optional[int] = None, version: Optional[int] = None) -> dict:
+    if snapshots.max_bytes <= 0:
+        return stats.monthly_category_stats(session, user_id, year)
+    version = data_version.current(session, user_id) if version is None else version
+    return stats.with_totals(snapshots.get(session, user_id, version).monthly_category(year))
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from app.db import get_session
-from app.models_user import User
-from passlib.context import CryptContext
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .db import get_async_read_session, get_async_session
+from .models_user import User
+from .principal_cache import principal_cache
+from .passwords import password_hasher
 from pydantic import BaseModel
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
@@ -14,7 +16,6 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
 class UserCreate(BaseModel):
@@ -26,10 +27,10 @@ class Token(BaseModel):
     token_type: str
 
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return password_hasher.verify(plain, hashed)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 from typing import Optional
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -39,28 +40,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 @router.post("/register", response_model=Token)
-def register(user: UserCreate, session: Session = Depends(get_session)):
-    db_user = session.exec(select(User).where(User.username == user.username)).first()
+async def register(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    db_user = (await session.exec(select(User).where(User.username == user.username))).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Username bereits vergeben")
-    hashed = get_password_hash(user.password)
+    hashed = await password_hasher.hash_async(user.password)
     new_user = User(username=user.username, hashed_password=hashed)
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
     token = create_access_token({"sub": new_user.username})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/token", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_async_session)):
+    user = (await session.exec(select(User).where(User.username == form_data.username))).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Falscher Benutzername oder Passwort")
+    valid, new_hash = await password_hasher.verify_and_update_async(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Falscher Benutzername oder Passwort")
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+        principal_cache.invalidate(user.username)
     token = create_access_token({"sub": user.username})
     return {"access_token": token, "token_type": "bearer"}
 
-@router.get("/me")
-def get_me(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
@@ -68,7 +75,23 @@ def get_me(token: str = Depends(oauth2_scheme), session: Session = Depends(get_s
             raise HTTPException(status_code=401, detail="Token ungültig")
     except JWTError:
         raise HTTPException(status_code=401, detail="Token ungültig")
-    user = session.exec(select(User).where(User.username == username)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User nicht gefunden")
+    return payload
+
+async def resolve_principal(token: str, session: AsyncSession) -> User:
+    user = principal_cache.user_for_token(token)
+    if user is not None:
+        return user
+    payload = decode_token(token)
+    username = payload["sub"]
+    user = principal_cache.user_for_username(username)
+    if user is None:
+        user = (await session.exec(select(User).where(User.username == username))).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User nicht gefunden")
+    principal_cache.remember(user, token, payload.get("exp"))
+    return user
+
+@router.get("/me")
+async def get_me(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_read_session)):
+    user = await resolve_principal(token, session)
     return {"username": user.username, "is_active": user.is_active, "is_admin": getattr(user, "is_admin", False)}
@@ -0,0 +1,107 @@
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import Float, case, cast, func, literal
+from sqlmodel import Session, select
+
+from .models import Transaction
+
+MIN_POINTS = 3
+
+
+def period_expression(resolution: str, day):
+    if resolution == "week":
+        # Montag der ISO-Woche
+        return func.date(day, "weekday 0", "-6 days")
+    if resolution == "month":
+        return func.strftime("%Y-%m-01", day)
+    return day
+
+
+def flows_statement(user_id: int, resolution: str, from_date: Optional[date] = None, to_date: Optional[date] = None, opening: float = 0.0):
+    t = Transaction
+    conditions = [t.user_id == user_id]
+    if from_date:
+        conditions.append(t.date >= from_date)
+    if to_date:
+        conditions.append(t.date <= to_date)
+    # Tagessummen entlang des Index (user_id, date, …) ohne Sortierung; Woche/Monat gruppieren danach nur noch Tage
+    days = (
+        select(
+            t.date.label("day"),
+            func.total(case((t.amount > 0, t.amount), else_=0.0)).label("income"),
+            func.total(case((t.amount < 0, t.amount), else_=0.0)).label("expense"),
+            func.total(t.amount).label("net"),
+        )
+        .where(*conditions)
+        .group_by(t.date)
+    )
+    if resolution == "day":
+        running = func.sum(func.total(t.amount)).over(order_by=t.date, rows=(None, 0))
+        # die Reihenfolge der Fensterfunktion legt die Ergebnisreihenfolge nicht fest; LTTB braucht sortierte Punkte
+        return days.add_columns((cast(literal(opening), Float) + running).label("balance")).order_by(t.date)
+    days = days.subquery()
+    period = period_expression(resolution, days.c.day)
+    net = func.total(days.c.net)
+    running = func.sum(net).over(order_by=period, rows=(None, 0))
+    return select(
+        period.label("period"), func.total(days.c.income), func.total(days.c.expense), net,
+        (cast(literal(opening), Float) + running).label("balance"),
+    ).group_by(period).order_by(period)
+
+
+def opening_balance_statement(user_id: int, before: date):
+    return select(func.total(Transaction.amount)).where(Transaction.user_id == user_id, Transaction.date < before)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: Indizes der beibehaltenen Punkte (erster und letzter immer dabei)."""
+    n = len(x)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(points: List[dict], max_points: int) -> List[dict]:
+    if len(points) <= max_points:
+        return points
+    x = np.array([date.fromisoformat(p["period"]).toordinal() for p in points], dtype=np.float64)
+    y = np.array([p["balance"] for p in points], dtype=np.float64)
+    keep = lttb(x, y, max_points)
+    # Flüsse zwischen zwei behaltenen Punkten werden auf den späteren aufsummiert, damit die Summen erhalten bleiben
+    cumulative = {k: np.concatenate(([0.0], np.cumsum([p[k] for p in points]))) for k in ("income", "expense", "net")}
+    previous = -1
+    result = []
+    for i in keep.tolist():
+        flows = {k: round(float(c[i + 1] - c[previous + 1]), 2) for k, c in cumulative.items()}
+        result.append({"period": points[i]["period"], **flows, "balance": points[i]["balance"]})
+        previous = i
+    return result
+
+
+def balance_series(session: Session, user_id: int, resolution: str = "day", from_date: Optional[date] = None,
+                   to_date: Optional[date] = None, max_points: Optional[int] = None) -> dict:
+    opening = session.execute(opening_balance_statement(user_id, from_date)).scalar() if from_date else 0.0
+    rows = session.execute(flows_statement(user_id, resolution, from_date, to_date, opening)).all()
+    points = [
+        {"period": str(period), "income": round(income, 2), "expense": round(expense, 2), "net": round(net, 2), "balance": round(balance, 2)}
+        for period, income, expense, net, balance in rows
+    ]
+    result = {"resolution": resolution, "opening_balance": round(opening, 2), "total_points": len(points)}
+    if max_points is not None:
+        points = downsample(points, max_points)
+    result["points"] = points
+    return result
@@ -0,0 +1,391 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Die App-Module werden erst im Worker-Prozess importiert: DATABASE_URL muss gesetzt sein, bevor app.db die Engines baut.
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SIZES = ["10k", "100k", "1m"]
+DEFAULT_DATA_DIR = "bench_data"
+BENCH_USER = "bench00001"
+BENCH_PASSWORD = "bench123"
+BENCH_YEARS = 5
+IMPORT_ROWS = 1000
+IMPORT_CATEGORY = "Benchmark"
+DEFAULT_THRESHOLD = 0.25
+MIN_REGRESSION_MS = 1.0
+ITERATIONS = {"list": 50, "search": 50, "stats": 50, "export": 3, "import": 5, "dedup": 5, "login": 10}
+MODES = ("testclient", "uvicorn")
+SERIALIZATION_SIZE = "100k"
+BENCH_ENV = {"RESPONSE_CACHE_BYTES": "0"}
+SERIALIZATION_ITERATIONS = 5
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(size[-1:], 1)
+    return int(float(size[:-1] if factor > 1 else size) * factor)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "rps": round(len(values) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def import_csv_payload(iteration: int) -> bytes:
+    lines = ["date,amount,description,category"]
+    lines += [f"2020-{1 + j % 12:02d}-{1 + j % 28:02d},-{1 + j % 97}.{j % 100:02d},Bench-Import {iteration}-{j},{IMPORT_CATEGORY}"
+              for j in range(IMPORT_ROWS)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def scenarios(client, headers: Dict[str, str]) -> Dict[str, Callable[[int], object]]:
+    return {
+        "list": lambda i: client.get("/api/transactions", params={"limit": 100}, headers=headers),
+        "search": lambda i: client.get("/api/transactions/search", params={"q": "rewe", "limit": 50}, headers=headers),
+        "stats": lambda i: client.get("/api/stats/monthly-category", headers=headers),
+        "export": lambda i: client.get("/api/transactions/export", headers=headers),
+        "import": lambda i: client.post("/api/transactions/import", headers=headers,
+                                        files={"file": ("bench.csv", import_csv_payload(i), "text/csv")}),
+        "dedup": lambda i: client.delete("/api/transactions/duplicates", params={"dry_run": True}, headers=headers),
+        "login": lambda i: client.post("/api/auth/token", data={"username": BENCH_USER, "password": BENCH_PASSWORD}),
+    }
+
+
+def login_headers(client) -> Dict[str, str]:
+    r = client.post("/api/auth/token", data={"username": BENCH_USER, "password": BENCH_PASSWORD})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def run_scenarios(client, repeat: float = 1.0, only: Optional[List[str]] = None) -> Dict[str, dict]:
+    from .response_cache import response_cache
+
+    headers = login_headers(client)
+    results = {}
+    # ohne Antwort-Cache: sonst misst jede Wiederholung derselben URL nur einen LRU-Treffer (für uvicorn siehe BENCH_ENV)
+    max_bytes, response_cache.max_bytes = response_cache.max_bytes, 0
+    try:
+        for name, call in scenarios(client, headers).items():
+            if only and name not in only:
+                continue
+            iterations = max(1, int(ITERATIONS[name] * repeat))
+            call(-1).raise_for_status()
+            latencies = []
+            started = time.perf_counter()
+            for i in range(iterations):
+                t = time.perf_counter()
+                response = call(i)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - t)
+            results[name] = summarize(latencies, time.perf_counter() - started)
+    finally:
+        response_cache.max_bytes = max_bytes
+    return results
+
+
+def prepare_dataset(rows: int) -> dict:
+    from sqlmodel import Session, select
+    from .db import engine, init_db
+    from .generator import generate
+    from .migrations import migrate
+    from .models import Transaction
+    from .models_user import User
+    from sqlalchemy import func
+
+    init_db()
+    migrate()
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == BENCH_USER)).first()
+        if user is not None:
+            count = session.exec(select(func.count()).select_from(Transaction).where(Transaction.user_id == user.id)).one()
+            return {"rows": count, "generated": False}
+    result = generate(users=1, years=BENCH_YEARS, prefix="bench", password=BENCH_PASSWORD, rows_per_user=rows)
+    return {"rows": result["rows"], "generated": True, "generator_rows_per_sec": result["rows_per_sec"]}
+
+
+def remove_imported_rows() -> int:
+    # Importszenario wieder zurückrollen, damit jeder Lauf auf demselben Datenbestand misst; wie ein Bulk-Delete
+    # mit Rollup-Deltas und Versionssprung, damit ETags, Antwort-Cache und Snapshots eines laufenden Servers nichts Gelöschtes liefern
+    from sqlmodel import Session, select
+    from .bulk import BulkDelete, BulkFilter, delete_many
+    from .db import engine
+    from .models_user import User
+
+    with Session(engine) as session:
+        user_id = session.exec(select(User.id).where(User.username == BENCH_USER)).one()
+        deleted = delete_many(session, user_id, BulkDelete(filter=BulkFilter(category=IMPORT_CATEGORY)))["deleted"]
+        session.commit()
+    return deleted
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_uvicorn(repeat: float, only: Optional[List[str]]) -> Dict[str, dict]:
+    import httpx
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **BENCH_ENV},
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=300) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    if client.get("/api/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn ist nicht gestartet")
+                time.sleep(0.1)
+            return run_scenarios(client, repeat, only)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def worker(size: str, modes: List[str], repeat: float, only: Optional[List[str]]) -> dict:
+    from fastapi.testclient import TestClient
+    from .main import app
+
+    result = {"dataset": prepare_dataset(parse_size(size))}
+    if "testclient" in modes:
+        with TestClient(app) as client:
+            result["testclient"] = run_scenarios(client, repeat, only)
+        remove_imported_rows()
+    if "uvicorn" in modes:
+        result["uvicorn"] = run_uvicorn(repeat, only)
+        remove_imported_rows()
+    return result
+
+
+def serialization_paths(user_id: int) -> Dict[str, Callable[[], int]]:
+    """Komplette Liste eines Nutzers: bisheriger ORM-Pfad, Tupel + orjson und NDJSON-Stream; liefert die Antwortgröße."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from sqlmodel import Session
+    from .db import read_engine
+    from .listing import iter_ndjson, list_rows, list_statement
+    from .response_cache import render_json
+
+    def orm() -> int:
+        with Session(read_engine) as session:
+            rows = session.exec(list_statement(user_id, [])).all()
+            return len(JSONResponse(jsonable_encoder(rows)).body)
+
+    def fast() -> int:
+        with Session(read_engine) as session:
+            return len(render_json(list_rows(session, user_id, [])))
+
+    def ndjson() -> int:
+        return sum(len(chunk) for chunk in iter_ndjson(user_id, []))
+
+    return {"orm": orm, "fast": fast, "ndjson": ndjson}
+
+
+def measure_serialization(paths: Dict[str, Callable[[], int]], iterations: int) -> Dict[str, dict]:
+    results = {}
+    for name, fn in paths.items():
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            size = fn()
+            latencies.append(time.perf_counter() - started)
+        # Spitzenspeicher in einem eigenen Lauf, tracemalloc verfälscht sonst die Latenz
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {**summarize(latencies, sum(latencies)), "bytes": size, "peak_mb": round(peak / 2**20, 1)}
+    return results
+
+
+def serialization_worker(size: str, iterations: int) -> dict:
+    from sqlmodel import Session, select
+    from .db import engine
+    from .models_user import User
+
+    dataset = prepare_dataset(parse_size(size))
+    with Session(engine) as session:
+        user_id = session.exec(select(User.id).where(User.username == BENCH_USER)).one()
+    return {"dataset": dataset, "results": measure_serialization(serialization_paths(user_id), iterations)}
+
+
+def run_serialization(size: str, data_dir: str, iterations: int) -> dict:
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    db_path = Path(data_dir).resolve() / f"bench_{size.lower()}.db"
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        out_path = out.name
+    command = [sys.executable, "-m", "app.benchmark", "serialization-worker", "--size", size,
+               "--iterations", str(iterations), "--result-file", out_path]
+    subprocess.run(command, cwd=BACKEND_DIR, env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}, check=True)
+    result = json.loads(Path(out_path).read_text())
+    os.unlink(out_path)
+    return {"size": size, **result}
+
+
+def print_serialization(report: dict):
+    base = report["results"]["orm"]["p50_ms"]
+    print(f"Liste aller Transaktionen, {report['dataset']['rows']} Zeilen")
+    print(f"{'Pfad':8} {'p50 ms':>9} {'p95 ms':>9} {'Faktor':>7} {'Spitze MB':>10} {'Antwort MB':>11}")
+    for name, r in report["results"].items():
+        print(f"{name:8} {r['p50_ms']:>9} {r['p95_ms']:>9} {base / r['p50_ms']:>6.1f}x {r['peak_mb']:>10} {r['bytes'] / 2**20:>11.1f}")
+
+
+def run(sizes: List[str], modes: List[str], data_dir: str, repeat: float = 1.0, only: Optional[List[str]] = None) -> dict:
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    report = {"meta": {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "bcrypt_rounds": os.environ.get("BCRYPT_ROUNDS", "12"),
+        "repeat": repeat,
+    }, "results": {}}
+    for size in sizes:
+        db_path = Path(data_dir).resolve() / f"bench_{size.lower()}.db"
+        env = {**os.environ, **BENCH_ENV, "DATABASE_URL": f"sqlite:///{db_path}"}
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+            out_path = out.name
+        command = [sys.executable, "-m", "app.benchmark", "worker", "--size", size, "--modes", ",".join(modes),
+                   "--repeat", str(repeat), "--result-file", out_path]
+        if only:
+            command += ["--only", ",".join(only)]
+        subprocess.run(command, cwd=BACKEND_DIR, env=env, check=True)
+        report["results"][size] = json.loads(Path(out_path).read_text())
+        os.unlink(out_path)
+    return report
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    regressions = []
+    for size, modes in current["results"].items():
+        for mode in MODES:
+            for name, now in modes.get(mode, {}).items():
+                before = baseline.get("results", {}).get(size, {}).get(mode, {}).get(name)
+                if before is None:
+                    continue
+                for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                    if now[metric] > before[metric] * (1 + threshold) and now[metric] - before[metric] >= MIN_REGRESSION_MS:
+                        regressions.append({"size": size, "mode": mode, "scenario": name, "metric": metric,
+                                            "baseline": before[metric], "current": now[metric]})
+                if before.get("rps") and now.get("rps") and now["rps"] < before["rps"] / (1 + threshold):
+                    regressions.append({"size": size, "mode": mode, "scenario": name, "metric": "rps",
+                                        "baseline": before["rps"], "current": now["rps"]})
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"{'Größe':6} {'Modus':10} {'Szenario':8} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for size, modes in report["results"].items():
+        for mode in MODES:
+            for name, r in modes.get(mode, {}).items():
+                print(f"{size:6} {mode:10} {name:8} {r['n']:>4} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['rps']:>8}")
+
+
+def print_regressions(regressions: List[dict], threshold: float) -> int:
+    if not regressions:
+        print(f"Keine Regressionen (Schwelle {threshold:.0%}).")
+        return 0
+    for r in regressions:
+        print(f"REGRESSION {r['size']} {r['mode']} {r['scenario']} {r['metric']}: {r['baseline']} → {r['current']}")
+    return 1
+
+
+def _list(value: Optional[str]) -> Optional[List[str]]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Endpunkt-Benchmarks mit festen Datensatzgrößen und Regressionsvergleich.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Datensätze erzeugen bzw. wiederverwenden und messen")
+    run_parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="Transaktionen je Nutzer, z. B. 10k,100k,1m")
+    run_parser.add_argument("--modes", default=",".join(MODES), help="testclient, uvicorn oder beides")
+    run_parser.add_argument("--only", default=None, help="nur diese Szenarien, z. B. list,search")
+    run_parser.add_argument("--repeat", type=float, default=1.0, help="Faktor auf die Iterationszahlen")
+    run_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.add_argument("--baseline", default=None, help="gespeicherte Baseline zum Vergleich")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser = sub.add_parser("compare", help="zwei Ergebnisdateien vergleichen")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    serialization_parser = sub.add_parser("serialization", help="Listen-Serialisierung: ORM gegen Tupel/orjson und NDJSON")
+    serialization_parser.add_argument("--size", default=SERIALIZATION_SIZE)
+    serialization_parser.add_argument("--iterations", type=int, default=SERIALIZATION_ITERATIONS)
+    serialization_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    serialization_parser.add_argument("--output", default=None)
+    serialization_worker_parser = sub.add_parser("serialization-worker")
+    serialization_worker_parser.add_argument("--size", required=True)
+    serialization_worker_parser.add_argument("--iterations", type=int, required=True)
+    serialization_worker_parser.add_argument("--result-file", required=True)
+    worker_parser = sub.add_parser("worker")
+    worker_parser.add_argument("--size", required=True)
+    worker_parser.add_argument("--modes", required=True)
+    worker_parser.add_argument("--repeat", type=float, default=1.0)
+    worker_parser.add_argument("--only", default=None)
+    worker_parser.add_argument("--result-file", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        result = worker(args.size, _list(args.modes), args.repeat, _list(args.only))
+        Path(args.result_file).write_text(json.dumps(result))
+        return 0
+    if args.command == "serialization-worker":
+        Path(args.result_file).write_text(json.dumps(serialization_worker(args.size, args.iterations)))
+        return 0
+    if args.command == "serialization":
+        report = run_serialization(args.size, args.data_dir, args.iterations)
+        print_serialization(report)
+        if args.output:
+            Path(args.output).write_text(json.dumps(report, indent=2))
+        return 0
+    if args.command == "compare":
+        current = json.loads(Path(args.current).read_text())
+        baseline = json.loads(Path(args.baseline).read_text())
+        return print_regressions(compare(current, baseline, args.threshold), args.threshold)
+
+    report = run(_list(args.sizes), _list(args.modes), args.data_dir, args.repeat, _list(args.only))
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print_report(report)
+    print(f"Ergebnisse geschrieben: {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        return print_regressions(compare(report, baseline, args.threshold), args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
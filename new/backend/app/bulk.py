@@ -0,0 +1,176 @@
+import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field as PydanticField
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlmodel import Session, select
+
+from . import data_version, rollup
+from .content_hash import row_hash
+from .listing import build_filters
+from .models import Transaction, TransactionCreate
+from .rules import check_values
+
+MAX_BULK_ITEMS = 20000
+ROW_FIELDS = ("date", "amount", "currency", "description", "merchant", "category")
+HASH_FIELDS = {"date", "amount", "description", "category"}
+ROLLUP_FIELDS = {"date", "amount", "category", "currency"}
+REQUIRED_FIELDS = tuple(f for f in ROW_FIELDS if not Transaction.__table__.c[f].nullable)
+
+PlausibilityMode = Literal["off", "report", "reject"]
+
+
+class BulkFilter(BaseModel):
+    q: Optional[str] = None
+    description: Optional[str] = None
+    category: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+
+
+class BulkChanges(BaseModel):
+    date: Optional[datetime.date] = None  # Modulpfad, sonst verdeckt das Feld den Typ
+    amount: Optional[float] = None
+    currency: Optional[str] = None
+    description: Optional[str] = None
+    merchant: Optional[str] = None
+    category: Optional[str] = None
+
+
+class BulkCreate(BaseModel):
+    items: List[TransactionCreate] = PydanticField(..., min_length=1, max_length=MAX_BULK_ITEMS)
+    plausibility: PlausibilityMode = "off"
+
+
+class BulkUpdate(BaseModel):
+    ids: Optional[List[int]] = PydanticField(None, min_length=1, max_length=MAX_BULK_ITEMS)
+    filter: Optional[BulkFilter] = None
+    set: BulkChanges
+    plausibility: PlausibilityMode = "off"
+
+
+class BulkDelete(BaseModel):
+    ids: Optional[List[int]] = PydanticField(None, min_length=1, max_length=MAX_BULK_ITEMS)
+    filter: Optional[BulkFilter] = None
+
+
+def _parse_date(name: str, value: str) -> datetime.date:
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{name} muss ein Datum im Format YYYY-MM-DD sein")
+
+
+def selection(user_id: int, ids: Optional[List[int]], criteria: Optional[BulkFilter]) -> list:
+    """WHERE-Bedingungen für ids ODER Filter; ValueError bei fehlender, doppelter oder leerer Auswahl."""
+    if (ids is None) == (criteria is None):
+        raise ValueError("Entweder ids oder filter angeben")
+    conditions = [Transaction.user_id == user_id]
+    if ids is not None:
+        return conditions + [Transaction.id.in_(set(ids))]
+    values = criteria.model_dump(exclude_none=True)
+    if not values:
+        raise ValueError("Filter darf nicht leer sein")
+    description = values.pop("description", None)
+    # Datumsgrenzen streng prüfen: ein verworfener Filter würde sonst alle Zeilen des Nutzers treffen
+    from_date, to_date = values.pop("from_date", None), values.pop("to_date", None)
+    conditions += build_filters(user_id, **values)
+    if description is not None:
+        conditions.append(Transaction.description == description)
+    if from_date is not None:
+        conditions.append(Transaction.date >= _parse_date("from_date", from_date))
+    if to_date is not None:
+        conditions.append(Transaction.date <= _parse_date("to_date", to_date))
+    return conditions
+
+
+def _issues(values: dict, mode: PlausibilityMode) -> List[dict]:
+    return check_values(values) if mode != "off" else []
+
+
+def create_many(session: Session, user_id: int, payload: BulkCreate) -> dict:
+    rows, results = [], []
+    for index, item in enumerate(payload.items):
+        values = item.model_dump()
+        issues = _issues(values, payload.plausibility)
+        if issues and payload.plausibility == "reject":
+            results.append({"index": index, "status": "rejected", "plausibility_issues": issues})
+            continue
+        rows.append({**values, "user_id": user_id})
+        results.append({"index": index, "status": "created", "plausibility_issues": issues})
+    if rows:
+        # erst die Version erhöhen: das hält die Schreibsperre, danach vergibt niemand sonst ids
+        data_version.bump(session, user_id)
+        first_id = session.execute(select(func.coalesce(func.max(Transaction.id), 0) + 1)).scalar()
+        for offset, row in enumerate(rows):
+            row["id"] = first_id + offset
+        # explizite ids statt RETURNING in Parameterreihenfolge, das SQLite nur Zeile für Zeile liefert;
+        # content_hash setzt der Spalten-Default
+        session.execute(insert(Transaction.__table__), rows)
+        created = iter(range(first_id, first_id + len(rows)))
+        for result in results:
+            if result["status"] == "created":
+                result["id"] = next(created)
+        rollup.add_rows(session, user_id, rows)
+    return {"created": len(rows), "rejected": len(results) - len(rows), "items": results}
+
+
+def update_many(session: Session, user_id: int, payload: BulkUpdate) -> dict:
+    changes = payload.set.model_dump(exclude_unset=True)
+    if not changes:
+        raise ValueError("Keine Änderungen angegeben")
+    empty = [k for k in REQUIRED_FIELDS if k in changes and changes[k] is None]
+    if empty:
+        raise ValueError(f"Pflichtfelder dürfen nicht leer sein: {', '.join(empty)}")
+    conditions = selection(user_id, payload.ids, payload.filter)
+    columns = [Transaction.id] + [getattr(Transaction, f) for f in ROW_FIELDS]
+    matched = [dict(zip(("id",) + ROW_FIELDS, row)) for row in session.execute(select(*columns).where(*conditions))]
+
+    results, before, after, params = [], [], [], []
+    rehash = bool(HASH_FIELDS & changes.keys())
+    for old in matched:
+        new = {**old, **changes}
+        issues = _issues(new, payload.plausibility)
+        if issues and payload.plausibility == "reject":
+            results.append({"id": old["id"], "status": "rejected", "plausibility_issues": issues})
+            continue
+        results.append({"id": old["id"], "status": "updated", "plausibility_issues": issues})
+        before.append(old)
+        after.append(new)
+        param = {"_id": old["id"], **{f"new_{k}": v for k, v in changes.items()}}
+        if rehash:
+            param["new_content_hash"] = row_hash(new)
+        params.append(param)
+
+    if params:
+        table = Transaction.__table__
+        values = {k: bindparam(f"new_{k}") for k in changes}
+        if rehash:
+            values["content_hash"] = bindparam("new_content_hash")
+        session.execute(update(table).where(table.c.id == bindparam("_id")).values(values), params)
+        if ROLLUP_FIELDS & changes.keys():
+            rollup.remove_rows(session, user_id, before)
+            rollup.add_rows(session, user_id, after)
+        data_version.bump(session, user_id)
+    if payload.ids is not None:
+        found = {row["id"] for row in matched}
+        results += [{"id": i, "status": "not_found"} for i in dict.fromkeys(payload.ids) if i not in found]
+    updated = len(params)
+    return {"matched": len(matched), "updated": updated, "rejected": len(matched) - updated, "items": results}
+
+
+def delete_many(session: Session, user_id: int, payload: BulkDelete) -> dict:
+    conditions = selection(user_id, payload.ids, payload.filter)
+    table = Transaction.__table__
+    statement = delete(table).where(*conditions).returning(table.c.id, table.c.date, table.c.amount, table.c.category, table.c.currency)
+    removed = [dict(row._mapping) for row in session.execute(statement)]
+    if removed:
+        rollup.remove_rows(session, user_id, removed)
+        data_version.bump(session, user_id)
+    results = [{"id": row["id"], "status": "deleted"} for row in removed]
+    if payload.ids is not None:
+        found = {row["id"] for row in removed}
+        results += [{"id": i, "status": "not_found"} for i in dict.fromkeys(payload.ids) if i not in found]
+    return {"deleted": len(removed), "items": results}
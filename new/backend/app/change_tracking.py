@@ -0,0 +1,54 @@
+from sqlalchemy import DDL, event, literal_column
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateTable
+
+from .models import NOW_MS, Transaction
+from .search import FTS_DDL
+
+MODIFIED_AT = literal_column('"transaction".modified_at')
+TRACKED_COLUMNS = "date, amount, currency, description, merchant, category, user_id"
+
+# Inserts setzen modified_at über den Spalten-Default; nur Änderungen brauchen einen Trigger
+TRACKING_DDL = [
+    'CREATE INDEX IF NOT EXISTS ix_transaction_user_modified ON "transaction" (user_id, modified_at)',
+    f"""CREATE TRIGGER IF NOT EXISTS transaction_modified_au AFTER UPDATE OF {TRACKED_COLUMNS} ON "transaction" BEGIN
+        UPDATE "transaction" SET modified_at = {NOW_MS} WHERE id = new.id;
+    END""",
+]
+
+for statement in TRACKING_DDL:
+    event.listen(Transaction.__table__, "after_create", DDL(statement.replace("%", "%%")))
+
+
+def create_tracking(conn: Connection):
+    cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info('transaction')")]
+    if 'modified_at' not in cols:
+        # ALTER TABLE erlaubt keinen Ausdruck als Default; den setzt rebuild_with_modified_default
+        conn.exec_driver_sql('ALTER TABLE "transaction" ADD COLUMN modified_at TEXT')
+    conn.exec_driver_sql(f'UPDATE "transaction" SET modified_at = {NOW_MS} WHERE modified_at IS NULL')
+    for statement in TRACKING_DDL:
+        conn.exec_driver_sql(statement)
+
+
+def has_modified_default(conn: Connection) -> bool:
+    return any(row[1] == "modified_at" and row[4] is not None for row in conn.exec_driver_sql("PRAGMA table_info('transaction')"))
+
+
+def rebuild_with_modified_default(conn: Connection):
+    """Tabelle nach dem Modell neu anlegen, damit modified_at seinen Default bekommt; ids bleiben, FTS bleibt gültig."""
+    if has_modified_default(conn):
+        return
+    columns = ", ".join(f'"{c.name}"' for c in Transaction.__table__.columns)
+    ddl = str(CreateTable(Transaction.__table__).compile(dialect=conn.dialect))
+    conn.exec_driver_sql(ddl.replace('CREATE TABLE "transaction"', "CREATE TABLE transaction_rebuild", 1))
+    conn.exec_driver_sql(f'INSERT INTO transaction_rebuild ({columns}) SELECT {columns} FROM "transaction"')
+    conn.exec_driver_sql('DROP TABLE "transaction"')
+    conn.exec_driver_sql('ALTER TABLE transaction_rebuild RENAME TO "transaction"')
+    for index in Transaction.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    for statement in FTS_DDL + TRACKING_DDL:
+        conn.exec_driver_sql(statement)
+
+
+def now_ms(conn: Connection) -> str:
+    return conn.exec_driver_sql(f"SELECT {NOW_MS}").scalar()
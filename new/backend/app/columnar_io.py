@@ -0,0 +1,195 @@
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from sqlmodel import Session
+
+from .db import iter_raw_rows, read_engine
+from .exporter import export_statement
+from .importer import IMPORT_BATCH_SIZE, CsvFieldMap, ImportStats, commit_batch, import_batch
+from .models import Transaction
+from .rollup import DEFAULT_CURRENCY
+
+ARROW_BATCH_SIZE = 65536
+PARQUET_COMPRESSION = "zstd"
+
+CATEGORY_TYPE = pa.dictionary(pa.int32(), pa.string())
+EXPORT_SCHEMA = pa.schema([
+    pa.field("id", pa.int64(), nullable=False),
+    pa.field("date", pa.date32(), nullable=False),
+    pa.field("amount", pa.float64(), nullable=False),
+    pa.field("currency", CATEGORY_TYPE),
+    pa.field("description", pa.string()),
+    pa.field("merchant", pa.string()),
+    pa.field("category", CATEGORY_TYPE),
+])
+
+
+def columnar_export_statement(user_id: int, from_date=None, to_date=None, category: Optional[str] = None):
+    t = Transaction
+    return export_statement(user_id, from_date, to_date, category).with_only_columns(
+        t.id, t.date, t.amount, t.currency, t.description, t.merchant, t.category
+    )
+
+
+class Dictionary:
+    """Fortlaufendes Wörterbuch über alle Batches; neue Werte kommen nur hinten dazu (Delta-fähig)."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, column) -> pa.DictionaryArray:
+        # Batch in C kodieren, danach nur das kleine Batch-Wörterbuch auf die globalen Codes abbilden
+        local = pa.array(column, pa.string()).dictionary_encode()
+        mapping = []
+        for value in local.dictionary.to_pylist():
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            mapping.append(code)
+        indices = pc.take(pa.array(mapping, pa.int32()), local.indices)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(self.values, pa.string()))
+
+
+def record_batches(statement, batch_size: Optional[int] = None) -> Iterator[pa.RecordBatch]:
+    batch_size = batch_size or ARROW_BATCH_SIZE
+    currencies, categories = Dictionary(), Dictionary()
+    with read_engine.connect() as conn:
+        for rows in iter_raw_rows(conn, statement, batch_size):
+            ids, days, amounts, currency, description, merchant, category = zip(*rows)
+            yield pa.RecordBatch.from_arrays([
+                pa.array(ids, pa.int64()),
+                pa.array(days, pa.string()).cast(pa.date32()),
+                pa.array(amounts, pa.float64()),
+                currencies.encode(currency),
+                pa.array(description, pa.string()),
+                pa.array(merchant, pa.string()),
+                categories.encode(category),
+            ], schema=EXPORT_SCHEMA)
+
+
+class ChunkSink:
+    """Schreibziel für Arrow/Parquet, das fertige Bytes abgibt, aber die absolute Position kennt (Parquet-Footer)."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_parquet_chunks(statement, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, EXPORT_SCHEMA, compression=PARQUET_COMPRESSION)
+    # eine Row Group je Batch, damit jedes Chunk sofort rausgehen kann
+    for batch in record_batches(statement, batch_size):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_arrow_chunks(statement, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    sink = ChunkSink()
+    writer = ipc.new_stream(sink, EXPORT_SCHEMA, options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+    for batch in record_batches(statement, batch_size):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_columnar_chunks(fmt: str, statement, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    if fmt == "parquet":
+        return iter_parquet_chunks(statement, batch_size)
+    return iter_arrow_chunks(statement, batch_size)
+
+
+def open_batches(fmt: str, raw: BinaryIO, batch_size: int) -> Iterator[pa.RecordBatch]:
+    if fmt == "parquet":
+        yield from pq.ParquetFile(raw).iter_batches(batch_size=batch_size)
+        return
+    # IPC-Batches kommen in der Größe, in der sie geschrieben wurden
+    yield from ipc.open_stream(raw)
+
+
+def _column(batch: pa.RecordBatch, name: str, target: pa.DataType) -> Optional[pa.Array]:
+    index = batch.schema.get_field_index(name)
+    if index < 0:
+        return None
+    column = batch.column(index)
+    if pa.types.is_dictionary(column.type):
+        column = column.dictionary_decode()
+    return column.cast(target)
+
+
+def batch_rows(batch: pa.RecordBatch, fields: CsvFieldMap, first_row: int, stats: ImportStats) -> List[dict]:
+    """Spalten typisiert auslesen; Zeilen ohne Datum oder Betrag werden mit Zeilennummer als Fehler gezählt."""
+    n = batch.num_rows
+    dates = _column(batch, fields.date, pa.date32())
+    amounts = _column(batch, fields.amount, pa.float64())
+    if dates is None or amounts is None:
+        raise ValueError(f"Spalte '{fields.date if dates is None else fields.amount}' fehlt")
+    columns = {"date": dates.to_pylist(), "amount": amounts.to_pylist()}
+    for key, name in (("description", fields.description), ("category", fields.category), ("merchant", "merchant"), ("currency", "currency")):
+        column = _column(batch, name, pa.string())
+        columns[key] = column.to_pylist() if column is not None else [None] * n
+    rows = []
+    for i, (d, amount, description, category, merchant, currency) in enumerate(zip(
+            columns["date"], columns["amount"], columns["description"], columns["category"], columns["merchant"], columns["currency"])):
+        stats.rows += 1
+        if d is None or amount is None:
+            stats.error(first_row + i, "Datum oder Betrag fehlt")
+            continue
+        rows.append({
+            "date": d,
+            "amount": amount,
+            "description": (description or "").strip(),
+            "category": (category or "").strip() or None,
+            "merchant": merchant,
+            "currency": currency or DEFAULT_CURRENCY,
+        })
+    return rows
+
+
+def import_columnar(session: Session, user_id: int, raw: BinaryIO, fmt: str, fields: CsvFieldMap,
+                    batch_size: Optional[int] = None) -> ImportStats:
+    stats = ImportStats()
+    seen: Set[int] = set()
+    first_row = 1
+    try:
+        batches = open_batches(fmt, raw, batch_size or IMPORT_BATCH_SIZE)
+        for batch in batches:
+            started = time.perf_counter()
+            rows = batch_rows(batch, fields, first_row, stats)
+            stats.add_time("parse", time.perf_counter() - started)
+            first_row += batch.num_rows
+            if rows:
+                commit_batch(session, user_id, import_batch(session, user_id, rows, seen, stats), stats)
+    except pa.ArrowException as e:
+        raise ValueError(f"Datei nicht lesbar: {e}") from e
+    return stats
@@ -0,0 +1,32 @@
+import hashlib
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+
+HASH_FIELDS = ("date", "amount", "description", "category")
+
+
+def amount_cents(amount: float) -> int:
+    return int(Decimal(repr(float(amount))).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def normalize_text(text: Optional[str]) -> str:
+    return (text or "").strip().casefold()
+
+
+def hash_normalized(day: str, cents: int, description: str, category: str) -> int:
+    key = f"{day}\x1f{cents}\x1f{description}\x1f{category}"
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def content_hash(d: date, amount: float, description: Optional[str], category: Optional[str]) -> int:
+    return hash_normalized(d.isoformat(), amount_cents(amount), normalize_text(description), normalize_text(category))
+
+
+def row_hash(row: dict) -> int:
+    return content_hash(row["date"], row["amount"], row.get("description"), row.get("category"))
+
+
+def column_default(context) -> int:
+    # greift auch bei Core-Inserts per executemany (Import, Generatoren), die keine ORM-Events auslösen
+    return row_hash(context.get_current_parameters())
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from .models import UserDataVersion
+from .models_user import User
+
+# Versionszähler je Nutzer für ETags; wird in derselben Transaktion wie die Datenänderung erhöht.
+# Zähler werden nie zurückgesetzt, neue starten über dem bisher höchsten Wert: eine wiederverwendete
+# user_id kann so kein ETag eines gelöschten Nutzers treffen.
+
+
+def _next_seed():
+    table = UserDataVersion.__table__
+    return select(func.coalesce(func.max(table.c.version), 0) + 1).scalar_subquery()
+
+
+def bump(session: Session, user_id: int) -> int:
+    table = UserDataVersion.__table__
+    statement = sqlite_insert(table).values(user_id=user_id, version=_next_seed())
+    return session.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.user_id], set_={"version": table.c.version + 1}
+    ).returning(table.c.version)).scalar_one()
+
+
+def bump_all(session: Session):
+    table = UserDataVersion.__table__
+    # "WHERE true" löst die Parser-Mehrdeutigkeit von SQLite bei INSERT … SELECT … ON CONFLICT
+    statement = sqlite_insert(table).from_select(["user_id", "version"], select(User.id, _next_seed()).where(literal(True)))
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.user_id], set_={"version": table.c.version + 1}
+    ))
+
+
+def current(session: Session, user_id: int) -> int:
+    version: Optional[int] = session.execute(
+        select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+    ).scalar()
+    return version or 0
+
@@ -1,13 +1,225 @@
 from sqlmodel import create_engine, Session
 from sqlmodel import SQLModel
-from typing import Generator
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Connection
+from sqlalchemy.util import await_only
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncGenerator, Callable, Generator, Iterator, List, Tuple, TypeVar
+import asyncio
+import os
+import threading
+import time
+import weakref
 
-DATABASE_URL = "sqlite:///./finance.db"
-engine = create_engine(DATABASE_URL, echo=False)
+import anyio
+
+from .metrics import record_query
+
+T = TypeVar("T")
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./finance.db")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-65536")),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+}
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "10"))
+DB_READ_MAX_OVERFLOW = int(os.environ.get("DB_READ_MAX_OVERFLOW", "20"))
+DB_WRITE_POOL_SIZE = int(os.environ.get("DB_WRITE_POOL_SIZE", "4"))
+DB_WRITE_TIMEOUT = float(os.environ.get("DB_WRITE_TIMEOUT", "30"))
+
+# ein Schreiber je Prozess: Sync- und Async-Engine teilen sich diese Sperre, statt über busy_timeout um SQLite zu konkurrieren
+write_lock = threading.Lock()
+_async_waiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:")
+
+
+def _sqlite_profile(read_only: bool):
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return apply
+
+
+def _pool_options(url: str, read_only: bool) -> dict:
+    if not _is_sqlite(url) or _is_memory(url):
+        return {}
+    if read_only:
+        return {"pool_size": DB_READ_POOL_SIZE, "max_overflow": DB_READ_MAX_OVERFLOW}
+    # mehrere Schreibverbindungen, aber nur eine Transaktion zur Zeit: das regelt die Schreibsperre
+    return {"pool_size": DB_WRITE_POOL_SIZE, "max_overflow": 0, "pool_timeout": DB_WRITE_TIMEOUT}
+
+
+def _write_timeout() -> exc.TimeoutError:
+    return exc.TimeoutError(f"Keine Schreibsperre innerhalb von {DB_WRITE_TIMEOUT:g} s frei")
+
+
+def _acquire_write_lock():
+    if not write_lock.acquire(timeout=DB_WRITE_TIMEOUT):
+        raise _write_timeout()
+
+
+async def _acquire_write_lock_async():
+    if write_lock.acquire(blocking=False):
+        return
+    deadline = time.monotonic() + DB_WRITE_TIMEOUT
+    # async-Schreiber warten erst untereinander auf der Event-Loop; nur der vorderste belegt einen Threadpool-Slot
+    waiting = _async_waiters.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+    try:
+        await asyncio.wait_for(waiting.acquire(), DB_WRITE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise _write_timeout()
+    try:
+        acquired = write_lock.acquire(blocking=False) or await anyio.to_thread.run_sync(
+            lambda: write_lock.acquire(timeout=max(deadline - time.monotonic(), 0))
+        )
+    finally:
+        waiting.release()
+    if not acquired:
+        raise _write_timeout()
+
+
+def _serialize_writes(sync_engine, is_async: bool):
+    """Sperre nur für die Dauer einer Transaktion halten: ab begin bis commit bzw. rollback."""
+    def begin(conn):
+        if is_async:
+            # läuft im Greenlet der AsyncSession: warten, ohne die Event-Loop zu blockieren
+            await_only(_acquire_write_lock_async())
+        else:
+            _acquire_write_lock()
+        conn.info["write_lock"] = True
+
+    def release(conn):
+        # SQLite committet unmittelbar danach; ein Schreiber, der genau dann beginnt, wartet per busy_timeout
+        if conn.info.pop("write_lock", False):
+            write_lock.release()
+
+    def checkin(dbapi_connection, connection_record):
+        # Verbindung, die ohne commit/rollback zurückkommt (z. B. invalidiert)
+        if connection_record.info.pop("write_lock", False):
+            write_lock.release()
+
+    event.listen(sync_engine, "begin", begin)
+    event.listen(sync_engine, "commit", release)
+    event.listen(sync_engine, "rollback", release)
+    event.listen(sync_engine, "checkin", checkin)
+
+
+def async_url(url: str) -> str:
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - context.query_started)
+
+
+def _track_queries(sync_engine):
+    # zählt Statements und DB-Zeit je Anfrage für /api/metrics und Server-Timing
+    event.listen(sync_engine, "before_cursor_execute", _start_query)
+    event.listen(sync_engine, "after_cursor_execute", _end_query)
+
+
+def make_engine(url: str = DATABASE_URL, read_only: bool = False):
+    new_engine = create_engine(url, echo=False, **_pool_options(url, read_only))
+    _track_queries(new_engine)
+    if _is_sqlite(url):
+        event.listen(new_engine, "connect", _sqlite_profile(read_only))
+        if not read_only and not _is_memory(url):
+            _serialize_writes(new_engine, is_async=False)
+    return new_engine
+
+
+def make_async_engine(url: str = DATABASE_URL, read_only: bool = False):
+    new_engine = create_async_engine(async_url(url), echo=False, **_pool_options(url, read_only))
+    _track_queries(new_engine.sync_engine)
+    if _is_sqlite(url):
+        event.listen(new_engine.sync_engine, "connect", _sqlite_profile(read_only))
+        if not read_only and not _is_memory(url):
+            _serialize_writes(new_engine.sync_engine, is_async=True)
+    return new_engine
+
+
+def compiled_sql(statement, dialect) -> Tuple[str, tuple]:
+    compiled = statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    return str(compiled), tuple(compiled.params[k] for k in compiled.positiontup)
+
+
+def iter_raw_rows(conn: Connection, statement, size: int) -> Iterator[List[tuple]]:
+    """Rohe DB-API-Tupel in Blöcken, ohne Row-Objekte und Typ-Processing (ein Datum bleibt ISO-Text)."""
+    sql, params = compiled_sql(statement, conn.dialect)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        # am Cursor vorbei an den Engine-Events: selbst zählen
+        record_query(time.perf_counter() - started)
+        while rows := cursor.fetchmany(size):
+            yield rows
+    finally:
+        cursor.close()
+
+
+def raw_rows(conn: Connection, statement) -> List[tuple]:
+    sql, params = compiled_sql(statement, conn.dialect)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        record_query(time.perf_counter() - started)
+        return rows
+    finally:
+        cursor.close()
+
+
+engine = make_engine(DATABASE_URL)
+read_engine = engine if _is_memory(DATABASE_URL) else make_engine(DATABASE_URL, read_only=True)
+async_engine = make_async_engine(DATABASE_URL)
+async_read_engine = async_engine if _is_memory(DATABASE_URL) else make_async_engine(DATABASE_URL, read_only=True)
 
 def init_db():
+    from . import search, change_tracking  # noqa: F401  registrieren FTS-Tabelle und Trigger für create_all
     SQLModel.metadata.create_all(engine)
 
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
+
+def get_read_session() -> Generator[Session, None, None]:
+    with Session(read_engine) as session:
+        yield session
+
+def with_read_session(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Für Arbeit im Threadpool aus async-Handlern: eigene Lese-Session statt der AsyncSession auf der Event-Loop."""
+    with Session(read_engine) as session:
+        return fn(session, *args, **kwargs)
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+async def get_async_read_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_read_engine) as session:
+        yield session
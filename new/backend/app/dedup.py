@@ -0,0 +1,59 @@
+from typing import List
+
+from sqlalchemy import delete, exists, func
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from . import data_version, rollup
+from .models import Transaction
+
+
+def duplicate_condition(user_id: int):
+    kept = aliased(Transaction)
+    return exists().where(
+        kept.user_id == user_id,
+        kept.content_hash == Transaction.content_hash,
+        kept.id < Transaction.id,
+    )
+
+
+def duplicate_groups_statement(user_id: int):
+    groups = (
+        select(
+            func.min(Transaction.id).label("keep_id"),
+            func.group_concat(Transaction.id).label("ids"),
+            func.count().label("count"),
+        )
+        .where(Transaction.user_id == user_id, Transaction.content_hash.is_not(None))
+        .group_by(Transaction.content_hash)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    return (
+        select(groups.c.keep_id, groups.c.ids, Transaction.date, Transaction.amount, Transaction.description, Transaction.category)
+        .join(Transaction, Transaction.id == groups.c.keep_id)
+    )
+
+
+def duplicate_groups(session: Session, user_id: int) -> List[dict]:
+    groups = []
+    for keep_id, ids, d, amount, description, category in session.execute(duplicate_groups_statement(user_id)):
+        groups.append({
+            "keep_id": keep_id,
+            "duplicate_ids": sorted(int(i) for i in ids.split(",") if int(i) != keep_id),
+            "date": d, "amount": amount, "description": description, "category": category,
+        })
+    return sorted(groups, key=lambda g: (g["date"], g["keep_id"]))
+
+
+def delete_duplicates(session: Session, user_id: int) -> int:
+    statement = (
+        delete(Transaction.__table__)
+        .where(Transaction.user_id == user_id, Transaction.content_hash.is_not(None), duplicate_condition(user_id))
+        .returning(Transaction.date, Transaction.amount, Transaction.category, Transaction.currency)
+    )
+    removed = [dict(row._mapping) for row in session.execute(statement)]
+    rollup.remove_rows(session, user_id, removed)
+    if removed:
+        data_version.bump(session, user_id)
+    return len(removed)
@@ -0,0 +1,59 @@
+import csv
+import zlib
+from datetime import date
+from io import StringIO
+from typing import Iterator, Optional
+
+from sqlmodel import Session, select, desc
+
+from .db import read_engine
+from .models import Transaction
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_HEADER = ["id", "date", "amount", "description", "category"]
+# Medientyp und Dateiendung; die Umsetzung steckt in columnar_io und lädt pyarrow erst bei Bedarf
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+COLUMNAR_SUFFIXES = {".parquet": "parquet", ".arrow": "arrow", ".arrows": "arrow"}
+
+
+def export_statement(user_id: int, from_date: Optional[date] = None, to_date: Optional[date] = None, category: Optional[str] = None):
+    statement = select(
+        Transaction.id, Transaction.date, Transaction.amount, Transaction.description, Transaction.category
+    ).where(Transaction.user_id == user_id)
+    if from_date:
+        statement = statement.where(Transaction.date >= from_date)
+    if to_date:
+        statement = statement.where(Transaction.date <= to_date)
+    if category:
+        statement = statement.where(Transaction.category == category)
+    return statement.order_by(desc(Transaction.date), desc(Transaction.id))
+
+
+def iter_csv_chunks(statement, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    with Session(read_engine) as session:
+        result = session.execute(statement.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            for id_, d, amount, description, category in rows:
+                writer.writerow([id_, d.strftime("%Y-%m-%d"), amount, description, category or ""])
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    rest = buffer.getvalue()
+    if rest:
+        yield rest.encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
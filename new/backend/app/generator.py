@@ -0,0 +1,253 @@
+import argparse
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+
+from . import rollup, search
+from .content_hash import hash_normalized, normalize_text
+from .db import engine, init_db
+from .migrations import migrate
+from .passwords import password_hasher
+
+GENERATOR_BATCH_SIZE = 50000
+DEFAULT_START_YEAR = 2016
+OUTLIER_RATE = 0.005
+ROWS_PER_USER_YEAR = 550
+MOBILITAET = "Mobilität"
+
+# (Beschreibung, Händler, Kategorie, Tag im Monat, Betragsspanne in Cent)
+INCOME = ("Gehalt", "Arbeitgeber", "Einnahmen", 28, (220000, 600000))
+RECURRING = [
+    ("Miete", "Hausverwaltung", "Wohnen", 1, (-140000, -55000)),
+    ("Strom", "Stadtwerke", "Versorgung", 15, (-12000, -4500)),
+    ("Internet", "Telekom", "Kommunikation", 5, (-5000, -2500)),
+    ("Handyvertrag", "Vodafone", "Kommunikation", 10, (-4000, -1000)),
+    ("Versicherung", "Allianz", "Versicherung", 1, (-15000, -4000)),
+    ("Streaming", "Netflix", "Freizeit", 12, (-1800, -800)),
+    ("Fitnessstudio", "McFit", "Freizeit", 3, (-5000, -2000)),
+    ("Kindergeld", "Familienkasse", "Sozialleistungen", 20, (25500, 25500)),
+]
+# (Beschreibung, Händler, Kategorie, Buchungen pro Monat, Betragsspanne in Cent)
+VARIABLE = [
+    ("Supermarkt", ("Rewe", "Edeka", "Aldi", "Lidl"), "Lebensmittel", 10, (-12000, -500)),
+    ("Bäcker", ("Bäckerei Müller", "Kamps"), "Lebensmittel", 6, (-1500, -200)),
+    ("Restaurant", ("Trattoria", "Sushi Bar", "Brauhaus"), "Freizeit", 3, (-9000, -1200)),
+    ("Kino", ("Cinemaxx", "UCI"), "Freizeit", 1, (-3000, -900)),
+    ("Tanken", ("Aral", "Shell", "Jet"), MOBILITAET, 3, (-9000, -3000)),
+    ("Fahrkarte", ("Deutsche Bahn", "ÖPNV"), MOBILITAET, 4, (-12000, -300)),
+    ("Kleidung", ("Zalando", "H&M", "C&A"), "Shopping", 1.5, (-20000, -1500)),
+    ("Elektronik", ("MediaMarkt", "Amazon"), "Shopping", 0.5, (-60000, -1000)),
+    ("Drogerie", ("dm", "Rossmann"), "Haushalt", 3, (-4000, -300)),
+    ("Apotheke", ("Apotheke am Markt",), "Gesundheit", 1, (-6000, -500)),
+    ("Urlaub", ("Booking.com", "Lufthansa"), "Reisen", 0.2, (-150000, -10000)),
+]
+
+Row = Tuple[int, str, float, str, str, str, str, int]
+Combo = Tuple[str, str, str, str, str]
+
+
+def _combo(desc: str, merchant: str, category: str) -> Combo:
+    return desc, merchant, category, normalize_text(desc), normalize_text(category)
+
+
+COMBOS: List[Combo] = [_combo(*INCOME[:3]), _combo("Bonus", INCOME[1], INCOME[2])]
+COMBOS += [_combo(desc, merchant, cat) for desc, merchant, cat, _, _ in RECURRING]
+VARIABLE_MEAN_TOTAL = sum(v[3] for v in VARIABLE)
+VARIABLE_OFFSETS = []
+for _desc, _merchants, _cat, _, _ in VARIABLE:
+    VARIABLE_OFFSETS.append(len(COMBOS))
+    COMBOS += [_combo(_desc, m, _cat) for m in _merchants]
+
+
+class Calendar:
+    def __init__(self, start_year: int, years: int):
+        first = date(start_year, 1, 1)
+        self.days = [(first + timedelta(days=i)).isoformat() for i in range((date(start_year + years, 1, 1) - first).days)]
+        starts, lengths, month_of_year, year_index = [], [], [], []
+        for y in range(years):
+            for m in range(1, 13):
+                starts.append((date(start_year + y, m, 1) - first).days)
+                lengths.append(monthrange(start_year + y, m)[1])
+                month_of_year.append(m)
+                year_index.append(y)
+        self.starts = np.array(starts)
+        self.lengths = np.array(lengths)
+        self.month_of_year = np.array(month_of_year)
+        self.year_index = np.array(year_index)
+
+
+def _cents(rng: np.random.Generator, span: Tuple[int, int], size=None):
+    low, high = span
+    if low == high:
+        return np.full(size, low) if size is not None else low
+    sign = -1 if high <= 0 else 1
+    a, b = sorted((abs(low), abs(high)))
+    # log-gleichverteilt: viele kleine, wenige große Beträge
+    if size is None:
+        return sign * int(a * (b / a) ** rng.random())
+    return sign * (a * (b / a) ** rng.random(size)).astype(np.int64)
+
+
+def user_rows(user_id: int, rng: np.random.Generator, cal: Calendar, rows_per_user: Optional[int] = None) -> Iterator[Row]:
+    months = len(cal.starts)
+    salary = _cents(rng, INCOME[4])
+    activity = 0.5 + rng.random()
+    ordinals = [cal.starts + np.minimum(INCOME[3], cal.lengths) - 1]
+    cents = [(salary * 1.02 ** cal.year_index).astype(np.int64)]
+    combos = [np.zeros(months, dtype=np.int64)]
+
+    bonus = (cal.month_of_year == 11) & (rng.random(months) < 0.5)
+    ordinals.append(cal.starts[bonus] + cal.lengths[bonus] - 1)
+    cents.append((salary * rng.uniform(0.3, 1.0, bonus.sum())).astype(np.int64))
+    combos.append(np.full(bonus.sum(), 1))
+
+    for i, (desc, _, _, day, span) in enumerate(RECURRING):
+        if desc != "Miete" and rng.random() >= 0.6:
+            continue
+        ordinals.append(cal.starts + np.minimum(day, cal.lengths) - 1)
+        cents.append(np.full(months, _cents(rng, span)))
+        combos.append(np.full(months, 2 + i))
+
+    if rows_per_user:
+        # variable Buchungen so skalieren, dass der Nutzer im Mittel auf die Zielgröße kommt
+        fixed = sum(len(o) for o in ordinals)
+        activity = max(rows_per_user - fixed, 0) / months / VARIABLE_MEAN_TOTAL
+    for offset, (_, merchants, _, mean, span) in zip(VARIABLE_OFFSETS, VARIABLE):
+        month_idx = np.repeat(np.arange(months), rng.poisson(mean * activity, months))
+        n = len(month_idx)
+        ordinals.append(cal.starts[month_idx] + (rng.random(n) * cal.lengths[month_idx]).astype(np.int64))
+        amounts = _cents(rng, span, n)
+        outliers = rng.random(n) < OUTLIER_RATE
+        amounts[outliers] *= rng.integers(5, 26, outliers.sum())
+        cents.append(amounts)
+        combos.append(offset + rng.integers(0, len(merchants), n))
+
+    ordinals, cents, combos = np.concatenate(ordinals), np.concatenate(cents), np.concatenate(combos)
+    order = np.argsort(ordinals, kind="stable")
+    days = cal.days
+    for o, c, k in zip(ordinals[order].tolist(), cents[order].tolist(), combos[order].tolist()):
+        desc, merchant, category, norm_desc, norm_category = COMBOS[k]
+        day = days[o]
+        yield user_id, day, c / 100, "EUR", desc, merchant, category, hash_normalized(day, c, norm_desc, norm_category)
+
+
+def _create_users(conn: Connection, names: List[str], hashed_password: str) -> List[int]:
+    existing = conn.exec_driver_sql(
+        f"SELECT username FROM user WHERE username IN ({','.join('?' * len(names))})", tuple(names)
+    ).fetchall()
+    if existing:
+        raise ValueError(f"Nutzer existieren bereits: {', '.join(r[0] for r in existing[:5])} – anderes --prefix wählen")
+    conn.exec_driver_sql(
+        "INSERT INTO user (username, hashed_password, is_active, is_admin) VALUES (?, ?, 1, 0)",
+        [(name, hashed_password) for name in names],
+    )
+    rows = conn.exec_driver_sql(
+        f"SELECT id FROM user WHERE username IN ({','.join('?' * len(names))}) ORDER BY id", tuple(names)
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def _drop_indexes(conn: Connection) -> List[str]:
+    rows = conn.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transaction' AND sql IS NOT NULL"
+    ).fetchall()
+    for name, _ in rows:
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+    return [sql for _, sql in rows]
+
+
+def generate(users: int, years: int, seed: int = 42, start_year: int = DEFAULT_START_YEAR, prefix: str = "synth",
+             password: str = "synth123", bind: Optional[Engine] = None, batch_size: Optional[int] = None,
+             rows_per_user: Optional[int] = None) -> dict:
+    bind = bind or engine
+    batch_size = batch_size or GENERATOR_BATCH_SIZE
+    timings = {"generate": 0.0, "insert": 0.0, "index": 0.0, "fts": 0.0, "rollup": 0.0}
+    started = time.perf_counter()
+    names = [f"{prefix}{i:05d}" for i in range(1, users + 1)]
+    hashed = password_hasher.hash(password)
+    rows = 0
+    with bind.begin() as conn:
+        user_ids = _create_users(conn, names, hashed)
+        first_id = conn.exec_driver_sql('SELECT COALESCE(MAX(id), 0) + 1 FROM "transaction"').scalar()
+        # Bulk-Modus: Indizes nach dem Laden einmal sortiert aufbauen statt Zeile für Zeile pflegen
+        bulk = users * (rows_per_user or years * ROWS_PER_USER_YEAR) >= first_id
+        index_sql = _drop_indexes(conn) if bulk else []
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS transaction_fts_ai")
+        insert_sql = ('INSERT INTO "transaction" (user_id, date, amount, currency, description, merchant, category, content_hash) '
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+        cal = Calendar(start_year, years)
+        for index, user_id in enumerate(user_ids):
+            stream = user_rows(user_id, np.random.default_rng([seed, index]), cal, rows_per_user)
+            while True:
+                t = time.perf_counter()
+                batch = [row for _, row in zip(range(batch_size), stream)]
+                timings["generate"] += time.perf_counter() - t
+                if not batch:
+                    break
+                t = time.perf_counter()
+                conn.exec_driver_sql(insert_sql, batch)
+                timings["insert"] += time.perf_counter() - t
+                rows += len(batch)
+
+        t = time.perf_counter()
+        for sql in index_sql:
+            conn.exec_driver_sql(sql)
+        timings["index"] += time.perf_counter() - t
+        t = time.perf_counter()
+        conn.exec_driver_sql(
+            f"INSERT INTO {search.FTS_TABLE}(rowid, description, merchant, category) "
+            'SELECT id, description, merchant, category FROM "transaction" WHERE id >= ?', (first_id,)
+        )
+        for statement in search.FTS_DDL:
+            conn.exec_driver_sql(statement)
+        timings["fts"] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        with Session(bind=conn) as session:
+            for user_id in user_ids:
+                rollup.rebuild(session, user_id)
+            session.flush()
+        timings["rollup"] += time.perf_counter() - t
+    total = time.perf_counter() - started
+    return {
+        "users": len(user_ids),
+        "rows": rows,
+        "timings": {k: round(v, 3) for k, v in {**timings, "total": total}.items()},
+        "rows_per_sec": round(rows / total) if total > 0 else None,
+        "insert_rows_per_sec": round(rows / timings["insert"]) if timings["insert"] > 0 else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Deterministische Testdaten in großen Mengen erzeugen (Bulk-Insert).")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start-year", type=int, default=DEFAULT_START_YEAR)
+    parser.add_argument("--prefix", default="synth", help="Präfix der Nutzernamen, z. B. synth00001")
+    parser.add_argument("--password", default="synth123", help="gemeinsames Passwort aller erzeugten Nutzer")
+    parser.add_argument("--rows-per-user", type=int, default=None, help="Zielgröße je Nutzer; skaliert die variablen Buchungen")
+    parser.add_argument("--batch-size", type=int, default=GENERATOR_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    init_db()
+    migrate()
+    try:
+        result = generate(args.users, args.years, args.seed, args.start_year, args.prefix, args.password,
+                          batch_size=args.batch_size, rows_per_user=args.rows_per_user)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"{result['rows']} Transaktionen für {result['users']} Nutzer erzeugt: "
+          f"{result['rows_per_sec']} Zeilen/s gesamt, {result['insert_rows_per_sec']} Zeilen/s Insert")
+    print("Phasen (s): " + ", ".join(f"{k}={v}" for k, v in result["timings"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,315 @@
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, Optional, Set
+
+from sqlalchemy import or_, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from . import data_version
+from .db import engine
+from .importer import CsvFieldMap, ImportStats, import_batch, iter_batches, iter_csv_rows
+from .models import ImportJob
+
+IMPORT_SPOOL_DIR = os.environ.get("IMPORT_SPOOL_DIR", "import_spool")
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "2"))
+# ohne Lebenszeichen seit so vielen Sekunden gilt ein laufender Auftrag als verwaist und wird neu eingeplant
+IMPORT_LEASE_SECONDS = float(os.environ.get("IMPORT_LEASE_SECONDS", "60"))
+# Spool-Dateien abgebrochener oder fehlgeschlagener Aufträge bleiben so lange für POST /resume liegen
+IMPORT_SPOOL_RETENTION_DAYS = float(os.environ.get("IMPORT_SPOOL_RETENTION_DAYS", "7"))
+SPOOL_CHUNK_SIZE = 1024 * 1024
+ACTIVE = ("queued", "running")
+RESUMABLE = ("failed", "cancelled")
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _ago(seconds: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+
+
+def spool_path(job_id: str) -> str:
+    return os.path.join(IMPORT_SPOOL_DIR, f"{job_id}.csv")
+
+
+def remove_spool(job_id: str) -> bool:
+    try:
+        os.remove(spool_path(job_id))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def create_job(session: Session, user_id: int, filename: str, upload: BinaryIO, fields: CsvFieldMap) -> ImportJob:
+    job_id = uuid.uuid4().hex
+    os.makedirs(IMPORT_SPOOL_DIR, exist_ok=True)
+    path = spool_path(job_id)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(upload, out, SPOOL_CHUNK_SIZE)
+    field_map = {"date_field": fields.date, "amount_field": fields.amount,
+                 "description_field": fields.description, "category_field": fields.category}
+    job = ImportJob(id=job_id, user_id=user_id, filename=filename, field_map=json.dumps(field_map),
+                    total_bytes=os.path.getsize(path), created_at=_now())
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def job_view(job: ImportJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "rows": job.rows,
+        "imported": job.imported,
+        "skipped_duplicates": job.skipped_duplicates,
+        "errors": job.errors,
+        "error_details": json.loads(job.error_details),
+        "progress": round(min(job.bytes_done / job.total_bytes, 1.0), 4) if job.total_bytes else 1.0,
+        "rows_per_sec": round(job.rows / job.elapsed, 1) if job.elapsed > 0 else None,
+        "elapsed": round(job.elapsed, 3),
+        "cancel_requested": job.cancel_requested,
+        "message": job.message,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _restore(job: ImportJob) -> ImportStats:
+    stats = ImportStats()
+    stats.rows, stats.imported, stats.skipped_duplicates, stats.errors = job.rows, job.imported, job.skipped_duplicates, job.errors
+    stats.error_details = json.loads(job.error_details)
+    return stats
+
+
+def _checkpoint(job: ImportJob, stats: ImportStats, bytes_done: int, elapsed: float):
+    job.rows, job.imported, job.skipped_duplicates, job.errors = stats.rows, stats.imported, stats.skipped_duplicates, stats.errors
+    job.error_details = json.dumps(stats.error_details)
+    job.bytes_done = bytes_done
+    job.elapsed = elapsed
+
+
+def _finish(session: Session, job: ImportJob, status: str, message: Optional[str] = None):
+    job.status = status
+    job.owner = None
+    job.message = message
+    job.finished_at = _now()
+    session.add(job)
+    session.commit()
+
+
+def claim(session: Session, job_id: str, owner: str = WORKER_ID) -> bool:
+    """Übernimmt einen wartenden Auftrag; nur ein Worker (auch prozessübergreifend) bekommt rowcount 1."""
+    claimed = session.execute(
+        update(ImportJob).where(ImportJob.id == job_id, ImportJob.status == "queued")
+        .values(status="running", owner=owner, heartbeat_at=_now(), message=None)
+    ).rowcount == 1
+    session.commit()
+    return claimed
+
+
+def _heartbeat(session: Session, job_id: str, owner: str) -> bool:
+    # erste Schreibanweisung des Chunks: hat ein anderer Worker den Auftrag inzwischen übernommen, schreibt dieser Chunk nichts
+    return session.execute(
+        update(ImportJob).where(ImportJob.id == job_id, ImportJob.owner == owner).values(heartbeat_at=_now())
+    ).rowcount == 1
+
+
+def run_job(job_id: str, bind: Engine = engine, stopping: Optional[threading.Event] = None, owner: str = WORKER_ID):
+    """Verarbeitet die Spool-Datei ab dem letzten Checkpoint; jeder Chunk wird samt Fortschritt in einer Transaktion committet."""
+    with Session(bind) as session:
+        if not claim(session, job_id, owner):
+            return
+        job = session.get(ImportJob, job_id)
+        if job.cancel_requested:
+            _finish(session, job, "cancelled")
+            return
+        stats = _restore(job)
+        elapsed_before, started = job.elapsed, time.perf_counter()
+        seen: Set[int] = set()
+        fields = CsvFieldMap(**json.loads(job.field_map))
+        try:
+            with open(spool_path(job_id), "rb") as raw:
+                for batch in iter_batches(iter_csv_rows(raw), fields, stats, skip=job.rows):
+                    if stopping is not None and stopping.is_set():
+                        job.status = "queued"
+                        job.owner = None
+                        session.commit()
+                        return
+                    if not _heartbeat(session, job_id, owner):
+                        logger.warning("Import %s wurde von einem anderen Worker übernommen", job_id)
+                        session.rollback()
+                        return
+                    if session.execute(select(ImportJob.cancel_requested).where(ImportJob.id == job_id)).scalar():
+                        session.rollback()
+                        _finish(session, job, "cancelled")
+                        return
+                    if import_batch(session, job.user_id, batch, seen, stats):
+                        data_version.bump(session, job.user_id)
+                    _checkpoint(job, stats, raw.tell(), elapsed_before + time.perf_counter() - started)
+                    session.add(job)
+                    session.commit()
+            _checkpoint(job, stats, job.total_bytes, elapsed_before + time.perf_counter() - started)
+            _finish(session, job, "completed")
+        except UnicodeDecodeError:
+            session.rollback()
+            _finish(session, job, "failed", "CSV-Datei ist nicht UTF-8-kodiert.")
+            return
+        except Exception as e:
+            logger.exception("Import %s fehlgeschlagen", job_id)
+            session.rollback()
+            _finish(session, job, "failed", str(e))
+            return
+    remove_spool(job_id)
+
+
+class ImportWorkers:
+    def __init__(self, workers: int = IMPORT_WORKERS, bind: Engine = engine):
+        self.workers = workers
+        self.bind = bind
+        self.stopping = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def submit(self, job_id: str) -> Future:
+        with self._lock:
+            pending = self._futures.get(job_id)
+            if pending is not None and not pending.done():
+                return pending
+            if self._executor is None:
+                self.stopping.clear()
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import")
+            future = self._executor.submit(run_job, job_id, self.bind, self.stopping)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda done: self._futures.pop(job_id) if self._futures.get(job_id) is done else None)
+        return future
+
+    def start(self, interval: float = IMPORT_LEASE_SECONDS) -> int:
+        """Beim Start: verwaiste Aufträge einplanen und danach regelmäßig nach abgelaufenen Leases sehen."""
+        cleanup_spool(self.bind)
+        recovered = recover(self.bind)
+        if self._sweeper is None:
+            self.stopping.clear()
+            self._sweeper = threading.Thread(target=self._sweep, args=(interval,), name="import-sweeper", daemon=True)
+            self._sweeper.start()
+        return recovered
+
+    def _sweep(self, interval: float):
+        while not self.stopping.wait(interval):
+            try:
+                cleanup_spool(self.bind)
+                recover(self.bind)
+            except Exception:
+                logger.exception("Aufräumen der Importe fehlgeschlagen")
+
+    def wait(self, job_id: str, timeout: Optional[float] = None):
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+
+    def shutdown(self):
+        # laufende Jobs beenden den aktuellen Chunk und bleiben "queued" für den nächsten Start
+        self.stopping.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None:
+            sweeper.join()
+
+
+import_workers = ImportWorkers()
+
+
+def get_job(session: Session, job_id: str, user_id: int) -> Optional[ImportJob]:
+    job = session.get(ImportJob, job_id)
+    return job if job is not None and job.user_id == user_id else None
+
+
+def request_cancel(session: Session, job: ImportJob):
+    job.cancel_requested = True
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+
+
+def delete_job(session: Session, job: ImportJob):
+    session.delete(job)
+    session.commit()
+    remove_spool(job.id)
+
+
+def resume(session: Session, job: ImportJob):
+    job.status = "queued"
+    job.cancel_requested = False
+    job.message = None
+    job.finished_at = None
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    import_workers.submit(job.id)
+
+
+def recover(bind: Engine = engine, lease_seconds: float = IMPORT_LEASE_SECONDS) -> int:
+    """Nach einem Absturz: laufende Aufträge ohne Heartbeat innerhalb der Lease freigeben und alle wartenden einplanen."""
+    with Session(bind) as session:
+        session.execute(
+            update(ImportJob).where(
+                ImportJob.status == "running",
+                or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < _ago(lease_seconds)),
+            ).values(status="queued", owner=None)
+        )
+        session.commit()
+        job_ids = session.exec(select(ImportJob.id).where(ImportJob.status == "queued").order_by(ImportJob.created_at)).all()
+    for job_id in job_ids:
+        import_workers.submit(job_id)
+    return len(job_ids)
+
+
+def cleanup_spool(bind: Engine = engine, retention_days: float = IMPORT_SPOOL_RETENTION_DAYS) -> int:
+    """Spool-Dateien beendeter Aufträge nach der Aufbewahrungsfrist löschen, ebenso verwaiste Dateien ohne Auftrag."""
+    try:
+        names = os.listdir(IMPORT_SPOOL_DIR)
+    except FileNotFoundError:
+        return 0
+    spooled = [name[:-4] for name in names if name.endswith(".csv")]
+    if not spooled:
+        return 0
+    cutoff = _ago(retention_days * 86400)
+    with Session(bind) as session:
+        jobs = {job_id: (status, finished_at) for job_id, status, finished_at in session.execute(
+            select(ImportJob.id, ImportJob.status, ImportJob.finished_at).where(ImportJob.id.in_(spooled))
+        )}
+    removed = 0
+    for job_id in spooled:
+        if job_id in jobs:
+            status, finished_at = jobs[job_id]
+            # abgeschlossene Aufträge brauchen ihre Datei nicht mehr (Absturz zwischen Commit und Löschen)
+            expired = status == "completed" or (status in RESUMABLE and finished_at is not None and finished_at < cutoff)
+        else:
+            # Upload ohne committeten Auftrag: nach derselben Frist über das Dateialter
+            try:
+                expired = os.path.getmtime(spool_path(job_id)) < time.time() - retention_days * 86400
+            except FileNotFoundError:
+                continue
+        if expired and remove_spool(job_id):
+            removed += 1
+    return removed
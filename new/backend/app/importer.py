@@ -0,0 +1,151 @@
+import csv
+import io
+import time
+from datetime import datetime
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from .content_hash import row_hash
+from .models import Transaction
+from . import data_version, rollup
+
+IMPORT_BATCH_SIZE = 5000
+MAX_ERROR_DETAILS = 1000
+
+
+class CsvFieldMap:
+    def __init__(self, date_field: str, amount_field: str, description_field: str, category_field: str):
+        self.date = (date_field or 'date').strip()
+        self.amount = (amount_field or 'amount').strip()
+        self.description = (description_field or 'description').strip()
+        self.category = (category_field or 'category').strip()
+
+    def parse(self, row: Dict[str, str]) -> dict:
+        parsed_date = datetime.strptime((row.get(self.date) or '').strip(), "%Y-%m-%d").date()
+        amount_raw = (row.get(self.amount) or '0').strip().replace(',', '.')
+        return {
+            "date": parsed_date,
+            "amount": float(amount_raw),
+            "description": (row.get(self.description) or '').strip(),
+            "category": (row.get(self.category) or '').strip() or None,
+        }
+
+
+def iter_csv_rows(raw: BinaryIO, encoding: str = "utf-8") -> Iterator[Tuple[int, Dict[str, str]]]:
+    """(Zeilennummer in der Datei, Datensatz); mehrzeilige Felder zählen mit."""
+    text = io.TextIOWrapper(raw, encoding=encoding, newline='')
+    try:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    finally:
+        text.detach()
+
+
+def iter_batches(rows: Iterable[Tuple[int, Dict[str, str]]], fields: CsvFieldMap, stats: "ImportStats", size: Optional[int] = None,
+                 skip: int = 0) -> Iterator[List[dict]]:
+    size = size or IMPORT_BATCH_SIZE
+    batch = []
+    started = time.perf_counter()
+    for line, row in islice(rows, skip, None):
+        stats.rows += 1
+        try:
+            batch.append(fields.parse(row))
+        except (ValueError, TypeError) as e:
+            stats.error(line, str(e))
+            continue
+        if len(batch) >= size:
+            stats.add_time("parse", time.perf_counter() - started)
+            yield batch
+            batch = []
+            started = time.perf_counter()
+    stats.add_time("parse", time.perf_counter() - started)
+    if batch:
+        yield batch
+
+
+def existing_hashes_statement(user_id: int, hashes: Set[int]):
+    return select(Transaction.content_hash).where(
+        Transaction.user_id == user_id,
+        Transaction.content_hash.in_(hashes),
+    )
+
+
+def existing_hashes(session: Session, user_id: int, batch: List[dict]) -> Set[int]:
+    hashes = {row["content_hash"] for row in batch}
+    return set(session.exec(existing_hashes_statement(user_id, hashes)))
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.skipped_duplicates = 0
+        self.errors = 0
+        self.error_details: List[dict] = []
+        self.timings: Dict[str, float] = {"parse": 0.0, "dedup": 0.0, "insert": 0.0, "commit": 0.0}
+        self._started = time.perf_counter()
+
+    def error(self, line: int, message: str):
+        self.errors += 1
+        if len(self.error_details) < MAX_ERROR_DETAILS:
+            self.error_details.append({"line": line, "message": message})
+
+    def add_time(self, phase: str, seconds: float):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def result(self) -> dict:
+        total = time.perf_counter() - self._started
+        return {
+            "imported": self.imported,
+            "skipped_duplicates": self.skipped_duplicates,
+            "errors": self.errors,
+            "error_details": self.error_details,
+            "rows": self.rows,
+            "timings": {k: round(v, 4) for k, v in {**self.timings, "total": total}.items()},
+            "rows_per_sec": round(self.rows / total, 1) if total > 0 else None,
+        }
+
+
+def import_batch(session: Session, user_id: int, batch: List[dict], seen: Set[int], stats: ImportStats) -> int:
+    started = time.perf_counter()
+    for row in batch:
+        row["content_hash"] = row_hash(row)
+    known = existing_hashes(session, user_id, batch)
+    fresh = []
+    for row in batch:
+        key = row["content_hash"]
+        if key in known or key in seen:
+            stats.skipped_duplicates += 1
+            continue
+        seen.add(key)
+        row["user_id"] = user_id
+        fresh.append(row)
+    stats.add_time("dedup", time.perf_counter() - started)
+    if fresh:
+        started = time.perf_counter()
+        session.execute(insert(Transaction.__table__), fresh)
+        rollup.add_rows(session, user_id, fresh)
+        stats.imported += len(fresh)
+        stats.add_time("insert", time.perf_counter() - started)
+    return len(fresh)
+
+
+def commit_batch(session: Session, user_id: int, imported: int, stats: ImportStats):
+    """Je Batch committen, damit die Schreibverbindung zwischen den Batches für andere Schreiber frei wird."""
+    if imported:
+        data_version.bump(session, user_id)
+    started = time.perf_counter()
+    session.commit()
+    stats.add_time("commit", time.perf_counter() - started)
+
+
+def import_csv(session: Session, user_id: int, raw: BinaryIO, fields: CsvFieldMap, batch_size: Optional[int] = None) -> ImportStats:
+    stats = ImportStats()
+    seen: Set[int] = set()
+    for batch in iter_batches(iter_csv_rows(raw), fields, stats, batch_size):
+        commit_batch(session, user_id, import_batch(session, user_id, batch, seen, stats), stats)
+    return stats
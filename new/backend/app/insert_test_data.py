@@ -2,6 +2,7 @@ import random
 from datetime import datetime, timedelta
 from app.db import get_session, init_db
 from app.models import Transaction
+from app import rollup
 INCOME_CATEGORIES = ["Gehalt", "Bonus", "Zinsen", "Dividende", "Sonstige Einnahmen"]
 EXPENSE_CATEGORIES = ["Miete", "Lebensmittel", "Freizeit", "Versicherung", "Auto", "Reisen", "Gesundheit", "Shopping", "Sonstige Ausgaben"]
 
@@ -52,6 +53,8 @@ def insert_transactions():
     with next(get_session()) as session:
         for t in generate_transactions(500):
             session.add(t)
+        session.flush()
+        rollup.rebuild(session, 1)
         session.commit()
     print("500 Test-Transaktionen eingefügt.")
 
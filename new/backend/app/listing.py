@@ -0,0 +1,111 @@
+import base64
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import func, tuple_
+from sqlmodel import Session, select, desc
+
+from .db import iter_raw_rows, raw_rows, read_engine
+from .models import MonthlyCategoryRollup, Transaction
+from .rollup import UNKNOWN_CATEGORY
+from .search import match_filter
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+LISTABLE_FIELDS = ("id", "date", "amount", "currency", "description", "merchant", "category", "user_id")
+# Feldreihenfolge der bisherigen ORM-Antwort
+MODEL_FIELDS = tuple(name for name, field in Transaction.model_fields.items() if not field.exclude)
+NDJSON_BATCH_SIZE = 5000
+
+
+def build_filters(user_id: int, q=None, category=None, min_amount=None, max_amount=None, from_date=None, to_date=None) -> list:
+    filters = []
+    if q:
+        filters.append(match_filter(user_id, q))
+    if category:
+        filters.append(Transaction.category == category)
+    if min_amount is not None:
+        filters.append(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        filters.append(Transaction.amount <= max_amount)
+    if from_date:
+        try:
+            filters.append(Transaction.date >= datetime.strptime(from_date, "%Y-%m-%d").date())
+        except ValueError:
+            pass
+    if to_date:
+        try:
+            filters.append(Transaction.date <= datetime.strptime(to_date, "%Y-%m-%d").date())
+        except ValueError:
+            pass
+    return filters
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(LISTABLE_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [n for n in names if n not in LISTABLE_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Unbekannte Felder: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def encode_cursor(d: date, id_: int) -> str:
+    return base64.urlsafe_b64encode(f"{d.isoformat()}|{id_}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    d, id_ = raw.split("|")
+    return date.fromisoformat(d), int(id_)
+
+
+def list_statement(user_id: int, filters: list, fields: Optional[List[str]] = None):
+    columns = [getattr(Transaction, f) for f in fields] if fields else [Transaction]
+    statement = select(*columns).where(Transaction.user_id == user_id, *filters)
+    return statement.order_by(desc(Transaction.date), desc(Transaction.id))
+
+
+def list_rows(session: Session, user_id: int, filters: list, fields: Optional[List[str]] = None) -> List[dict]:
+    """Gleiches Schema wie die Transaction-Instanzen, aber aus rohen Tupeln statt ORM-Objekten und Pydantic-Validierung."""
+    keys = fields or MODEL_FIELDS
+    return [dict(zip(keys, row)) for row in raw_rows(session.connection(), list_statement(user_id, filters, list(keys)))]
+
+
+def iter_ndjson(user_id: int, filters: list, fields: Optional[List[str]] = None, batch_size: Optional[int] = None) -> Iterator[bytes]:
+    keys = fields or MODEL_FIELDS
+    with read_engine.connect() as conn:
+        for rows in iter_raw_rows(conn, list_statement(user_id, filters, list(keys)), batch_size or NDJSON_BATCH_SIZE):
+            yield b"".join(orjson.dumps(dict(zip(keys, row)), option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+
+def page_statement(user_id: int, filters: list, limit: int, cursor: Optional[str], fields: List[str]):
+    columns = [getattr(Transaction, f) for f in fields]
+    statement = select(Transaction.date, Transaction.id, *columns).where(Transaction.user_id == user_id, *filters)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(Transaction.date, Transaction.id) < tuple_(last_date, last_id))
+    return statement.order_by(desc(Transaction.date), desc(Transaction.id)).limit(limit + 1)
+
+
+def page(session: Session, user_id: int, filters: list, limit: int, cursor: Optional[str], fields: List[str]) -> dict:
+    rows = session.exec(page_statement(user_id, filters, limit, cursor, fields)).all()
+    next_cursor = encode_cursor(rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+    items = [dict(zip(fields, row[2:])) for row in rows[:limit]]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def count_total_statement(user_id: int, filters: list):
+    return select(func.count()).select_from(Transaction).where(Transaction.user_id == user_id, *filters)
+
+
+def count_total(session: Session, user_id: int, filters: list, rollup_category: Optional[str] = None, use_rollup: bool = False) -> int:
+    if use_rollup and rollup_category != UNKNOWN_CATEGORY:
+        r = MonthlyCategoryRollup
+        statement = select(func.coalesce(func.sum(r.count), 0)).where(r.user_id == user_id)
+        if rollup_category:
+            statement = statement.where(r.category == rollup_category)
+        return session.exec(statement).one()
+    return session.exec(count_total_statement(user_id, filters)).one()
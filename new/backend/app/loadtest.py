@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import List, Optional
+
+import anyio.to_thread
+import httpx
+from fastapi import Depends, FastAPI, Query, Response
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from . import rollup
+from .auth import create_access_token, decode_token
+from .db import engine, get_read_session, init_db
+from .listing import build_filters, count_total, page, parse_fields
+from .main import app
+from .models import Transaction
+from .models_user import User
+from .passwords import password_hasher
+from .principal_cache import principal_cache
+from .response_cache import render_json, response_cache
+from .analytics import monthly_category_stats
+
+LOADTEST_USER = "loadtest"
+LOADTEST_PATHS = [
+    "/api/transactions?limit=50",
+    "/api/transactions?limit=50&min_amount=0&include_total=true",
+    "/api/stats/monthly-category",
+]
+CATEGORIES = ["Lebensmittel", "Wohnen", "Freizeit", "Mobilität", "Versicherung", "Einnahmen"]
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+
+
+def sync_baseline_app() -> FastAPI:
+    # dieselben Abfragen, derselbe Statistik-Snapshot und dieselbe Serialisierung als blockierende def-Handler, wie vor der
+    # Umstellung auf AsyncSession; so misst der Vergleich nur sync gegen async
+    baseline = FastAPI()
+
+    def current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_read_session)) -> User:
+        user = principal_cache.user_for_token(token)
+        if user is None:
+            payload = decode_token(token)
+            user = session.exec(select(User).where(User.username == payload["sub"])).one()
+            principal_cache.remember(user, token, payload.get("exp"))
+        return user
+
+    @baseline.get("/api/transactions")
+    def list_transactions(limit: int = Query(50), min_amount: Optional[float] = Query(None), include_total: bool = Query(False),
+                          session: Session = Depends(get_read_session), user: User = Depends(current_user)):
+        filters = build_filters(user.id, None, min_amount, None, None, None)
+        result = page(session, user.id, filters, limit, None, parse_fields(None))
+        if include_total:
+            result["total"] = count_total(session, user.id, filters, None, use_rollup=False)
+        return Response(render_json(result), media_type="application/json")
+
+    @baseline.get("/api/stats/monthly-category")
+    def stats_monthly_category(session: Session = Depends(get_read_session), user: User = Depends(current_user)):
+        return Response(render_json(monthly_category_stats(session, user.id, None)), media_type="application/json")
+
+    return baseline
+
+
+def prepare_user(rows: int) -> str:
+    init_db()
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == LOADTEST_USER)).first()
+        if user is None:
+            user = User(username=LOADTEST_USER, hashed_password=password_hasher.hash(LOADTEST_USER), is_active=True)
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        existing = session.exec(select(Transaction.id).where(Transaction.user_id == user.id).limit(1)).first()
+        if existing is None and rows:
+            rng = random.Random(42)
+            start = date(2020, 1, 1)
+            session.execute(insert(Transaction.__table__), [
+                {"user_id": user.id, "date": start + timedelta(days=rng.randrange(2000)),
+                 "amount": round(rng.uniform(-300, 3000), 2), "description": f"Buchung {i}",
+                 "category": rng.choice(CATEGORIES)}
+                for i in range(rows)
+            ])
+            rollup.rebuild(session, user.id)
+            session.commit()
+    return create_access_token({"sub": LOADTEST_USER})
+
+
+async def run_load(target: FastAPI, path: str, headers: dict, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    pending = iter(range(requests))
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        async def worker():
+            for _ in pending:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+
+async def compare(token: str, requests: int, concurrency: int, workers: int, paths: Optional[List[str]] = None) -> List[dict]:
+    anyio.to_thread.current_default_thread_limiter().total_tokens = workers
+    headers = {"Authorization": f"Bearer {token}"}
+    baseline = sync_baseline_app()
+    results = []
+    # ohne Antwort-Cache, sonst misst der async-Pfad nur Cache-Treffer
+    max_bytes, response_cache.max_bytes = response_cache.max_bytes, 0
+    try:
+        for path in paths or LOADTEST_PATHS:
+            for mode, target in (("sync", baseline), ("async", app)):
+                await run_load(target, path, headers, min(requests, concurrency), concurrency)
+                results.append({"path": path, "mode": mode, **await run_load(target, path, headers, requests, concurrency)})
+    finally:
+        response_cache.max_bytes = max_bytes
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Lasttest: blockierende Session vs. AsyncSession bei fester Threadpool-Größe.")
+    parser.add_argument("--rows", type=int, default=20000, help="Transaktionen für den Lasttest-Nutzer (nur beim ersten Lauf)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4, help="Größe des Threadpools für def-Handler")
+    args = parser.parse_args(argv)
+    token = prepare_user(args.rows)
+    results = asyncio.run(compare(token, args.requests, args.concurrency, args.workers))
+    print(f"{'Pfad':40} {'Modus':6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(f"{r['path']:40} {r['mode']:6} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
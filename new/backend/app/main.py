@@ -1,60 +1,98 @@
-
-
-
-from fastapi import FastAPI, Depends, HTTPException, APIRouter, Response, UploadFile, File, Query, Path, Body, Form
-MOBILITAET = "Mobilität"
-BUECHER = "Bücher"
-
+from .startup import imported as startup_imported, prepare_database, startup_profile
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, Request, Response, UploadFile, File, Query, Path, Body, Form
+from sqlalchemy import exc
 from sqlmodel import Session, select, desc
-from .db import engine, get_session, init_db
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .db import get_async_read_session, get_async_session, get_read_session, get_session, with_read_session
 from .models import Transaction, TransactionCreate
 from .models_user import User
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-import os
 from .rules import check_plausibility
-import csv
-from io import StringIO
-import codecs
-from collections import defaultdict
+from .rules_engine import RULE_SET
+from .plausibility_scan import list_findings, scan_user
+from .importer import CsvFieldMap, import_csv
+from .import_jobs import ACTIVE as ACTIVE_IMPORTS, RESUMABLE as RESUMABLE_IMPORTS, create_job, delete_job, get_job, import_workers, job_view, request_cancel, resume as resume_import_job, spool_path
+from .models import ImportJob
+from .dedup import delete_duplicates, duplicate_groups
+from .analytics import monthly_category_stats, snapshots
+from .balance import MIN_POINTS, balance_series
+from .bulk import BulkCreate, BulkDelete, BulkUpdate, create_many, delete_many, update_many
+from . import data_version, rollup
+from .search import MAX_SEARCH_RESULTS, search
+from .listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_filters, count_total, iter_ndjson, list_rows, page, parse_fields
+from .exporter import COLUMNAR_FORMATS, COLUMNAR_SUFFIXES, export_statement, iter_csv_chunks, gzip_chunks
 from datetime import datetime, date
-from .auth import router as auth_router
+from .auth import router as auth_router, resolve_principal
+from .principal_cache import principal_cache
+from .passwords import password_hasher
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from .metrics import MetricsMiddleware, metrics
+from .response_cache import conditional_json, response_cache
+from typing import Literal, Optional
+import os
 
 app = FastAPI(title="Personal Finance Dashboard - Backend")
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(exc.TimeoutError)
+def write_lock_timeout(request: Request, error: exc.TimeoutError):
+    # Schreibsperre oder Verbindung nicht rechtzeitig frei: kurz später erneut versuchen statt 500
+    return JSONResponse(status_code=503, content={"detail": "Datenbank ist ausgelastet, bitte erneut versuchen"}, headers={"Retry-After": "1"})
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 api_router = APIRouter(prefix="/api")
 
-SECRET_KEY = os.environ.get("SECRET_KEY", "devsecret")
-ALGORITHM = "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 USER_NOT_FOUND = "User nicht gefunden"
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
-    from fastapi import HTTPException
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Token ungültig")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token ungültig")
-    user = session.exec(select(User).where(User.username == username)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail=USER_NOT_FOUND)
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_read_session)) -> User:
+    user = await resolve_principal(token, session)
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Konto deaktiviert")
     return user
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
+async def require_admin(user: User = Depends(get_current_user)) -> User:
     if not getattr(user, "is_admin", False):
         raise HTTPException(status_code=403, detail="Adminrechte erforderlich")
     return user
 
-def require_regular_user(user: User = Depends(get_current_user)) -> User:
+async def require_regular_user(user: User = Depends(get_current_user)) -> User:
     if getattr(user, "is_admin", False):
         raise HTTPException(status_code=403, detail="Für Admins nicht erlaubt")
     return user
 
 @api_router.post("/transactions/import")
-async def import_transactions_csv(
+def import_transactions_csv(
+    file: UploadFile = File(...),
+    date_field: str = Form("date"),
+    amount_field: str = Form("amount"),
+    description_field: str = Form("description"),
+    category_field: str = Form("category"),
+    session: Session = Depends(get_session),
+    user: User = Depends(require_regular_user)
+):
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    if suffix != '.csv' and suffix not in COLUMNAR_SUFFIXES:
+        raise HTTPException(status_code=400, detail="Nur CSV-, Parquet- oder Arrow-Dateien erlaubt.")
+    fields = CsvFieldMap(date_field, amount_field, description_field, category_field)
+    if suffix in COLUMNAR_SUFFIXES:
+        from .columnar_io import import_columnar  # pyarrow nur für Parquet/Arrow laden
+        try:
+            stats = import_columnar(session, user.id, file.file, COLUMNAR_SUFFIXES[suffix], fields)
+        except ValueError as e:
+            session.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        return stats.result()
+    try:
+        stats = import_csv(session, user.id, file.file, fields)
+    except UnicodeDecodeError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="CSV-Datei ist nicht UTF-8-kodiert.")
+    return stats.result()
+
+IMPORT_JOB_NOT_FOUND = "Importauftrag nicht gefunden"
+
+@api_router.post("/imports", status_code=202)
+def create_import_job(
     file: UploadFile = File(...),
     date_field: str = Form("date"),
     amount_field: str = Form("amount"),
@@ -65,234 +103,298 @@ async def import_transactions_csv(
 ):
     if not file.filename or not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Nur CSV-Dateien erlaubt.")
-    content = await file.read()
-    decoded = codecs.decode(content, 'utf-8')
-    reader = csv.DictReader(decoded.splitlines())
-    imported = 0
-    skipped_duplicates = 0
-    df = (date_field or 'date').strip()
-    af = (amount_field or 'amount').strip()
-    descf = (description_field or 'description').strip()
-    catf = (category_field or 'category').strip()
-
-    def parse_row(row):
-        parsed_date = datetime.strptime((row.get(df) or '').strip(), "%Y-%m-%d")
-        amount_raw = (row.get(af) or '0').strip().replace(',', '.')
-        parsed_amount = float(amount_raw)
-        desc = (row.get(descf) or '').strip()
-        cat = (row.get(catf) or '').strip() or None
-        return parsed_date, parsed_amount, desc, cat
-
-    def is_duplicate(d, amt, desc, cat):
-        existing = session.exec(
-            select(Transaction).where(
-                Transaction.user_id == user.id,
-                Transaction.date == d,
-                Transaction.amount == amt,
-                Transaction.description == desc,
-                Transaction.category == cat,
-            )
-        ).first()
-        return existing is not None
-
-    for row in reader:
-        try:
-            parsed_date, parsed_amount, desc, cat = parse_row(row)
-            if is_duplicate(parsed_date, parsed_amount, desc, cat):
-                skipped_duplicates += 1
-                continue
-
-            session.add(Transaction(
-                date=parsed_date,
-                amount=parsed_amount,
-                description=desc,
-                category=cat,
-                user_id=user.id
-            ))
-            imported += 1
-        except Exception:
-            continue
-    session.commit()
-    return {"imported": imported, "skipped_duplicates": skipped_duplicates}
+    fields = CsvFieldMap(date_field, amount_field, description_field, category_field)
+    job = create_job(session, user.id, file.filename, file.file, fields)
+    import_workers.submit(job.id)
+    return job_view(job)
+
+@api_router.get("/imports")
+def list_import_jobs(session: Session = Depends(get_read_session), user: User = Depends(require_regular_user), limit: int = Query(50, ge=1, le=500)):
+    jobs = session.exec(select(ImportJob).where(ImportJob.user_id == user.id).order_by(desc(ImportJob.created_at)).limit(limit)).all()
+    return [job_view(job) for job in jobs]
+
+@api_router.get("/imports/{job_id}")
+def get_import_job(job_id: str, session: Session = Depends(get_read_session), user: User = Depends(require_regular_user)):
+    job = get_job(session, job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail=IMPORT_JOB_NOT_FOUND)
+    return job_view(job)
+
+@api_router.post("/imports/{job_id}/cancel")
+def cancel_import_job(job_id: str, session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
+    job = get_job(session, job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail=IMPORT_JOB_NOT_FOUND)
+    if job.status not in ACTIVE_IMPORTS:
+        raise HTTPException(status_code=409, detail="Import ist bereits beendet")
+    request_cancel(session, job)
+    return job_view(job)
+
+@api_router.delete("/imports/{job_id}")
+def delete_import_job(job_id: str, session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
+    job = get_job(session, job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail=IMPORT_JOB_NOT_FOUND)
+    if job.status in ACTIVE_IMPORTS:
+        raise HTTPException(status_code=409, detail="Laufende Importe erst abbrechen")
+    delete_job(session, job)
+    return {"deleted": True}
+
+@api_router.post("/imports/{job_id}/resume", status_code=202)
+def resume_import(job_id: str, session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
+    job = get_job(session, job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail=IMPORT_JOB_NOT_FOUND)
+    if job.status not in RESUMABLE_IMPORTS:
+        raise HTTPException(status_code=409, detail="Nur abgebrochene oder fehlgeschlagene Importe können fortgesetzt werden")
+    if not os.path.exists(spool_path(job.id)):
+        raise HTTPException(status_code=409, detail="Importdatei nicht mehr vorhanden")
+    resume_import_job(session, job)
+    return job_view(job)
 
 @api_router.get("/transactions/export")
-def export_transactions_csv(session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
-    statement = select(Transaction).where(Transaction.user_id == user.id).order_by(desc(Transaction.date))
-    results = session.exec(statement).all()
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["id", "date", "amount", "description", "category"])
-    for t in results:
-        writer.writerow([
-            t.id,
-            t.date.strftime("%Y-%m-%d"),
-            t.amount,
-            t.description,
-            t.category or ""
-        ])
-    csv_content = output.getvalue()
-    output.close()
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": "attachment; filename=transactions.csv"
-        }
-    )
+def export_transactions_csv(
+    user: User = Depends(require_regular_user),
+    from_date: Optional[date] = Query(None, description="Startdatum (YYYY-MM-DD)"),
+    to_date: Optional[date] = Query(None, description="Enddatum (YYYY-MM-DD)"),
+    category: Optional[str] = Query(None, description="Kategorie filtern"),
+    gzip: bool = Query(False, description="Antwort gzip-komprimiert senden"),
+    format: Literal["csv", "parquet", "arrow"] = Query("csv", description="csv, parquet oder arrow (IPC-Stream)")
+):
+    if format in COLUMNAR_FORMATS:
+        if gzip:
+            raise HTTPException(status_code=400, detail="gzip nur für CSV; Parquet ist bereits komprimiert")
+        from .columnar_io import columnar_export_statement, iter_columnar_chunks  # pyarrow nur für Parquet/Arrow laden
+        media_type, extension = COLUMNAR_FORMATS[format]
+        chunks = iter_columnar_chunks(format, columnar_export_statement(user.id, from_date, to_date, category))
+        headers = {"Content-Disposition": f"attachment; filename=transactions.{extension}"}
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+    statement = export_statement(user.id, from_date, to_date, category)
+    chunks = iter_csv_chunks(statement)
+    headers = {"Content-Disposition": "attachment; filename=transactions.csv"}
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="text/csv", headers=headers)
 
 @app.on_event("startup")
 def on_startup():
-    init_db()
-    try:
-        with engine.connect() as conn:
-            cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info('user')").fetchall()]
-            if 'is_admin' not in cols:
-                conn.exec_driver_sql("ALTER TABLE user ADD COLUMN is_admin INTEGER DEFAULT 0")
-                conn.exec_driver_sql("UPDATE user SET is_admin = 0 WHERE is_admin IS NULL")
-                conn.commit()
-    except Exception:
-        pass
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    with Session(engine) as session:
-        admin = session.exec(select(User).where(User.username == "admin")).first()
-        if not admin:
-            admin = User(username="admin", hashed_password=pwd_context.hash("admin123"), is_active=True, is_admin=True)
-            session.add(admin)
-            session.commit()
+    with startup_profile.step("database"):
+        prepare_database()
+    with startup_profile.step("import_jobs"):
+        import_workers.start()
+    startup_profile.log()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    import_workers.shutdown()
 
 @api_router.get("/health")
 def health():
     return {"status": "ok"}
 
+@api_router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render() + startup_profile.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @api_router.post("/transactions")
-def create_transaction(payload: TransactionCreate, session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
+async def create_transaction(payload: TransactionCreate, session: AsyncSession = Depends(get_async_session), user: User = Depends(require_regular_user)):
     t = Transaction.from_orm(payload)
     t.user_id = user.id
     session.add(t)
-    session.commit()
-    session.refresh(t)
+    await session.run_sync(rollup.add_rows, user.id, [rollup.snapshot(t)])
+    version = await session.run_sync(data_version.bump, user.id)
+    await session.commit()
+    await session.refresh(t)
+    snapshots.apply(user.id, version, upserts=[t])
     issues = check_plausibility(t)
     return {"transaction": t, "plausibility_issues": issues}
 
 
-from typing import Optional
-
 @api_router.get("/transactions")
-def list_transactions(
-    session: Session = Depends(get_session),
+async def list_transactions(
+    request: Request,
+    session: AsyncSession = Depends(get_async_read_session),
     user: User = Depends(require_regular_user),
     q: Optional[str] = Query(None, description="Suchtext in Beschreibung"),
     category: Optional[str] = Query(None, description="Kategorie filtern"),
     min_amount: Optional[float] = Query(None, description="Minimaler Betrag"),
     max_amount: Optional[float] = Query(None, description="Maximaler Betrag"),
     from_date: Optional[str] = Query(None, description="Startdatum (YYYY-MM-DD)"),
-    to_date: Optional[str] = Query(None, description="Enddatum (YYYY-MM-DD)")
+    to_date: Optional[str] = Query(None, description="Enddatum (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Seitengröße; aktiviert Keyset-Paginierung"),
+    cursor: Optional[str] = Query(None, description="next_cursor der vorherigen Seite"),
+    fields: Optional[str] = Query(None, description="Kommagetrennte Feldliste, z. B. id,date,amount"),
+    include_total: bool = Query(False, description="Gesamtanzahl der Treffer mitliefern"),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson streamt eine Transaktion je Zeile")
 ):
-    statement = select(Transaction).where(Transaction.user_id == user.id)
-    filters = []
-    if q:
-        filters.append(getattr(Transaction, 'description') != None)
-        filters.append(getattr(Transaction, 'description').ilike(f"%{q}%"))
-    if category:
-        filters.append(Transaction.category == category)
-    if min_amount is not None:
-        filters.append(Transaction.amount >= min_amount)
-    if max_amount is not None:
-        filters.append(Transaction.amount <= max_amount)
-    if from_date:
-        try:
-            from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-            filters.append(Transaction.date >= from_dt)
-        except Exception:
-            pass
-    if to_date:
+    filters = build_filters(user.id, q, category, min_amount, max_amount, from_date, to_date)
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "ndjson":
+        if limit is not None or cursor is not None:
+            raise HTTPException(status_code=400, detail="ndjson nur ohne limit und cursor")
+        return StreamingResponse(iter_ndjson(user.id, filters, selected if fields else None), media_type="application/x-ndjson")
+
+    def load(read: Session):
+        if limit is None and cursor is None:
+            return list_rows(read, user.id, filters, selected if fields else None)
         try:
-            to_dt = datetime.strptime(to_date, "%Y-%m-%d")
-            filters.append(Transaction.date <= to_dt)
-        except Exception:
-            pass
-    if filters:
-        for f in filters:
-            statement = statement.where(f)
-    statement = statement.order_by(desc(Transaction.date))
-    results = session.exec(statement).all()
-    return results
+            result = page(read, user.id, filters, limit or DEFAULT_PAGE_SIZE, cursor, selected)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Ungültiger Cursor")
+        if include_total:
+            only_category = not any([q, min_amount is not None, max_amount is not None, from_date, to_date])
+            result["total"] = count_total(read, user.id, filters, category, use_rollup=only_category)
+        return result
 
+    def compute():
+        return with_read_session(load)
 
+    version = await session.run_sync(data_version.current, user.id)
+    return await conditional_json(request, user.id, version, compute)
 
 
+@api_router.get("/transactions/search")
+async def search_transactions(
+    session: AsyncSession = Depends(get_async_read_session),
+    user: User = Depends(require_regular_user),
+    q: str = Query(..., min_length=1, description="Suchbegriffe (Präfixsuche in Beschreibung, Händler, Kategorie)"),
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_RESULTS)
+):
+    return await session.run_sync(search, user.id, q, limit)
 
 @api_router.get("/stats/monthly-category")
-def stats_monthly_category(session: Session = Depends(get_session), user: User = Depends(require_regular_user), year: int = Query(None)):
-    statement = select(Transaction).where(Transaction.user_id == user.id)
-    results = session.exec(statement).all()
-    stats = defaultdict(lambda: defaultdict(float))
-    for t in results:
-        if year and t.date.year != year:
-            continue
-        month = t.date.strftime("%Y-%m")
-        cat = t.category or "Unbekannt"
-        stats[month][cat] += t.amount
-    out = []
-    for month, cats in sorted(stats.items()):
-        for cat, summe in cats.items():
-            out.append({"month": month, "category": cat, "sum": summe})
-    return out
+async def stats_monthly_category(request: Request, session: AsyncSession = Depends(get_async_read_session), user: User = Depends(require_regular_user), year: int = Query(None)):
+    version = await session.run_sync(data_version.current, user.id)
+
+    def compute():
+        return with_read_session(monthly_category_stats, user.id, year, version)
+
+    return await conditional_json(request, user.id, version, compute)
+
+@api_router.get("/stats/balance")
+async def stats_balance(
+    request: Request,
+    session: AsyncSession = Depends(get_async_read_session),
+    user: User = Depends(require_regular_user),
+    resolution: Literal["day", "week", "month"] = Query("day", description="Auflösung der Zeitreihe"),
+    from_date: Optional[date] = Query(None, description="Startdatum (YYYY-MM-DD)"),
+    to_date: Optional[date] = Query(None, description="Enddatum (YYYY-MM-DD)"),
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS, le=10000, description="Serverseitig per LTTB auf höchstens so viele Punkte reduzieren")
+):
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date liegt nach to_date")
+    version = await session.run_sync(data_version.current, user.id)
+
+    def compute():
+        return with_read_session(balance_series, user.id, resolution, from_date, to_date, max_points)
+
+    return await conditional_json(request, user.id, version, compute)
+
+@api_router.post("/plausibility/scan")
+def plausibility_scan(
+    session: Session = Depends(get_session),
+    user: User = Depends(require_regular_user),
+    from_date: Optional[date] = Query(None, description="Startdatum (YYYY-MM-DD)"),
+    to_date: Optional[date] = Query(None, description="Enddatum (YYYY-MM-DD)"),
+    full: bool = Query(False, description="Alle Zeilen neu prüfen statt nur seit dem letzten Lauf geänderte")
+):
+    return scan_user(session, user.id, from_date, to_date, full)
+
+@api_router.get("/plausibility/findings")
+def plausibility_findings(
+    session: Session = Depends(get_read_session),
+    user: User = Depends(require_regular_user),
+    severity: Optional[str] = Query(None),
+    limit: int = Query(500, ge=1, le=5000)
+):
+    return list_findings(session, user.id, severity, limit)
 
 @api_router.delete("/transactions/duplicates")
-def delete_duplicate_transactions(session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
-    statement = select(Transaction).where(Transaction.user_id == user.id)
-    results = session.exec(statement).all()
-    seen = set()
-    to_delete = []
-    for t in results:
-        key = (t.date, t.amount, t.description, t.category)
-        if key in seen:
-            to_delete.append(t)
-        else:
-            seen.add(key)
-    for obj in to_delete:
-        session.delete(obj)
-    if to_delete:
-        session.commit()
-    return {"deleted": len(to_delete)}
+def delete_duplicate_transactions(
+    session: Session = Depends(get_session),
+    user: User = Depends(require_regular_user),
+    dry_run: bool = Query(False, description="Nur Duplikatgruppen melden, nichts löschen")
+):
+    if dry_run:
+        groups = duplicate_groups(session, user.id)
+        return {"dry_run": True, "deleted": sum(len(g["duplicate_ids"]) for g in groups), "groups": groups}
+    deleted = delete_duplicates(session, user.id)
+    session.commit()
+    return {"deleted": deleted}
+
+
+# Bulk-Operationen verarbeiten bis zu MAX_BULK_ITEMS Zeilen in Python und laufen deshalb als def-Handler im Threadpool
+def run_bulk(session: Session, operation, user_id: int, payload):
+    try:
+        result = operation(session, user_id, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    session.commit()
+    return result
+
+@api_router.post("/transactions/bulk")
+def create_transactions_bulk(payload: BulkCreate, session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
+    return run_bulk(session, create_many, user.id, payload)
+
+@api_router.patch("/transactions/bulk")
+def update_transactions_bulk(payload: BulkUpdate, session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
+    return run_bulk(session, update_many, user.id, payload)
+
+@api_router.post("/transactions/bulk/delete")
+def delete_transactions_bulk(payload: BulkDelete, session: Session = Depends(get_session), user: User = Depends(require_regular_user)):
+    return run_bulk(session, delete_many, user.id, payload)
 
 
 @api_router.patch("/transactions/{transaction_id}")
-def update_transaction(
+async def update_transaction(
     transaction_id: int = Path(..., description="ID der Transaktion"),
     payload: TransactionCreate = Body(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     user: User = Depends(require_regular_user)
 ):
-    transaction = session.get(Transaction, transaction_id)
+    transaction = await session.get(Transaction, transaction_id)
     if not transaction or transaction.user_id != user.id:
         raise HTTPException(status_code=404, detail="Transaktion nicht gefunden oder nicht erlaubt")
     data = payload.dict(exclude_unset=True)
+    before = rollup.snapshot(transaction)
     for key, value in data.items():
         setattr(transaction, key, value)
     session.add(transaction)
-    session.commit()
-    session.refresh(transaction)
+    await session.flush()
+    await session.run_sync(rollup.remove_rows, user.id, [before])
+    await session.run_sync(rollup.add_rows, user.id, [rollup.snapshot(transaction)])
+    version = await session.run_sync(data_version.bump, user.id)
+    await session.commit()
+    await session.refresh(transaction)
+    snapshots.apply(user.id, version, upserts=[transaction])
     return transaction
 
 @api_router.delete("/transactions/{transaction_id}")
-def delete_transaction(
+async def delete_transaction(
     transaction_id: int = Path(..., description="ID der Transaktion"),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     user: User = Depends(require_regular_user)
 ):
-    transaction = session.get(Transaction, transaction_id)
+    transaction = await session.get(Transaction, transaction_id)
     if not transaction or transaction.user_id != user.id:
         raise HTTPException(status_code=404, detail="Transaktion nicht gefunden oder nicht erlaubt")
-    session.delete(transaction)
-    session.commit()
+    before = rollup.snapshot(transaction)
+    await session.delete(transaction)
+    await session.flush()
+    await session.run_sync(rollup.remove_rows, user.id, [before])
+    version = await session.run_sync(data_version.bump, user.id)
+    await session.commit()
+    snapshots.apply(user.id, version, deleted_ids=[transaction_id])
     return {"deleted": True}
 
 
 @api_router.post("/seed-demo-data")
 def trigger_seed_demo_data(user: User = Depends(require_regular_user)):
+    from .seeding import seed_demo_data  # Demo-Daten erst bei Bedarf laden, nicht bei jedem Start
     seed_demo_data()
     return {"status": "ok", "message": "Demo-Daten wurden eingefügt."}
 
@@ -304,8 +406,16 @@ class AdminUserCreate(BaseModel):
     is_admin: bool = False
     is_active: bool = True
 
+@api_router.get("/admin/rules/stats")
+def admin_rule_stats(admin: User = Depends(require_admin)):
+    return RULE_SET.stats()
+
+@api_router.get("/admin/cache/stats")
+def admin_cache_stats(admin: User = Depends(require_admin)):
+    return {"principal": principal_cache.stats(), "password_hashing": password_hasher.stats(), "responses": response_cache.stats(), "analytics": snapshots.stats()}
+
 @api_router.get("/admin/users")
-def admin_list_users(session: Session = Depends(get_session), admin: User = Depends(require_admin)):
+def admin_list_users(session: Session = Depends(get_read_session), admin: User = Depends(require_admin)):
     users = session.exec(select(User)).all()
     return [{"id": u.id, "username": u.username, "is_active": u.is_active, "is_admin": getattr(u, "is_admin", False)} for u in users]
 
@@ -314,9 +424,7 @@ def admin_create_user(payload: AdminUserCreate, session: Session = Depends(get_s
     existing = session.exec(select(User).where(User.username == payload.username)).first()
     if existing:
         raise HTTPException(status_code=400, detail="Username bereits vergeben")
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    user = User(username=payload.username, hashed_password=pwd_context.hash(payload.password), is_active=payload.is_active, is_admin=payload.is_admin)
+    user = User(username=payload.username, hashed_password=password_hasher.hash(payload.password), is_active=payload.is_active, is_admin=payload.is_admin)
     session.add(user)
     session.commit()
     session.refresh(user)
@@ -338,12 +446,11 @@ def admin_update_user(user_id: int, payload: AdminUserUpdate, session: Session =
     if "is_admin" in data and data["is_admin"] is not None:
         user.is_admin = data["is_admin"]
     if "password" in data and data["password"]:
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        user.hashed_password = pwd_context.hash(str(data["password"]))
+        user.hashed_password = password_hasher.hash(str(data["password"]))
     session.add(user)
     session.commit()
     session.refresh(user)
+    principal_cache.invalidate(user.username)
     return {"id": user.id, "username": user.username, "is_active": user.is_active, "is_admin": getattr(user, "is_admin", False)}
 
 @api_router.delete("/admin/users/{user_id}")
@@ -355,232 +462,10 @@ def admin_delete_user(user_id: int, session: Session = Depends(get_session), adm
         raise HTTPException(status_code=400, detail="Eigenes Konto kann nicht gelöscht werden")
     session.delete(user)
     session.commit()
+    principal_cache.invalidate(user.username)
+    response_cache.invalidate_user(user.id)
+    snapshots.invalidate(user.id)
     return {"deleted": True}
 
 app.include_router(api_router)
-
-def seed_demo_data():
-    from .models_user import User
-    from .models import Transaction
-    from sqlmodel import Session, select
-    from .db import engine
-    from passlib.context import CryptContext
-    from datetime import date, timedelta
-    import random
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    with Session(engine) as session:
-        _create_demo_users(session, pwd_context, DEMO_USERS_ALL)
-        _seed_monthly_transactions(session, DEMO_USERS_ALL, INCOME_MAP, INCOME_CATEGORIES, EXPENSE_MAP, SEED_START, date.today())
-        _seed_example_transactions(session, pwd_context, DEMO_USERS)
-        _seed_demo_user_if_needed(session, pwd_context)
-    print("Demo-User: demo / demo123 (mit Beispiel-Daten)")
-
-SEED_START = date(2020, 1, 1)
-DEMO_USERS_ALL = [
-    ("demo", "demo123"),
-    ("alice", "alice123"),
-    ("bob", "bob123"),
-    ("carla", "carla123"),
-]
-INCOME_MAP = {
-    "demo": 3500,
-    "alice": 4200,
-    "bob": 3900,
-    "carla": 4800,
-}
-INCOME_CATEGORIES = [
-    ("Gehalt", "Einnahmen"),
-    ("Nebenjob", "Einnahmen"),
-    ("Zinsen", "Kapitalerträge"),
-    ("Steuerrückzahlung", "Sonstiges"),
-    ("Verkauf", "Sonstiges"),
-    ("Mieteinnahmen", "Einnahmen"),
-    ("Dividende", "Kapitalerträge"),
-    ("Elterngeld", "Sozialleistungen"),
-    ("Kindergeld", "Sozialleistungen"),
-    ("Bonus", "Einnahmen"),
-    ("Geschenk", "Sonstiges"),
-    ("Rückerstattung", "Sonstiges"),
-]
-EXPENSE_MAP = {
-    "demo": [
-        ("Supermarkt", -50, "Lebensmittel"),
-        ("Miete", -700, "Wohnen"),
-        ("Internet", -30, "Kommunikation"),
-        ("Tanken", -80, MOBILITAET),
-        ("Strom", -60, "Versorgung"),
-        ("Kino", -20, "Freizeit"),
-        ("Arzt", -30, "Gesundheit"),
-        (BUECHER, -15, "Bildung"),
-        ("Restaurant", -40, "Freizeit"),
-        ("Urlaub", -150, "Reisen"),
-        ("Kleidung", -45, "Shopping"),
-        ("Versicherung", -90, "Versicherung"),
-    ],
-    "alice": [
-        ("Supermarkt", -120, "Lebensmittel"),
-        ("Miete", -800, "Wohnen"),
-        ("Fitnessstudio", -40, "Freizeit"),
-        ("Bahn", -60, MOBILITAET),
-        ("Strom", -70, "Versorgung"),
-        ("Arzt", -50, "Gesundheit"),
-        (BUECHER, -25, "Bildung"),
-        ("Konzert", -35, "Freizeit"),
-        ("Urlaub", -200, "Reisen"),
-        ("Kleidung", -60, "Shopping"),
-        ("Versicherung", -100, "Versicherung"),
-        ("Drogerie", -30, "Haushalt"),
-    ],
-    "bob": [
-        ("Restaurant", -55, "Freizeit"),
-        ("Miete", -650, "Wohnen"),
-        ("Handyvertrag", -25, "Kommunikation"),
-        ("Benzin", -90, MOBILITAET),
-        ("Strom", -55, "Versorgung"),
-        ("Kino", -25, "Freizeit"),
-        ("Arzt", -20, "Gesundheit"),
-        (BUECHER, -10, "Bildung"),
-        ("Urlaub", -120, "Reisen"),
-        ("Kleidung", -40, "Shopping"),
-        ("Versicherung", -80, "Versicherung"),
-        ("Haushalt", -35, "Haushalt"),
-    ],
-    "carla": [
-        ("Supermarkt", -200, "Lebensmittel"),
-        ("Miete", -950, "Wohnen"),
-        ("Kino", -30, "Freizeit"),
-        ("Fahrrad", -150, MOBILITAET),
-        ("Strom", -80, "Versorgung"),
-        ("Arzt", -60, "Gesundheit"),
-        (BUECHER, -35, "Bildung"),
-        ("Konzert", -45, "Freizeit"),
-        ("Urlaub", -250, "Reisen"),
-        ("Kleidung", -90, "Shopping"),
-        ("Versicherung", -120, "Versicherung"),
-        ("Haushalt", -50, "Haushalt"),
-    ],
-}
-DEMO_USERS = [
-    ("alice", "alice123", [
-        ("Gehalt", 2100, "Einnahmen"),
-        ("Supermarkt", -120, "Lebensmittel"),
-        ("Miete", -800, "Wohnen"),
-        ("Fitnessstudio", -40, "Freizeit"),
-        ("Bahn", -60, MOBILITAET),
-    ]),
-    ("bob", "bob123", [
-        ("Gehalt", 1800, "Einnahmen"),
-        ("Restaurant", -55, "Freizeit"),
-        ("Miete", -650, "Wohnen"),
-        ("Handyvertrag", -25, "Kommunikation"),
-        ("Benzin", -90, MOBILITAET),
-    ]),
-    ("carla", "carla123", [
-        ("Gehalt", 2500, "Einnahmen"),
-        ("Supermarkt", -200, "Lebensmittel"),
-        ("Miete", -950, "Wohnen"),
-        ("Kino", -30, "Freizeit"),
-        ("Fahrrad", -150, MOBILITAET),
-    ]),
-]
-
-def _create_demo_users(session, pwd_context, demo_users_all):
-    from .models_user import User
-    from sqlmodel import select
-    for username, pw in demo_users_all:
-        user = session.exec(select(User).where(User.username == username)).first()
-        if not user:
-            user = User(username=username, hashed_password=pwd_context.hash(pw), is_active=True)
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-
-def _seed_monthly_transactions(session, demo_users_all, income_map, income_categories, expense_map, start, today):
-    from .models_user import User
-    from .models import Transaction
-    from sqlmodel import select
-    from calendar import monthrange
-    import random
-    for username, _ in demo_users_all:
-        user = session.exec(select(User).where(User.username == username)).first()
-        if not user:
-            continue
-        tx_count = session.exec(select(Transaction).where(Transaction.user_id == user.id, Transaction.date <= today, Transaction.date >= start)).all()
-        if len(tx_count) > 50:
-            continue
-        d = start
-        while d <= today:
-            random.seed(f"{username}-{d.year}-{d.month}-income")
-            income_cat = random.choice(income_categories)
-            income_var = income_map[username] + random.randint(-100, 100)
-            session.add(Transaction(
-                date=d.replace(day=1),
-                amount=income_var,
-                description=income_cat[0],
-                category=income_cat[1],
-                user_id=user.id
-            ))
-            expense_list = expense_map[username][:]
-            random.seed(f"{username}-{d.year}-{d.month}-expenses")
-            random.shuffle(expense_list)
-            for i, (desc, amount, cat) in enumerate(expense_list):
-                day = min(3 + i*2, monthrange(d.year, d.month)[1])
-                random.seed(f"{username}-{d.year}-{d.month}-{i}")
-                expense_var = amount + random.randint(-20, 20)
-                session.add(Transaction(
-                    date=d.replace(day=day),
-                    amount=expense_var,
-                    description=desc,
-                    category=cat,
-                    user_id=user.id
-                ))
-            if d.month == 12:
-                d = d.replace(year=d.year+1, month=1)
-            else:
-                d = d.replace(month=d.month+1)
-        session.commit()
-
-def _seed_example_transactions(session, pwd_context, demo_users):
-    from .models_user import User
-    from .models import Transaction
-    from sqlmodel import select
-    from datetime import date, timedelta
-    for username, pw, txs in demo_users:
-        user = session.exec(select(User).where(User.username == username)).first()
-        if not user:
-            user = User(username=username, hashed_password=pwd_context.hash(pw), is_active=True)
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-        tx_count = session.exec(select(Transaction).where(Transaction.user_id == user.id)).all()
-        if not tx_count:
-            today = date.today()
-            for i, (desc, amount, cat) in enumerate(txs):
-                t = Transaction(date=today-timedelta(days=i*3), amount=amount, description=desc, category=cat, user_id=user.id)
-                session.add(t)
-            session.commit()
-
-def _seed_demo_user_if_needed(session, pwd_context):
-    from .models_user import User
-    from .models import Transaction
-    from sqlmodel import select
-    from datetime import date, timedelta
-    user = session.exec(select(User).where(User.username == "demo")).first()
-    if not user:
-        user = User(username="demo", hashed_password=pwd_context.hash("demo123"), is_active=True)
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-    tx_count = session.exec(select(Transaction).where(Transaction.user_id == user.id)).all()
-    if not tx_count:
-        today = date.today()
-        beispiel = [
-            Transaction(date=today, amount=1200, description="Gehalt", category="Einnahmen", user_id=user.id),
-            Transaction(date=today-timedelta(days=2), amount=-50, description="Supermarkt", category="Lebensmittel", user_id=user.id),
-            Transaction(date=today-timedelta(days=5), amount=-700, description="Miete", category="Wohnen", user_id=user.id),
-            Transaction(date=today-timedelta(days=8), amount=-30, description="Internet", category="Kommunikation", user_id=user.id),
-            Transaction(date=today-timedelta(days=10), amount=-80, description="Tanken", category=MOBILITAET, user_id=user.id),
-        ]
-        for t in beispiel:
-            session.add(t)
-        session.commit()
+startup_imported()
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def record_query(seconds: float):
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels) -> str:
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + stats.db_seconds
+
+    def clear(self):
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.queries.clear()
+            self.db_seconds.clear()
+
+    def _histogram(self, lines: List[str], name: str, values: Dict[Tuple[str, str], Histogram]):
+        for (method, route), h in sorted(values.items()):
+            for bound, count in zip(h.buckets, h.counts):
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, le=_number(bound))} {count}")
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {h.count}")
+            lines.append(f"{name}_sum{_labels(method=method, route=route)} {_number(h.sum)}")
+            lines.append(f"{name}_count{_labels(method=method, route=route)} {h.count}")
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_in_flight Laufende HTTP-Anfragen",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_requests_total HTTP-Anfragen nach Route und Status",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            lines += ["# HELP http_request_duration_seconds Antwortzeit je Route",
+                      "# TYPE http_request_duration_seconds histogram"]
+            self._histogram(lines, "http_request_duration_seconds", self.latency)
+            lines += ["# HELP db_queries_per_request SQL-Statements je Anfrage",
+                      "# TYPE db_queries_per_request histogram"]
+            self._histogram(lines, "db_queries_per_request", self.queries)
+            lines += ["# HELP db_query_seconds_total Summierte DB-Zeit je Route",
+                      "# TYPE db_query_seconds_total counter"]
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"db_query_seconds_total{_labels(method=method, route=route)} {_number(seconds)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    db_ms = stats.db_seconds * 1000
+    total_ms = total * 1000
+    return (f'db;dur={db_ms:.2f};desc="{stats.queries} queries", '
+            f"app;dur={max(total_ms - db_ms, 0):.2f}, total;dur={total_ms:.2f}")
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: Metrics = metrics, timing_header: Optional[bool] = None):
+        self.app = app
+        self.registry = registry
+        self.timing_header = timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing_header = SERVER_TIMING if self.timing_header is None else self.timing_header
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+        self.registry.started()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timing_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(stats, time.perf_counter() - started).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.registry.finished(scope["method"], getattr(route, "path", UNMATCHED_ROUTE), status,
+                                   time.perf_counter() - started, stats)
+            current_request.reset(token)
@@ -0,0 +1,149 @@
+from datetime import date, datetime, timezone
+from typing import Callable, List, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from .db import engine, init_db
+from . import change_tracking, rollup, search
+from .content_hash import content_hash
+from .models import ImportJob, UserDataVersion
+from .passwords import password_hasher
+
+BACKFILL_BATCH_SIZE = 5000
+
+MIGRATIONS_TABLE = "schema_migrations"
+DEFAULT_ADMIN = ("admin", "admin123")
+
+
+def _user_is_admin(conn: Connection):
+    cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info('user')").fetchall()]
+    if 'is_admin' not in cols:
+        conn.exec_driver_sql("ALTER TABLE user ADD COLUMN is_admin INTEGER DEFAULT 0")
+        conn.exec_driver_sql("UPDATE user SET is_admin = 0 WHERE is_admin IS NULL")
+
+
+def _transaction_indexes(conn: Connection):
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_transaction_user_date_id ON "transaction" (user_id, date, id)')
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_transaction_user_category_date ON "transaction" (user_id, category, date)')
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_transaction_user_date_category_amount ON "transaction" (user_id, date, category, amount)')
+
+
+def _rollup_backfill(conn: Connection):
+    with Session(bind=conn) as session:
+        rollup.rebuild(session)
+        session.flush()
+
+
+def _transaction_fts(conn: Connection):
+    search.create_fts(conn)
+
+
+def _transaction_change_tracking(conn: Connection):
+    change_tracking.create_tracking(conn)
+
+
+def _transaction_content_hash(conn: Connection):
+    cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info('transaction')")]
+    if 'content_hash' not in cols:
+        conn.exec_driver_sql('ALTER TABLE "transaction" ADD COLUMN content_hash BIGINT')
+    last_id = 0
+    while True:
+        rows = conn.exec_driver_sql(
+            'SELECT id, date, amount, description, category FROM "transaction" '
+            'WHERE content_hash IS NULL AND id > ? ORDER BY id LIMIT ?', (last_id, BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        conn.exec_driver_sql('UPDATE "transaction" SET content_hash = ? WHERE id = ?', [
+            (content_hash(date.fromisoformat(d), amount, description, category), id_)
+            for id_, d, amount, description, category in rows
+        ])
+        last_id = rows[-1][0]
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_transaction_user_content_hash ON "transaction" (user_id, content_hash)')
+
+
+def _user_data_version(conn: Connection):
+    UserDataVersion.__table__.create(conn, checkfirst=True)
+
+
+def _import_jobs(conn: Connection):
+    ImportJob.__table__.create(conn, checkfirst=True)
+
+
+def _default_admin(conn: Connection):
+    # früher bei jedem Start geprüft (und ggf. bcrypt-gehasht); jetzt einmalig
+    username, password = DEFAULT_ADMIN
+    if conn.exec_driver_sql("SELECT 1 FROM user WHERE username = ?", (username,)).first() is None:
+        conn.exec_driver_sql(
+            "INSERT INTO user (username, hashed_password, is_active, is_admin) VALUES (?, ?, 1, 1)",
+            (username, password_hasher.hash(password)),
+        )
+
+
+def _transaction_modified_default(conn: Connection):
+    # ersetzt den AFTER-INSERT-Trigger, der jede eingefügte Zeile ein zweites Mal schrieb
+    change_tracking.rebuild_with_modified_default(conn)
+
+
+def _import_job_lease(conn: Connection):
+    cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info('importjob')")]
+    for col in ("owner", "heartbeat_at"):
+        if col not in cols:
+            conn.exec_driver_sql(f"ALTER TABLE importjob ADD COLUMN {col} VARCHAR")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "user_is_admin", _user_is_admin),
+    (2, "transaction_composite_indexes", _transaction_indexes),
+    (3, "monthly_category_rollup_backfill", _rollup_backfill),
+    (4, "transaction_fts", _transaction_fts),
+    (5, "transaction_change_tracking", _transaction_change_tracking),
+    (6, "transaction_content_hash", _transaction_content_hash),
+    (7, "user_data_version", _user_data_version),
+    (8, "import_jobs", _import_jobs),
+    (9, "default_admin", _default_admin),
+    (10, "transaction_modified_default", _transaction_modified_default),
+    (11, "import_job_lease", _import_job_lease),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def applied_versions(conn: Connection) -> set:
+    conn.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TEXT NOT NULL)"
+    )
+    return {row[0] for row in conn.exec_driver_sql(f"SELECT version FROM {MIGRATIONS_TABLE}")}
+
+
+def schema_current(bind: Engine = engine) -> bool:
+    """Eine Abfrage statt create_all und Migrationslauf: ist die letzte Migration schon eingespielt?"""
+    try:
+        with bind.connect() as conn:
+            return conn.exec_driver_sql(f"SELECT MAX(version) FROM {MIGRATIONS_TABLE}").scalar() == LATEST_VERSION
+    except OperationalError:
+        return False
+
+
+def migrate(bind: Engine = engine) -> List[str]:
+    with bind.begin() as conn:
+        done = applied_versions(conn)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        with bind.begin() as conn:
+            step(conn)
+            conn.exec_driver_sql(
+                f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.now(timezone.utc).isoformat()),
+            )
+        applied.append(f"{version:04d}_{name}")
+    return applied
+
+
+if __name__ == "__main__":
+    init_db()
+    applied = migrate()
+    print("Angewendet: " + ", ".join(applied) if applied else "Schema ist aktuell.")
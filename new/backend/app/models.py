@@ -1,6 +1,10 @@
 from typing import Optional
 from datetime import date
+from sqlalchemy import BigInteger, Index, UniqueConstraint, event, text
 from sqlmodel import SQLModel, Field
+from .content_hash import column_default, content_hash
+
+NOW_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
 
 class TransactionBase(SQLModel):
     date: date
@@ -10,13 +14,74 @@ class TransactionBase(SQLModel):
     merchant: Optional[str] = None
     category: Optional[str] = None
 
-from typing import TYPE_CHECKING
-if TYPE_CHECKING:
-    from .models_user import User
+from .models_user import User  # registriert die user-Tabelle für den Fremdschlüssel
 
 class Transaction(TransactionBase, table=True):
+    __table_args__ = (
+        Index("ix_transaction_user_date_id", "user_id", "date", "id"),
+        Index("ix_transaction_user_category_date", "user_id", "category", "date"),
+        Index("ix_transaction_user_date_category_amount", "user_id", "date", "category", "amount"),
+        Index("ix_transaction_user_content_hash", "user_id", "content_hash"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    content_hash: Optional[int] = Field(default=None, sa_type=BigInteger, exclude=True, sa_column_kwargs={"default": column_default})
+    modified_at: Optional[str] = Field(default=None, exclude=True, sa_column_kwargs={"server_default": text(NOW_MS)})
+
+@event.listens_for(Transaction, "before_update")
+def _refresh_content_hash(mapper, connection, target: Transaction):
+    target.content_hash = content_hash(target.date, target.amount, target.description, target.category)
 
 class TransactionCreate(TransactionBase):
     pass
+
+class MonthlyCategoryRollup(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    month: str = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    currency: str = Field(primary_key=True)
+    total: float = 0.0
+    count: int = 0
+    min_amount: float = 0.0
+    max_amount: float = 0.0
+    sum_squares: float = 0.0
+
+class UserDataVersion(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    version: int = 0
+
+class ImportJob(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    filename: str
+    status: str = Field(default="queued", index=True)
+    field_map: str
+    total_bytes: int = 0
+    bytes_done: int = 0
+    rows: int = 0
+    imported: int = 0
+    skipped_duplicates: int = 0
+    errors: int = 0
+    error_details: str = "[]"
+    elapsed: float = 0.0
+    cancel_requested: bool = False
+    message: Optional[str] = None
+    created_at: str
+    finished_at: Optional[str] = None
+    # Worker, der den Auftrag per bedingtem UPDATE übernommen hat, und sein letzter Lebenszeichen-Zeitpunkt
+    owner: Optional[str] = None
+    heartbeat_at: Optional[str] = None
+
+class PlausibilityFinding(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("transaction_id", "rule_id"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    transaction_id: int = Field(foreign_key="transaction.id", index=True)
+    rule_id: str
+    severity: str
+    description: str = ""
+
+class PlausibilityScanState(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    last_scan_at: str
+    rules_version: str
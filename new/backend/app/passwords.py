@@ -0,0 +1,90 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = HASH_WORKERS):
+        self.rounds = rounds
+        self.workers = workers
+        self._context: Optional["CryptContext"] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def context(self) -> "CryptContext":
+        # passlib (und das bcrypt-Backend) erst beim ersten Hash/Verify laden, nicht beim Start
+        if self._context is None:
+            with self._lock:
+                if self._context is None:
+                    from passlib.context import CryptContext
+                    self._context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=self.rounds)
+        return self._context
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _record(self, op: str, wait: float, run: float):
+        with self._lock:
+            self._pending -= 1
+            m = self._metrics.setdefault(op, {"count": 0, "wait_total_s": 0.0, "run_total_s": 0.0, "run_max_s": 0.0})
+            m["count"] += 1
+            m["wait_total_s"] += wait
+            m["run_total_s"] += run
+            m["run_max_s"] = max(m["run_max_s"], run)
+
+    def _submit(self, op: str, fn: Callable, *args) -> Future:
+        enqueued = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+
+        def run():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(op, started - enqueued, time.perf_counter() - started)
+
+        return self._pool().submit(run)
+
+    def hash(self, password: str) -> str:
+        return self._submit("hash", self.context.hash, password).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._submit("verify", self.context.verify, password, hashed).result()
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return self._submit("verify", self.context.verify_and_update, password, hashed).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit("hash", self.context.hash, password))
+
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(self._submit("verify", self.context.verify_and_update, password, hashed))
+
+    def stats(self) -> dict:
+        with self._lock:
+            ops = {
+                op: {**m, "avg_run_ms": round(m["run_total_s"] / m["count"] * 1000, 2),
+                     "avg_wait_ms": round(m["wait_total_s"] / m["count"] * 1000, 2)}
+                for op, m in self._metrics.items()
+            }
+            return {"rounds": self.rounds, "workers": self.workers, "queue_depth": self._pending, **ops}
+
+
+password_hasher = PasswordHasher()
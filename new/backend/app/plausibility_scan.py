@@ -0,0 +1,252 @@
+import argparse
+import ast
+import hashlib
+import operator
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+
+from .change_tracking import MODIFIED_AT, now_ms
+from .db import engine, init_db
+from .models import PlausibilityFinding, PlausibilityScanState, Transaction
+from .models_user import User
+from .rules_engine import RULE_SET, Rule
+
+SCAN_BATCH_SIZE = 20000
+SCAN_FIELDS = ("date", "amount", "currency", "description", "merchant", "category")
+NUMERIC_FIELDS = {"amount"}
+TEXT_FIELDS = {"currency", "description", "merchant", "category"}
+
+ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+              ast.Div: operator.truediv, ast.Mod: operator.mod, ast.FloorDiv: operator.floordiv}
+DIVISIONS = (ast.Div, ast.Mod, ast.FloorDiv)
+ORDERING = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge}
+EQUALITY = {ast.Eq: operator.eq, ast.NotEq: operator.ne}
+
+Columns = Dict[str, np.ndarray]
+Compiled = Tuple[Callable[[Columns], object], str]
+
+
+class NotVectorizable(Exception):
+    pass
+
+
+def _truth(compiled: Compiled) -> Callable[[Columns], object]:
+    fn, kind = compiled
+    if kind == "num":
+        return lambda cols: fn(cols) != 0
+    if kind == "text":
+        return lambda cols: (fn(cols) != None) & (fn(cols) != '')  # noqa: E711  elementweiser Vergleich
+    if kind == "bool":
+        return fn
+    return lambda cols: bool(fn(cols))
+
+
+def _compile(node: ast.AST) -> Compiled:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if value is None:
+            kind = "none"
+        elif isinstance(value, bool):
+            kind = "bool"
+        elif isinstance(value, (int, float)):
+            kind = "num"
+        elif isinstance(value, str):
+            kind = "text"
+        else:
+            raise NotVectorizable()
+        return (lambda cols: value), kind
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in NUMERIC_FIELDS:
+            return (lambda cols: cols[name]), "num"
+        if name in TEXT_FIELDS:
+            return (lambda cols: cols[name]), "text"
+        raise NotVectorizable()
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile(node.operand)
+        if isinstance(node.op, ast.Not):
+            truth = _truth(operand)
+            return (lambda cols: np.logical_not(truth(cols))), "bool"
+        if operand[1] != "num":
+            raise NotVectorizable()
+        fn = operand[0]
+        if isinstance(node.op, ast.USub):
+            return (lambda cols: -fn(cols)), "num"
+        return fn, "num"
+    if isinstance(node, ast.BinOp):
+        op = ARITHMETIC.get(type(node.op))
+        left, right = _compile(node.left), _compile(node.right)
+        if op is None or left[1] != "num" or right[1] != "num":
+            raise NotVectorizable()
+        if isinstance(node.op, DIVISIONS) and not (isinstance(node.right, ast.Constant) and node.right.value != 0):
+            raise NotVectorizable()
+        lf, rf = left[0], right[0]
+        return (lambda cols: op(lf(cols), rf(cols))), "num"
+    if isinstance(node, ast.Call):
+        if not (isinstance(node.func, ast.Name) and node.func.id == "abs" and len(node.args) == 1 and not node.keywords):
+            raise NotVectorizable()
+        arg = _compile(node.args[0])
+        if arg[1] != "num":
+            raise NotVectorizable()
+        fn = arg[0]
+        return (lambda cols: np.abs(fn(cols))), "num"
+    if isinstance(node, ast.BoolOp):
+        truths = [_truth(_compile(v)) for v in node.values]
+        reduce = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return (lambda cols: reduce.reduce([np.broadcast_to(t(cols), cols["_shape"]) for t in truths])), "bool"
+    if isinstance(node, ast.Compare):
+        parts = []
+        left = _compile(node.left)
+        for op_node, right_node in zip(node.ops, node.comparators):
+            right = _compile(right_node)
+            parts.append(_compare(op_node, left, right))
+            left = right
+        if len(parts) == 1:
+            return parts[0], "bool"
+        return (lambda cols: np.logical_and.reduce([p(cols) for p in parts])), "bool"
+    raise NotVectorizable()
+
+
+def _compare(op_node: ast.cmpop, left: Compiled, right: Compiled) -> Callable[[Columns], object]:
+    (lf, lk), (rf, rk) = left, right
+    if type(op_node) in ORDERING and lk == rk == "num":
+        op = ORDERING[type(op_node)]
+    elif type(op_node) in EQUALITY and lk == rk and lk in ("num", "text"):
+        op = EQUALITY[type(op_node)]
+    elif isinstance(op_node, (ast.Is, ast.IsNot)) and {lk, rk} == {"text", "none"}:
+        op = operator.eq if isinstance(op_node, ast.Is) else operator.ne
+    else:
+        raise NotVectorizable()
+    return lambda cols: op(lf(cols), rf(cols))
+
+
+def vectorize(rule: Rule) -> Optional[Callable[[Columns], np.ndarray]]:
+    try:
+        truth = _truth(_compile(ast.parse(rule.condition, mode="eval").body))
+    except NotVectorizable:
+        return None
+    return lambda cols: np.broadcast_to(np.asarray(truth(cols), dtype=bool), cols["_shape"])
+
+
+def rules_version(rules: List[Rule]) -> str:
+    raw = repr([(r.id, r.condition, r.severity, r.description) for r in rules])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def batch_columns(rows: list) -> Columns:
+    n = len(rows)
+    cols: Columns = {"_shape": (n,), "amount": np.fromiter((r[2] for r in rows), dtype=np.float64, count=n)}
+    for i, field in enumerate(SCAN_FIELDS, start=1):
+        if field in TEXT_FIELDS:
+            cols[field] = np.array([r[i] for r in rows], dtype=object)
+    return cols
+
+
+def evaluate_batch(rows: list, plan: List[Tuple[Rule, Optional[Callable]]]) -> List[Tuple[int, Rule]]:
+    hits = []
+    cols = batch_columns(rows)
+    for rule, vectorized in plan:
+        started = time.perf_counter_ns()
+        if vectorized is not None:
+            with np.errstate(all="ignore"):
+                mask = vectorized(cols)
+            matched = np.flatnonzero(mask)
+            rule.evaluations += len(rows)
+            rule.hits += len(matched)
+            rule.total_ns += time.perf_counter_ns() - started
+            hits += [(rows[i][0], rule) for i in matched]
+        else:
+            for row in rows:
+                if rule.eval(dict(zip(SCAN_FIELDS, row[1:]))):
+                    hits.append((row[0], rule))
+    return hits
+
+
+def _scope(user_id: int, from_date: Optional[date], to_date: Optional[date], since: Optional[str]) -> list:
+    conditions = [Transaction.user_id == user_id]
+    if from_date:
+        conditions.append(Transaction.date >= from_date)
+    if to_date:
+        conditions.append(Transaction.date <= to_date)
+    if since:
+        conditions.append(MODIFIED_AT >= since)
+    return conditions
+
+
+def scan_user(session: Session, user_id: int, from_date: Optional[date] = None, to_date: Optional[date] = None,
+              full: bool = False, batch_size: Optional[int] = None) -> dict:
+    started = time.perf_counter()
+    rules = RULE_SET.current()
+    version = rules_version(rules)
+    ranged = bool(from_date or to_date)
+    state = session.get(PlausibilityScanState, user_id)
+    incremental = not full and not ranged and state is not None and state.rules_version == version
+    scan_started_at = now_ms(session.connection())
+    scope = _scope(user_id, from_date, to_date, state.last_scan_at if incremental else None)
+
+    f = PlausibilityFinding
+    session.execute(delete(f.__table__).where(f.transaction_id.in_(select(Transaction.id).where(*scope))))
+    session.execute(delete(f.__table__).where(f.user_id == user_id, f.transaction_id.not_in(
+        select(Transaction.id).where(Transaction.user_id == user_id))))
+
+    plan = [(rule, vectorize(rule)) for rule in rules]
+    statement = select(Transaction.id, *[getattr(Transaction, c) for c in SCAN_FIELDS]).where(*scope).order_by(Transaction.id)
+    scanned = found = 0
+    result = session.execute(statement.execution_options(yield_per=batch_size or SCAN_BATCH_SIZE))
+    for rows in result.partitions():
+        scanned += len(rows)
+        hits = evaluate_batch(rows, plan)
+        if hits:
+            session.execute(insert(f.__table__), [
+                {"user_id": user_id, "transaction_id": tid, "rule_id": rule.id, "severity": rule.severity, "description": rule.description}
+                for tid, rule in hits
+            ])
+            found += len(hits)
+
+    if not ranged:
+        session.merge(PlausibilityScanState(user_id=user_id, last_scan_at=scan_started_at, rules_version=version))
+    session.commit()
+    return {
+        "mode": "incremental" if incremental else "full",
+        "scanned": scanned,
+        "findings": found,
+        "vectorized_rules": [r.id for r, v in plan if v is not None],
+        "row_rules": [r.id for r, v in plan if v is None],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def list_findings(session: Session, user_id: int, severity: Optional[str] = None, limit: int = 500) -> List[PlausibilityFinding]:
+    f = PlausibilityFinding
+    statement = select(f).where(f.user_id == user_id)
+    if severity:
+        statement = statement.where(f.severity == severity)
+    return session.exec(statement.order_by(f.transaction_id.desc()).limit(limit)).all()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Plausibilitätsregeln über den gesamten Bestand eines Nutzers prüfen.")
+    parser.add_argument("--user-id", type=int, default=None, help="ohne Angabe: alle regulären Nutzer")
+    parser.add_argument("--from-date", type=date.fromisoformat, default=None)
+    parser.add_argument("--to-date", type=date.fromisoformat, default=None)
+    parser.add_argument("--full", action="store_true", help="Watermark ignorieren und alles neu prüfen")
+    args = parser.parse_args(argv)
+    init_db()
+    with Session(engine) as session:
+        if args.user_id is not None:
+            user_ids = [args.user_id]
+        else:
+            user_ids = session.exec(select(User.id).where(User.is_admin == False)).all()  # noqa: E712
+        for user_id in user_ids:
+            summary = scan_user(session, user_id, args.from_date, args.to_date, args.full)
+            print(f"User {user_id}: {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .models_user import User
+
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+
+USER_FIELDS = ("id", "username", "hashed_password", "is_active", "is_admin")
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.tokens = TTLCache(maxsize, ttl)
+        self.users = TTLCache(maxsize, ttl)
+        self._tokens_by_user: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def user_for_token(self, token: str) -> Optional[User]:
+        snapshot = self.tokens.get(token)
+        return User(**snapshot) if snapshot is not None else None
+
+    def user_for_username(self, username: str) -> Optional[User]:
+        snapshot = self.users.get(username)
+        return User(**snapshot) if snapshot is not None else None
+
+    def remember(self, user: User, token: Optional[str] = None, token_expires_at: Optional[float] = None):
+        snapshot = {f: getattr(user, f) for f in USER_FIELDS}
+        self.users.set(user.username, snapshot)
+        if token is not None:
+            ttl = token_expires_at - time.time() if token_expires_at is not None else None
+            self.tokens.set(token, snapshot, ttl)
+            with self._lock:
+                live = {t for t in self._tokens_by_user.get(user.username, ()) if t in self.tokens}
+                live.add(token)
+                self._tokens_by_user[user.username] = live
+
+    def invalidate(self, username: str):
+        self.users.pop(username)
+        with self._lock:
+            tokens = self._tokens_by_user.pop(username, set())
+        for token in tokens:
+            self.tokens.pop(token)
+
+    def clear(self):
+        self.tokens.clear()
+        self.users.clear()
+        with self._lock:
+            self._tokens_by_user.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"tokens": self.tokens.stats(), "users": self.users.stats()}
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,67 @@
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy.engine import Connection
+from sqlmodel import select
+
+from .db import engine, init_db
+from .balance import flows_statement
+from .exporter import export_statement
+from .dedup import duplicate_condition
+from .importer import existing_hashes_statement
+from .models import Transaction
+from .listing import build_filters, count_total_statement, encode_cursor, list_statement, page_statement, LISTABLE_FIELDS
+from .search import search_statement
+from .stats import monthly_category_statement
+
+PROBLEM_MARKERS = ("SCAN ", "USE TEMP B-TREE")
+VIRTUAL_TABLE_MARKER = "VIRTUAL TABLE"
+# Fensterfunktionen lesen ihr eigenes Zwischenergebnis (Co-Routine), das ist kein Tabellenscan
+SUBQUERY_SCAN = "SCAN (subquery-"
+
+
+def hot_queries(user_id: int = 1) -> Dict[str, object]:
+    fields = list(LISTABLE_FIELDS)
+    cursor = encode_cursor(date(2024, 6, 1), 1000)
+    return {
+        "list": list_statement(user_id, []),
+        "list_category": list_statement(user_id, build_filters(user_id, category="Freizeit")),
+        "list_date_range": list_statement(user_id, build_filters(user_id, from_date="2024-01-01", to_date="2024-12-31")),
+        "list_search": list_statement(user_id, build_filters(user_id, q="super")),
+        "search_ranked": search_statement(user_id, "super markt"),
+        "list_amount": list_statement(user_id, build_filters(user_id, min_amount=-100, max_amount=0)),
+        "page_first": page_statement(user_id, [], 100, None, fields),
+        "page_cursor": page_statement(user_id, [], 100, cursor, fields),
+        "page_category_cursor": page_statement(user_id, build_filters(user_id, category="Freizeit"), 100, cursor, fields),
+        "count": count_total_statement(user_id, build_filters(user_id, from_date="2024-01-01")),
+        "export": export_statement(user_id, date(2024, 1, 1), date(2024, 12, 31)),
+        "export_category": export_statement(user_id, category="Freizeit"),
+        "import_dedup": existing_hashes_statement(user_id, {1234567890, -987654321}),
+        "duplicate_delete": select(Transaction.id).where(Transaction.user_id == user_id, duplicate_condition(user_id)),
+        "stats_monthly_category": monthly_category_statement(user_id, 2024),
+        "stats_balance_day": flows_statement(user_id, "day", date(2024, 1, 1), date(2024, 12, 31)),
+    }
+
+
+def explain(conn: Connection, statement) -> List[str]:
+    sql = str(statement.compile(conn.engine, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+
+def plan_problems(conn: Connection, user_id: int = 1) -> Dict[str, List[str]]:
+    problems = {}
+    for name, statement in hot_queries(user_id).items():
+        bad = [line for line in explain(conn, statement)
+               if line.startswith(PROBLEM_MARKERS) and VIRTUAL_TABLE_MARKER not in line and not line.startswith(SUBQUERY_SCAN)]
+        if bad:
+            problems[name] = bad
+    return problems
+
+
+if __name__ == "__main__":
+    init_db()
+    with engine.connect() as conn:
+        for name, statement in hot_queries().items():
+            print(f"{name}:")
+            for line in explain(conn, statement):
+                print(f"  {line}")
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+
+from .migrations import LATEST_VERSION
+
+RESPONSE_CACHE_BYTES = int(os.environ.get("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024)))
+# einzelne Antworten über diesem Anteil des Budgets werden nicht gecacht, damit sie nicht alles verdrängen
+RESPONSE_CACHE_MAX_ENTRY_SHARE = 0.25
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+CacheKey = Tuple[int, int, str, Tuple[Tuple[str, str], ...]]
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self._lock:
+            body = self._data.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key: CacheKey, body: bytes):
+        if len(body) > self.max_bytes * RESPONSE_CACHE_MAX_ENTRY_SHARE:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in [k for k in self._data if k[0] == user_id]:
+                self.size -= len(self._data.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._data), "bytes": self.size, "max_bytes": self.max_bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "not_modified": self.not_modified}
+
+
+response_cache = ResponseCache()
+
+
+def cache_key(user_id: int, version: int, request: Request) -> CacheKey:
+    return user_id, version, request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+
+def release_id() -> str:
+    """Stand der Auslieferung: APP_RELEASE (z. B. Git-SHA) oder ein Hash der App-Quellen, dazu die Schemaversion."""
+    release = os.environ.get("APP_RELEASE")
+    if not release:
+        digest = hashlib.blake2b(digest_size=8)
+        for path in sorted(Path(__file__).parent.glob("*.py")):
+            digest.update(path.read_bytes())
+        release = digest.hexdigest()
+    return f"{release}/{LATEST_VERSION}"
+
+
+# geht in jedes ETag ein: nach einem Deploy mit anderem Antwortformat oder Schema passen alte ETags nicht mehr
+ETAG_RELEASE = release_id()
+
+
+def etag_for(key: CacheKey) -> str:
+    return '"' + hashlib.blake2b(repr((ETAG_RELEASE, key)).encode(), digest_size=16).hexdigest() + '"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates: Iterable[str] = (c.strip() for c in if_none_match.split(","))
+    return any(c == "*" or c == etag for c in candidates)
+
+
+def render_json(content) -> bytes:
+    # orjson kodiert Listen, Dicts, Zahlen und Datumswerte selbst; nur Modelle u. Ä. gehen über jsonable_encoder
+    return orjson.dumps(content, default=jsonable_encoder)
+
+
+async def conditional_json(request: Request, user_id: int, version: int, compute: Callable, cache: ResponseCache = response_cache) -> Response:
+    key = cache_key(user_id, version, request)
+    etag = etag_for(key)
+    headers = {"ETag": etag, **CACHE_HEADERS}
+    if _matches(request.headers.get("if-none-match"), etag):
+        cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    body = cache.get(key)
+    if body is None:
+        # Laden und Serialisieren großer Antworten im Threadpool, sonst steht währenddessen die Event-Loop
+        body = await run_in_threadpool(lambda: render_json(compute()))
+        cache.set(key, body)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,182 @@
+import argparse
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from .db import engine, init_db
+from .models import MonthlyCategoryRollup, Transaction
+
+UNKNOWN_CATEGORY = "Unbekannt"
+DEFAULT_CURRENCY = "EUR"
+CHECK_TOLERANCE = 1e-6
+
+Bucket = Tuple[str, str, str]
+
+
+def bucket_of(d: date, category: Optional[str], currency: Optional[str]) -> Bucket:
+    return d.strftime("%Y-%m"), category or UNKNOWN_CATEGORY, currency or DEFAULT_CURRENCY
+
+
+def snapshot(t: Transaction) -> dict:
+    return {"date": t.date, "amount": t.amount, "category": t.category, "currency": t.currency}
+
+
+def collect(rows: Iterable[dict]) -> Dict[Bucket, list]:
+    deltas: Dict[Bucket, list] = {}
+    for row in rows:
+        key = bucket_of(row["date"], row.get("category"), row.get("currency"))
+        amount = row["amount"]
+        d = deltas.get(key)
+        if d is None:
+            deltas[key] = [amount, 1, amount, amount, amount * amount]
+        else:
+            d[0] += amount
+            d[1] += 1
+            d[2] = min(d[2], amount)
+            d[3] = max(d[3], amount)
+            d[4] += amount * amount
+    return deltas
+
+
+def add_rows(session: Session, user_id: int, rows: Iterable[dict]):
+    deltas = collect(rows)
+    if not deltas:
+        return
+    table = MonthlyCategoryRollup.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.month, table.c.category, table.c.currency],
+        set_={
+            "total": table.c.total + statement.excluded.total,
+            "count": table.c.count + statement.excluded.count,
+            "min_amount": func.min(table.c.min_amount, statement.excluded.min_amount),
+            "max_amount": func.max(table.c.max_amount, statement.excluded.max_amount),
+            "sum_squares": table.c.sum_squares + statement.excluded.sum_squares,
+        },
+    )
+    session.execute(statement, [
+        {"user_id": user_id, "month": m, "category": c, "currency": cur,
+         "total": d[0], "count": d[1], "min_amount": d[2], "max_amount": d[3], "sum_squares": d[4]}
+        for (m, c, cur), d in deltas.items()
+    ])
+
+
+def remove_rows(session: Session, user_id: int, rows: Iterable[dict]):
+    """Zieht bereits gelöschte bzw. geänderte Zeilen ab; der Aufrufer muss vorher flushen."""
+    deltas = collect(rows)
+    if not deltas:
+        return
+    r = MonthlyCategoryRollup
+    session.execute(
+        update(r.__table__)
+        .where(r.user_id == bindparam("b_user"), r.month == bindparam("b_month"),
+               r.category == bindparam("b_category"), r.currency == bindparam("b_currency"))
+        .values(total=r.total - bindparam("d_total"), count=r.count - bindparam("d_count"),
+                sum_squares=r.sum_squares - bindparam("d_sum_squares")),
+        [{"b_user": user_id, "b_month": m, "b_category": c, "b_currency": cur,
+          "d_total": d[0], "d_count": d[1], "d_sum_squares": d[4]}
+         for (m, c, cur), d in deltas.items()],
+    )
+    table = r.__table__
+    for bucket, d in deltas.items():
+        key = rollup_key(user_id, bucket)
+        stored = session.execute(select(r.count, r.min_amount, r.max_amount).where(*key)).first()
+        if stored is None:
+            continue
+        if stored.count <= 0:
+            session.execute(delete(table).where(*key))
+        elif d[2] <= stored.min_amount or d[3] >= stored.max_amount:
+            low, high = session.execute(
+                select(func.min(Transaction.amount), func.max(Transaction.amount)).where(*bucket_filter(user_id, bucket))
+            ).one()
+            session.execute(update(table).where(*key).values(min_amount=low, max_amount=high))
+
+
+def rollup_key(user_id: int, bucket: Bucket) -> list:
+    r = MonthlyCategoryRollup
+    month, category, currency = bucket
+    return [r.user_id == user_id, r.month == month, r.category == category, r.currency == currency]
+
+
+def bucket_filter(user_id: int, bucket: Bucket) -> list:
+    month, category, currency = bucket
+    year, mon = (int(p) for p in month.split("-"))
+    start = date(year, mon, 1)
+    end = date(year + 1, 1, 1) if mon == 12 else date(year, mon + 1, 1)
+    if category == UNKNOWN_CATEGORY:
+        cat = or_(Transaction.category.is_(None), Transaction.category == '', Transaction.category == UNKNOWN_CATEGORY)
+    else:
+        cat = Transaction.category == category
+    return [Transaction.user_id == user_id, Transaction.date >= start, Transaction.date < end, cat, Transaction.currency == currency]
+
+
+def aggregate_statement(user_id: Optional[int] = None):
+    month = func.strftime('%Y-%m', Transaction.date)
+    category = func.coalesce(func.nullif(Transaction.category, ''), UNKNOWN_CATEGORY)
+    amount = Transaction.amount
+    statement = select(
+        Transaction.user_id, month, category, Transaction.currency,
+        func.sum(amount), func.count(), func.min(amount), func.max(amount), func.sum(amount * amount),
+    ).where(Transaction.user_id.is_not(None))
+    if user_id is not None:
+        statement = statement.where(Transaction.user_id == user_id)
+    return statement.group_by(Transaction.user_id, month, category, Transaction.currency)
+
+
+def rebuild(session: Session, user_id: Optional[int] = None) -> int:
+    r = MonthlyCategoryRollup
+    clear = delete(r.__table__)
+    if user_id is not None:
+        clear = clear.where(r.user_id == user_id)
+    session.execute(clear)
+    columns = ["user_id", "month", "category", "currency", "total", "count", "min_amount", "max_amount", "sum_squares"]
+    result = session.execute(insert(r.__table__).from_select(columns, aggregate_statement(user_id)))
+    return result.rowcount
+
+
+def _differs(a: float, b: float) -> bool:
+    return abs(a - b) > CHECK_TOLERANCE * max(1.0, abs(a), abs(b))
+
+
+def check(session: Session, user_id: Optional[int] = None) -> List[dict]:
+    r = MonthlyCategoryRollup
+    expected = {tuple(row[:4]): tuple(row[4:]) for row in session.exec(aggregate_statement(user_id))}
+    statement = select(r.user_id, r.month, r.category, r.currency, r.total, r.count, r.min_amount, r.max_amount, r.sum_squares)
+    if user_id is not None:
+        statement = statement.where(r.user_id == user_id)
+    actual = {tuple(row[:4]): tuple(row[4:]) for row in session.exec(statement)}
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want, got = expected.get(key), actual.get(key)
+        if want is None or got is None or want[1] != got[1] or any(_differs(a, b) for a, b in zip(want, got)):
+            mismatches.append({
+                "user_id": key[0], "month": key[1], "category": key[2], "currency": key[3],
+                "expected": want, "actual": got,
+            })
+    return mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Monats-Rollup neu aufbauen oder gegen die Transaktionen prüfen.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+    init_db()
+    with Session(engine) as session:
+        if args.command == "rebuild":
+            count = rebuild(session, args.user_id)
+            session.commit()
+            print(f"{count} Rollup-Zeilen neu aufgebaut.")
+            return 0
+        mismatches = check(session, args.user_id)
+    for m in mismatches:
+        print(f"Abweichung: {m}")
+    print("Rollup konsistent." if not mismatches else f"{len(mismatches)} Abweichungen gefunden.")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
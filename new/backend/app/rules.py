@@ -2,13 +2,10 @@ from .models import Transaction
 from typing import List
 from .rules_engine import evaluate_rules
 
+RULE_FIELDS = ("date", "amount", "currency", "description", "merchant", "category")
+
 def check_plausibility(t: Transaction) -> List[dict]:
-    ctx = {
-        "date": t.date,
-        "amount": t.amount,
-        "currency": t.currency,
-        "description": t.description,
-        "merchant": t.merchant,
-        "category": t.category,
-    }
-    return evaluate_rules(ctx)
+    return check_values({f: getattr(t, f) for f in RULE_FIELDS})
+
+def check_values(values: dict) -> List[dict]:
+    return evaluate_rules({f: values.get(f) for f in RULE_FIELDS})
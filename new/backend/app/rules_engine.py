@@ -1,8 +1,53 @@
-from typing import List, Dict, Any
-import yaml
+from typing import List, Dict, Any, Optional
+import ast
+import logging
+import threading
+import time
 from pathlib import Path
 
 RULE_FILE = Path(__file__).parent / "rules_config.yaml"
+RELOAD_CHECK_INTERVAL = 1.0
+
+CONTEXT_FIELDS = {"date", "amount", "currency", "description", "merchant", "category"}
+SAFE_FUNCTIONS = {
+    "abs": abs, "any": any, "all": all, "len": len, "min": min, "max": max,
+    "round": round, "str": str, "float": float, "int": int, "bool": bool,
+}
+SAFE_METHODS = {"lower", "upper", "strip", "startswith", "endswith", "isdigit"}
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.FloorDiv,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.IfExp, ast.Call, ast.Attribute, ast.Name, ast.Load, ast.Store, ast.Constant,
+    ast.List, ast.Tuple, ast.Set, ast.GeneratorExp, ast.ListComp, ast.comprehension,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RuleError(ValueError):
+    def __init__(self, rule_id: str, message: str):
+        super().__init__(f"Regel '{rule_id}': {message}")
+        self.rule_id = rule_id
+
+
+def compile_condition(rule_id: str, condition: str):
+    try:
+        tree = ast.parse(condition, mode="eval")
+    except SyntaxError as e:
+        raise RuleError(rule_id, f"Syntaxfehler in Bedingung: {e.msg}")
+    bound = {t.id for node in ast.walk(tree) if isinstance(node, ast.comprehension) for t in ast.walk(node.target) if isinstance(t, ast.Name)}
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise RuleError(rule_id, f"nicht erlaubter Ausdruck '{type(node).__name__}'")
+        if isinstance(node, ast.Name) and node.id not in CONTEXT_FIELDS | SAFE_FUNCTIONS.keys() | bound:
+            raise RuleError(rule_id, f"unbekannter Name '{node.id}'")
+        if isinstance(node, ast.Attribute) and node.attr not in SAFE_METHODS:
+            raise RuleError(rule_id, f"nicht erlaubte Methode '{node.attr}'")
+        if isinstance(node, ast.Call) and not isinstance(node.func, (ast.Name, ast.Attribute)):
+            raise RuleError(rule_id, "nur direkte Funktionsaufrufe erlaubt")
+    return compile(tree, f"<rule {rule_id}>", "eval")
+
 
 class Rule:
     def __init__(self, id: str, description: str, condition: str, severity: str):
@@ -10,25 +55,106 @@ class Rule:
         self.description = description
         self.condition = condition
         self.severity = severity
+        self.code = compile_condition(id, condition)
+        self.evaluations = 0
+        self.hits = 0
+        self.errors = 0
+        self.total_ns = 0
 
     def eval(self, context: Dict[str, Any]) -> bool:
+        started = time.perf_counter_ns()
         try:
-            return bool(eval(self.condition, {}, context))
-        except Exception:
-            return False
+            hit = bool(eval(self.code, {"__builtins__": {}, **SAFE_FUNCTIONS, **context}))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Regel %s konnte nicht ausgewertet werden: %s", self.id, e)
+            hit = False
+        self.total_ns += time.perf_counter_ns() - started
+        self.evaluations += 1
+        self.hits += hit
+        return hit
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "evaluations": self.evaluations,
+            "hits": self.hits,
+            "errors": self.errors,
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "avg_us": round(self.total_ns / self.evaluations / 1e3, 3) if self.evaluations else None,
+        }
 
 
-def load_rules() -> List[Rule]:
-    data = yaml.safe_load(RULE_FILE.read_text())
-    return [Rule(r['id'], r.get('description',''), r['condition'], r.get('severity','info')) for r in data.get('rules', [])]
+def load_rules(path: Path = RULE_FILE) -> List[Rule]:
+    import yaml  # wie die Regeln selbst erst bei der ersten Auswertung laden
+    data = yaml.safe_load(path.read_text()) or {}
+    rules = []
+    for r in data.get('rules', []):
+        if 'id' not in r or 'condition' not in r:
+            raise RuleError(r.get('id', '?'), "'id' und 'condition' sind Pflichtfelder")
+        rules.append(Rule(r['id'], r.get('description', ''), r['condition'], r.get('severity', 'info')))
+    return rules
+
+
+class RuleSet:
+    """Regeldatei wird erst bei der ersten Auswertung geladen und kompiliert, nicht beim Import."""
+
+    def __init__(self, path: Path = RULE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = 0
+        self._checked = 0.0
+        self._rules: Optional[List[Rule]] = None
+
+    def _load(self) -> List[Rule]:
+        with self._lock:
+            if self._rules is None:
+                self._mtime = self.path.stat().st_mtime_ns
+                self._checked = time.monotonic()
+                self._rules = load_rules(self.path)
+            return self._rules
+
+    @property
+    def rules(self) -> List[Rule]:
+        return self._rules if self._rules is not None else self._load()
+
+    def current(self) -> List[Rule]:
+        rules = self.rules
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_CHECK_INTERVAL:
+            self._checked = now
+            self.reload_if_changed()
+            return self._rules
+        return rules
+
+    def reload_if_changed(self) -> bool:
+        if self._rules is None:
+            self._load()
+            return False
+        import yaml
+        with self._lock:
+            mtime = self.path.stat().st_mtime_ns
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                self._rules = load_rules(self.path)
+            except (RuleError, yaml.YAMLError) as e:
+                logger.error("Regeldatei %s nicht neu geladen, alte Regeln bleiben aktiv: %s", self.path, e)
+                return False
+            logger.info("Regeldatei %s neu geladen (%d Regeln)", self.path, len(self._rules))
+            return True
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [r.stats() for r in self.rules]
 
 
-RULES = load_rules()
+RULE_SET = RuleSet()
 
 
-def evaluate_rules(context: Dict[str, Any]) -> List[Dict[str, str]]:
+def evaluate_rules(context: Dict[str, Any], rules: Optional[List[Rule]] = None) -> List[Dict[str, str]]:
     issues = []
-    for r in RULES:
+    for r in rules if rules is not None else RULE_SET.current():
         if r.eval(context):
             issues.append({"id": r.id, "description": r.description, "severity": r.severity})
     return issues
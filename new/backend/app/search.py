@@ -0,0 +1,92 @@
+import re
+from typing import List, Optional
+
+from sqlalchemy import DDL, column, event, func, literal_column, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from .models import Transaction
+
+FTS_TABLE = "transaction_fts"
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+MAX_SEARCH_RESULTS = 200
+
+fts = table(FTS_TABLE, column("rowid"), column("description"), column("merchant"), column("category"))
+fts_ref = literal_column(FTS_TABLE)
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, merchant, category,
+        content='transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS transaction_fts_ai AFTER INSERT ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, merchant, category)
+        VALUES (new.id, new.description, new.merchant, new.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transaction_fts_ad AFTER DELETE ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, merchant, category)
+        VALUES ('delete', old.id, old.description, old.merchant, old.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transaction_fts_au AFTER UPDATE OF description, merchant, category ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, merchant, category)
+        VALUES ('delete', old.id, old.description, old.merchant, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, description, merchant, category)
+        VALUES (new.id, new.description, new.merchant, new.category);
+    END""",
+]
+
+for statement in FTS_DDL:
+    event.listen(Transaction.__table__, "after_create", DDL(statement))
+event.listen(Transaction.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def create_fts(conn: Connection):
+    for statement in FTS_DDL:
+        conn.exec_driver_sql(statement)
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_query(q: str) -> Optional[str]:
+    terms = re.findall(r"\w+", q or "")
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def match_filter(user_id: int, q: str):
+    query = match_query(q)
+    if query is None:
+        # ohne Wortzeichen kann FTS nichts finden: wie bisher als Teilstring in der Beschreibung suchen
+        return Transaction.description.ilike(f"%{q}%")
+    # Treffer schon in der Unterabfrage auf den Nutzer einschränken, statt die Index-Treffer aller Nutzer zurückzugeben;
+    # eigener Alias, damit die Unterabfrage nicht mit der äußeren Transaktionstabelle korreliert
+    matched = aliased(Transaction, name="matched")
+    return Transaction.id.in_(
+        select(matched.id).select_from(fts).join(matched, matched.id == fts.c.rowid)
+        .where(matched.user_id == user_id, fts_ref.op("MATCH")(query))
+    )
+
+
+def search_statement(user_id: int, q: str, limit: int = MAX_SEARCH_RESULTS):
+    snippet = func.snippet(fts_ref, -1, SNIPPET_OPEN, SNIPPET_CLOSE, "…", 10)
+    rank = literal_column(f"{FTS_TABLE}.rank")
+    return (
+        select(Transaction, rank.label("rank"), snippet.label("snippet"))
+        .select_from(fts)
+        .join(Transaction, Transaction.id == fts.c.rowid)
+        .where(fts_ref.op("MATCH")(match_query(q)), Transaction.user_id == user_id)
+        .order_by(rank)
+        .limit(limit)
+    )
+
+
+def search(session: Session, user_id: int, q: str, limit: int = MAX_SEARCH_RESULTS) -> List[dict]:
+    if match_query(q) is None:
+        return []
+    results = []
+    for t, rank, snippet in session.exec(search_statement(user_id, q, limit)):
+        results.append({"transaction": t, "rank": rank, "snippet": snippet})
+    return results
@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# bewusst nur Standardbibliothek: das Modul misst den Import von app.main und darf ihn nicht vorwegnehmen
+IMPORT_STARTED = time.perf_counter()
+MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", "1.5"))
+# werden erst bei Bedarf geladen und dürfen nach Start und erster Anfrage nicht importiert sein
+LAZY_MODULES = ("app.seeding", "app.columnar_io", "pyarrow", "passlib.context", "yaml")
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.migrations: List[str] = []
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = seconds
+
+    @contextmanager
+    def step(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def report(self) -> dict:
+        return {"phases": {k: round(v, 4) for k, v in self.phases.items()}, "total": round(sum(self.phases.values()), 4),
+                "migrations": self.migrations}
+
+    def log(self):
+        phases = ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in self.phases.items())
+        logger.info("Start in %.0f ms (%s)", sum(self.phases.values()) * 1000, phases)
+
+    def render(self) -> str:
+        lines = ["# HELP app_startup_seconds Dauer der Startphasen dieses Prozesses",
+                 "# TYPE app_startup_seconds gauge"]
+        lines += [f'app_startup_seconds{{phase="{k}"}} {v!r}' for k, v in self.phases.items()]
+        return "\n".join(lines) + "\n"
+
+
+startup_profile = StartupProfile()
+
+
+def imported():
+    """Am Ende von app.main aufrufen: Importzeit seit dem ersten Import dieses Moduls."""
+    startup_profile.record("import", time.perf_counter() - IMPORT_STARTED)
+
+
+def prepare_database():
+    """Schema nur anlegen/migrieren, wenn es nicht aktuell ist; im Normalfall bleibt es bei einer Abfrage."""
+    from .db import init_db
+    from .migrations import migrate, schema_current
+    if schema_current():
+        return
+    if not MIGRATE_ON_STARTUP:
+        raise RuntimeError("Datenbankschema ist nicht aktuell: zuerst `python -m app.migrations` ausführen")
+    init_db()
+    startup_profile.migrations = migrate()
+
+
+async def _asgi_cold_start(app) -> dict:
+    """Lifespan-Start und eine erste Anfrage direkt über ASGI, ohne Testclient oder Server."""
+    lifespan_in: asyncio.Queue = asyncio.Queue()
+    lifespan_out: asyncio.Queue = asyncio.Queue()
+    await lifespan_in.put({"type": "lifespan.startup"})
+    lifespan = asyncio.ensure_future(app({"type": "lifespan", "asgi": {"version": "3.0"}}, lifespan_in.get, lifespan_out.put))
+    message = await lifespan_out.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(message.get("message", "Start fehlgeschlagen"))
+
+    started = time.perf_counter()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": "/api/health", "raw_path": b"/api/health", "root_path": "", "query_string": b"", "headers": [],
+             "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80)}
+    await app(scope, receive, send)
+    first_request = time.perf_counter() - started
+
+    await lifespan_in.put({"type": "lifespan.shutdown"})
+    await lifespan_out.get()
+    await lifespan
+    return {"status": sent[0]["status"], "first_request": first_request}
+
+
+def measure_in_process() -> dict:
+    """Im frischen Prozess ausführen: Import, Start und erste Anfrage messen."""
+    started = time.perf_counter()
+    from .main import app
+    result = asyncio.run(_asgi_cold_start(app))
+    ready = time.perf_counter() - started
+    report = startup_profile.report()
+    report["phases"]["first_request"] = round(result["first_request"], 4)
+    return {**report, "ready": round(ready, 4), "status": result["status"],
+            "lazy_modules_loaded": [m for m in LAZY_MODULES if m in sys.modules]}
+
+
+def cold_start(env: Optional[Dict[str, str]] = None) -> dict:
+    """Misst einen Kaltstart in einem neuen Interpreter; `process` enthält auch dessen Start."""
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "app.startup", "--child"], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env={**os.environ, **(env or {})},
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    report["process"] = round(time.perf_counter() - started, 4)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Kaltstart messen: Import, Datenbank, Start, erste Anfrage.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Sekunden bis zur ersten Antwort")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        # Modul läuft hier als __main__; das Profil steckt im von app.main importierten app.startup
+        from app.startup import measure_in_process
+        print(json.dumps(measure_in_process()))
+        return 0
+    reports = [cold_start() for _ in range(args.runs)]
+    for i, report in enumerate(reports, 1):
+        phases = ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in report["phases"].items())
+        print(f"Lauf {i}: bereit nach {report['ready'] * 1000:.0f} ms, Prozess {report['process'] * 1000:.0f} ms ({phases})")
+        if report["migrations"]:
+            print(f"  Migrationen: {', '.join(report['migrations'])}")
+    best = min(r["ready"] for r in reports)
+    print(f"Bester Kaltstart {best * 1000:.0f} ms, Budget {args.budget * 1000:.0f} ms")
+    return 0 if best <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from .models import MonthlyCategoryRollup
+
+
+def monthly_category_statement(user_id: int, year: Optional[int] = None):
+    r = MonthlyCategoryRollup
+    statement = select(r.month, r.category, func.sum(r.total)).where(r.user_id == user_id)
+    if year:
+        statement = statement.where(r.month >= f"{year:04d}-01", r.month <= f"{year:04d}-12")
+    return statement.group_by(r.month, r.category).order_by(r.month, r.category)
+
+
+def monthly_category_stats(session: Session, user_id: int, year: Optional[int] = None) -> dict:
+    statement = monthly_category_statement(user_id, year)
+    items = [{"month": m, "category": c, "sum": round(s, 2)} for m, c, s in session.exec(statement)]
+    return with_totals(items)
+
+
+def with_totals(items: list) -> dict:
+    # Beträge auf Cent gerundet, damit Rollup- und Spaltenpfad trotz anderer Summationsreihenfolge gleich antworten
+    month_totals = defaultdict(float)
+    category_totals = defaultdict(float)
+    for item in items:
+        month_totals[item["month"]] += item["sum"]
+        category_totals[item["category"]] += item["sum"]
+    return {
+        "items": items,
+        "month_totals": [{"month": m, "sum": round(s, 2)} for m, s in month_totals.items()],
+        "category_totals": [{"category": c, "sum": round(s, 2)} for c, s in sorted(category_totals.items(), key=lambda kv: kv[1])],
+    }
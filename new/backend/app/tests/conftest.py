@@ -1,11 +1,33 @@
+import os
+import tempfile
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_finance.db")
+os.environ.setdefault("IMPORT_SPOOL_DIR", tempfile.mkdtemp(prefix="import_spool_"))
+
 import pytest
+from fastapi.testclient import TestClient
 from sqlmodel import SQLModel
 from ..db import engine, init_db
+from ..main import app
+from ..analytics import snapshots
+from ..principal_cache import principal_cache
+from ..response_cache import response_cache
 
 
 @pytest.fixture(autouse=True)
 def prepare_db():
+    principal_cache.clear()
+    response_cache.clear()
+    snapshots.clear()
     SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
     yield
     SQLModel.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def auth_headers():
+    client = TestClient(app)
+    r = client.post("/api/auth/register", json={"username": "tester", "password": "tester123"})
+    assert r.status_code == 200
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
@@ -0,0 +1,111 @@
+import io
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from ..main import app
+from ..db import engine
+from .. import analytics
+from ..analytics import ColumnarSnapshot, SnapshotStore, load_snapshot, monthly_category_stats, snapshots
+from ..generator import generate
+from ..models_user import User
+from ..stats import monthly_category_stats as sql_monthly_category_stats
+
+client = TestClient(app)
+
+TX = {"date": "2024-03-01", "amount": -12.35, "description": "Bäcker", "category": "Essen"}
+
+
+def both_paths(user_id, year=None):
+    with Session(engine) as session:
+        return monthly_category_stats(session, user_id, year), sql_monthly_category_stats(session, user_id, year)
+
+
+def test_columnar_stats_match_sql_on_generated_data():
+    generate(users=2, years=3, seed=3, prefix="col")
+    with Session(engine) as session:
+        ids = session.exec(select(User.id).where(User.username.startswith("col"))).all()
+    for user_id in ids:
+        for year in (None, 2016, 2017, 2030):
+            columnar, sql = both_paths(user_id, year)
+            assert columnar == sql
+    assert snapshots.stats()["users"] == 2 and snapshots.stats()["loads"] == 2
+
+
+def test_mutations_apply_deltas_without_reload(auth_headers):
+    client.post("/api/transactions", json=TX, headers=auth_headers)
+    client.get("/api/stats/monthly-category", headers=auth_headers)
+    loads = snapshots.stats()["loads"]
+
+    created = client.post("/api/transactions", json={**TX, "date": "2024-04-02", "category": None}, headers=auth_headers).json()["transaction"]
+    client.patch(f"/api/transactions/{created['id']}", json={**TX, "date": "2023-12-24", "amount": 99.99, "category": "Geschenke"}, headers=auth_headers)
+    client.post("/api/transactions", json={**TX, "amount": 0.1}, headers=auth_headers)
+    first_id = client.get("/api/transactions", headers=auth_headers).json()[0]["id"]
+    client.delete(f"/api/transactions/{first_id}", headers=auth_headers)
+
+    data = client.get("/api/stats/monthly-category", headers=auth_headers).json()
+    assert snapshots.stats()["loads"] == loads and snapshots.stats()["deltas"] == 4
+    assert snapshots.stats()["compactions"] == 1
+    assert data == both_paths(1)[1]
+    assert [(i["month"], i["category"]) for i in data["items"]] == [("2023-12", "Geschenke"), ("2024-03", "Essen")]
+
+
+def test_bulk_changes_trigger_reload(auth_headers):
+    client.get("/api/stats/monthly-category", headers=auth_headers)
+    loads = snapshots.stats()["loads"]
+    csv = "date,amount,description,category\n2024-05-01,-5.0,Kiosk,Essen\n2024-05-01,-5.0,Kiosk,Essen\n"
+    client.post("/api/transactions/import", files={"file": ("t.csv", io.BytesIO(csv.encode()), "text/csv")}, headers=auth_headers)
+    data = client.get("/api/stats/monthly-category", headers=auth_headers).json()
+    assert snapshots.stats()["loads"] == loads + 1
+    assert data["items"] == [{"month": "2024-05", "category": "Essen", "sum": -5.0}]
+
+
+def test_store_evicts_least_recently_used_under_budget():
+    generate(users=3, years=1, seed=5, prefix="lru")
+    with Session(engine) as session:
+        ids = session.exec(select(User.id).where(User.username.startswith("lru")).order_by(User.id)).all()
+        sizes = [load_snapshot(session, user_id).nbytes for user_id in ids]
+        store = SnapshotStore(max_bytes=sizes[0] + max(sizes[1], sizes[2]))
+        for user_id in ids[:2]:
+            store.get(session, user_id, 0)
+        store.get(session, ids[0], 0)
+        store.get(session, ids[2], 0)
+    assert store.stats()["users"] == 2 and store.stats()["evictions"] == 1
+    assert store.stats()["hits"] == 1
+    assert set(store._data) == {ids[0], ids[2]}
+
+
+def test_delta_with_version_gap_drops_snapshot():
+    store = SnapshotStore()
+    store._data[1] = ColumnarSnapshot.from_rows(3, [(1, 19723, -1.0, "Essen")])
+    store.apply(1, 5, deleted_ids=[1])
+    assert store.stats()["users"] == 0
+
+
+def test_deltas_are_appended_and_merged_on_read(monkeypatch):
+    store = SnapshotStore()
+    base = ColumnarSnapshot.from_rows(1, [(1, 19723, -1.0, "Essen"), (3, 19724, -3.0, None), (5, 19754, 5.0, "Essen")])
+    store._data[7] = base
+
+    class Row:
+        def __init__(self, id, d, amount, category):
+            self.id, self.date, self.amount, self.category = id, d, amount, category
+
+    store.apply(7, 2, upserts=[Row(4, date(2024, 1, 10), -4.0, "Neu")])
+    store.apply(7, 3, upserts=[Row(3, date(2024, 2, 1), -30.0, "Essen")], deleted_ids=[1])
+    pending = store._data[7]
+    # Spalten werden geteilt, nicht kopiert
+    assert pending.ids is base.ids and len(pending.pending) == 3
+
+    merged = store.get(None, 7, 3)
+    assert merged.ids.tolist() == [3, 4, 5] and not merged.pending
+    assert merged.monthly_category() == [
+        {"month": "2024-01", "category": "Neu", "sum": -4.0},
+        {"month": "2024-02", "category": "Essen", "sum": -25.0},
+    ]
+    assert store.get(None, 7, 3) is merged
+    assert store.stats()["compactions"] == 1 and store.stats()["hits"] == 1
+
+    monkeypatch.setattr(analytics, "MAX_PENDING_CHANGES", 1)
+    store.apply(7, 4, deleted_ids=[3, 4])
+    assert store.stats()["users"] == 0
@@ -5,11 +5,11 @@ from datetime import date
 client = TestClient(app)
 
 def test_health():
-    r = client.get("/health")
+    r = client.get("/api/health")
     assert r.status_code == 200
     assert r.json()["status"] == "ok"
 
-def test_create_transaction():
+def test_create_transaction(auth_headers):
     payload = {
         "date": date.today().isoformat(),
         "amount": 123.45,
@@ -18,7 +18,7 @@ def test_create_transaction():
         "merchant": "Example Store",
         "category": "shopping"
     }
-    r = client.post("/transactions", json=payload)
+    r = client.post("/api/transactions", json=payload, headers=auth_headers)
     assert r.status_code == 200
     data = r.json()
     assert "transaction" in data
@@ -5,16 +5,16 @@ from datetime import date
 client = TestClient(app)
 
 def test_health_v2():
-    r = client.get("/health")
+    r = client.get("/api/health")
     assert r.status_code == 200
 
 
-def test_create_transaction_v2():
+def test_create_transaction_v2(auth_headers):
     payload = {
         "date": date.today().isoformat(),
         "amount": 50.0
     }
-    r = client.post("/transactions", json=payload)
+    r = client.post("/api/transactions", json=payload, headers=auth_headers)
     assert r.status_code == 200
     data = r.json()
     assert "transaction" in data
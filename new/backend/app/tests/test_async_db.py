@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import httpx
+from .. import main
+from ..db import async_engine, async_read_engine
+from ..loadtest import compare, prepare_user
+
+
+async def pragmas(bind):
+    async with bind.connect() as conn:
+        return [(await conn.exec_driver_sql(f"PRAGMA {name}")).scalar() for name in ("journal_mode", "query_only")]
+
+
+def test_async_engines_share_sqlite_profile():
+    assert asyncio.run(pragmas(async_engine)) == ["wal", 0]
+    assert asyncio.run(pragmas(async_read_engine)) == ["wal", 1]
+
+
+def test_loadtest_compares_both_paths():
+    token = prepare_user(200)
+    results = asyncio.run(compare(token, requests=16, concurrency=8, workers=1, paths=["/api/transactions?limit=50"]))
+    assert [r["mode"] for r in results] == ["sync", "async"]
+    assert all(r["requests"] == 16 and r["rps"] > 0 for r in results)
+
+
+def test_slow_listing_does_not_block_event_loop(monkeypatch):
+    token = prepare_user(10)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def slow_rows(*args, **kwargs):
+        time.sleep(0.5)
+        return []
+
+    monkeypatch.setattr(main, "list_rows", slow_rows)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            listing = asyncio.ensure_future(client.get("/api/transactions", headers=headers))
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            await client.get("/api/health")
+            health = time.perf_counter() - started
+            assert (await listing).status_code == 200
+        return health
+
+    # Laden und Serialisieren laufen im Threadpool; die Event-Loop bedient andere Anfragen weiter
+    assert asyncio.run(run()) < 0.3
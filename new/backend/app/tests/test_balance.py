@@ -0,0 +1,90 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from ..main import app
+from ..db import engine
+from ..balance import balance_series, flows_statement, lttb
+from ..generator import generate
+
+client = TestClient(app)
+
+
+def seed(headers):
+    rows = [
+        ("2024-01-01", 1000.0), ("2024-01-01", -20.0), ("2024-01-03", -30.5),
+        ("2024-01-08", -49.5), ("2024-02-01", 1000.0), ("2024-02-29", -200.0),
+    ]
+    for d, amount in rows:
+        client.post("/api/transactions", json={"date": d, "amount": amount, "category": "Test"}, headers=headers)
+
+
+def test_daily_running_balance(auth_headers):
+    seed(auth_headers)
+    data = client.get("/api/stats/balance", headers=auth_headers).json()
+    assert data["resolution"] == "day" and data["opening_balance"] == 0 and data["total_points"] == 5
+    assert data["points"][:2] == [
+        {"period": "2024-01-01", "income": 1000.0, "expense": -20.0, "net": 980.0, "balance": 980.0},
+        {"period": "2024-01-03", "income": 0.0, "expense": -30.5, "net": -30.5, "balance": 949.5},
+    ]
+    assert data["points"][-1]["balance"] == 1700.0
+
+
+def test_week_and_month_resolution_with_range(auth_headers):
+    seed(auth_headers)
+    weeks = client.get("/api/stats/balance", params={"resolution": "week"}, headers=auth_headers).json()["points"]
+    assert [p["period"] for p in weeks] == ["2024-01-01", "2024-01-08", "2024-01-29", "2024-02-26"]
+    assert weeks[0]["net"] == 949.5
+    months = client.get("/api/stats/balance", params={"resolution": "month", "from_date": "2024-01-02"}, headers=auth_headers).json()
+    assert months["opening_balance"] == 980.0
+    assert months["points"] == [
+        {"period": "2024-01-01", "income": 0.0, "expense": -80.0, "net": -80.0, "balance": 900.0},
+        {"period": "2024-02-01", "income": 1000.0, "expense": -200.0, "net": 800.0, "balance": 1700.0},
+    ]
+    r = client.get("/api/stats/balance", params={"from_date": "2024-03-01", "to_date": "2024-01-01"}, headers=auth_headers)
+    assert r.status_code == 400
+    assert client.get("/api/stats/balance", params={"resolution": "year"}, headers=auth_headers).status_code == 422
+
+
+def test_balance_matches_python_replay_on_generated_data():
+    generate(users=1, years=2, seed=11, prefix="bal")
+    with Session(engine) as session:
+        result = balance_series(session, 1, "day")
+        rows = session.connection().exec_driver_sql('SELECT date, amount FROM "transaction" WHERE user_id = 1 ORDER BY date').all()
+    daily = {}
+    for d, amount in rows:
+        daily[d] = daily.get(d, 0.0) + amount
+    balance = np.cumsum(list(daily.values()))
+    assert [p["period"] for p in result["points"]] == list(daily)
+    assert np.allclose([p["balance"] for p in result["points"]], balance, atol=0.01)
+
+
+def test_max_points_downsamples_and_keeps_totals():
+    generate(users=1, years=3, seed=12, prefix="lttb")
+    with Session(engine) as session:
+        full = balance_series(session, 1, "day")
+        reduced = balance_series(session, 1, "day", max_points=100)
+    assert full["total_points"] > 500 and reduced["total_points"] == full["total_points"]
+    points = reduced["points"]
+    assert len(points) == 100
+    assert points[0]["period"] == full["points"][0]["period"] and points[-1] == {**full["points"][-1], **{k: points[-1][k] for k in ("income", "expense", "net")}}
+    for key in ("income", "expense", "net"):
+        assert abs(sum(p[key] for p in points) - sum(p[key] for p in full["points"])) < 0.05
+    by_period = {p["period"]: p["balance"] for p in full["points"]}
+    assert all(by_period[p["period"]] == p["balance"] for p in points)
+
+
+def test_lttb_keeps_extremes():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[500], y[700] = 100.0, -100.0
+    keep = lttb(x, y, 20)
+    assert len(keep) == 20 and keep[0] == 0 and keep[-1] == 999
+    assert {500, 700} <= set(keep.tolist())
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_flows_statements_order_explicitly():
+    for resolution in ("day", "week", "month"):
+        statement = flows_statement(1, resolution)
+        # äußeres ORDER BY, nicht nur das der Fensterfunktion
+        assert len(statement._order_by_clauses) == 1
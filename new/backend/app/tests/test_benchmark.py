@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from ..main import app
+from ..db import engine
+from ..benchmark import (BENCH_PASSWORD, ITERATIONS, compare, measure_serialization, parse_size, remove_imported_rows, run_scenarios,
+                         serialization_paths, summarize)
+from ..generator import generate
+from ..models import Transaction
+from ..models_user import User
+from .. import data_version, rollup
+from ..response_cache import response_cache
+
+client = TestClient(app)
+
+
+def test_sizes_and_percentiles():
+    assert [parse_size(s) for s in ("10k", "100K", "1m", "2500")] == [10_000, 100_000, 1_000_000, 2500]
+    stats = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0)
+    assert stats == {"n": 100, "p50_ms": 50.0, "p95_ms": 95.0, "p99_ms": 99.0, "rps": 50.0}
+
+
+def test_compare_flags_only_relevant_regressions():
+    def report(p95, rps):
+        return {"results": {"10k": {"testclient": {"list": {"p50_ms": 5.0, "p95_ms": p95, "p99_ms": 9.0, "rps": rps}}}}}
+    assert compare(report(10.0, 100.0), report(10.0, 100.0)) == []
+    assert compare(report(10.5, 90.0), report(10.0, 100.0)) == []
+    assert compare(report(1.2, 100.0), report(0.5, 100.0)) == []
+    found = compare(report(20.0, 50.0), report(10.0, 100.0), threshold=0.25)
+    assert {(r["scenario"], r["metric"]) for r in found} == {("list", "p95_ms"), ("list", "rps")}
+    assert compare(report(20.0, 50.0), {"results": {}}) == []
+
+
+def test_scenarios_run_in_process_and_leave_dataset_unchanged():
+    generate(users=1, years=1, prefix="bench", password=BENCH_PASSWORD, rows_per_user=300)
+    with Session(engine) as session:
+        before = len(session.exec(select(Transaction.id)).all())
+    hits, max_bytes = response_cache.hits, response_cache.max_bytes
+    results = run_scenarios(client, repeat=0.01)
+    assert set(results) == set(ITERATIONS)
+    # gemessen wird die Abfrage, nicht der Antwort-Cache
+    assert response_cache.hits == hits and response_cache.max_bytes == max_bytes
+    assert all(r["n"] == 1 and r["p99_ms"] >= r["p50_ms"] > 0 for r in results.values())
+    with Session(engine) as session:
+        version = data_version.current(session, session.exec(select(User.id)).first())
+    assert remove_imported_rows() > 0
+    with Session(engine) as session:
+        assert len(session.exec(select(Transaction.id)).all()) == before
+        assert rollup.check(session) == []
+        assert data_version.current(session, session.exec(select(User.id)).first()) > version
+
+
+def test_serialization_paths_agree():
+    generate(users=1, years=1, prefix="bench", password=BENCH_PASSWORD, rows_per_user=300)
+    with Session(engine) as session:
+        user_id = session.exec(select(User.id)).first()
+    results = measure_serialization(serialization_paths(user_id), iterations=1)
+    assert set(results) == {"orm", "fast", "ndjson"}
+    assert results["orm"]["bytes"] == results["fast"]["bytes"]
+    assert all(r["peak_mb"] >= 0 and r["n"] == 1 for r in results.values())
@@ -0,0 +1,119 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from ..main import app
+from ..db import engine
+from ..metrics import metrics
+from .. import rollup
+
+client = TestClient(app)
+
+
+def create(headers, items, **extra):
+    return client.post("/api/transactions/bulk", json={"items": items, **extra}, headers=headers)
+
+
+def items(n, **fields):
+    return [{"date": f"2024-01-{1 + i % 28:02d}", "amount": -(i + 1.5), "description": f"Kauf {i}", "category": "Sonstiges", **fields} for i in range(n)]
+
+
+def rollup_consistent():
+    with Session(engine) as session:
+        return rollup.check(session) == []
+
+
+def test_create_many_returns_ids_in_order(auth_headers):
+    r = create(auth_headers, items(3))
+    assert r.status_code == 200
+    data = r.json()
+    assert data["created"] == 3 and data["rejected"] == 0
+    ids = [i["id"] for i in data["items"]]
+    assert [i["index"] for i in data["items"]] == [0, 1, 2]
+    listed = {t["id"]: t["description"] for t in client.get("/api/transactions", headers=auth_headers).json()}
+    assert [listed[i] for i in ids] == ["Kauf 0", "Kauf 1", "Kauf 2"]
+    assert rollup_consistent()
+    # Inhalts-Hash wird auch beim Massen-Insert gesetzt
+    create(auth_headers, items(1))
+    dry = client.delete("/api/transactions/duplicates", params={"dry_run": True}, headers=auth_headers).json()
+    assert dry["deleted"] == 1
+
+
+def test_create_many_rejects_implausible_items(auth_headers):
+    batch = items(2) + [{"date": "2024-02-01", "amount": 20000.0, "description": "Auto"}]
+    data = create(auth_headers, batch, plausibility="reject").json()
+    assert (data["created"], data["rejected"]) == (2, 1)
+    assert data["items"][2]["status"] == "rejected"
+    assert data["items"][2]["plausibility_issues"][0]["id"] == "very_large"
+    data = create(auth_headers, batch[2:], plausibility="report").json()
+    assert data["items"][0]["status"] == "created" and data["items"][0]["plausibility_issues"]
+
+
+def test_update_many_by_ids_and_filter(auth_headers):
+    ids = [i["id"] for i in create(auth_headers, items(4)).json()["items"]]
+    r = client.post("/api/auth/register", json={"username": "andere", "password": "andere123"})
+    other = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    foreign = create(other, items(1)).json()["items"][0]["id"]
+
+    data = client.patch("/api/transactions/bulk", json={"ids": ids[:2] + [foreign, 99999], "set": {"category": "Freizeit"}}, headers=auth_headers).json()
+    assert (data["matched"], data["updated"]) == (2, 2)
+    assert {i["id"]: i["status"] for i in data["items"]} == {ids[0]: "updated", ids[1]: "updated", foreign: "not_found", 99999: "not_found"}
+
+    data = client.patch("/api/transactions/bulk", json={"filter": {"description": "Kauf 3"}, "set": {"category": "Freizeit", "description": "Kauf 0", "date": "2024-01-01", "amount": -1.5}}, headers=auth_headers).json()
+    assert data["updated"] == 1
+    stats = client.get("/api/stats/monthly-category", headers=auth_headers).json()
+    assert {(i["category"], i["sum"]) for i in stats["items"]} == {("Freizeit", -5.5), ("Sonstiges", -3.5)}
+    assert rollup_consistent()
+    # aktualisierter Hash: Zeile 4 ist jetzt ein Duplikat von Zeile 1
+    dry = client.delete("/api/transactions/duplicates", params={"dry_run": True}, headers=auth_headers).json()
+    assert dry["groups"][0]["keep_id"] == ids[0] and dry["groups"][0]["duplicate_ids"] == [ids[3]]
+    assert client.get("/api/transactions", params={"category": "Sonstiges"}, headers=other).json()[0]["id"] == foreign
+
+
+def test_bulk_selection_is_validated(auth_headers):
+    body = {"set": {"category": "X"}}
+    assert client.patch("/api/transactions/bulk", json=body, headers=auth_headers).status_code == 400
+    assert client.patch("/api/transactions/bulk", json={**body, "ids": [1], "filter": {"category": "A"}}, headers=auth_headers).status_code == 400
+    assert client.patch("/api/transactions/bulk", json={**body, "filter": {}}, headers=auth_headers).status_code == 400
+    assert client.patch("/api/transactions/bulk", json={"ids": [1], "set": {}}, headers=auth_headers).status_code == 400
+    assert client.patch("/api/transactions/bulk", json={"ids": [1], "set": {"amount": None}}, headers=auth_headers).status_code == 400
+    assert client.post("/api/transactions/bulk/delete", json={}, headers=auth_headers).status_code == 400
+
+
+def test_bad_filter_date_touches_no_rows(auth_headers):
+    create(auth_headers, items(3))
+    for bad in ({"from_date": "2024/06/01"}, {"to_date": "gestern"}, {"category": "Sonstiges", "from_date": ""}):
+        r = client.post("/api/transactions/bulk/delete", json={"filter": bad}, headers=auth_headers)
+        assert r.status_code == 400 and "YYYY-MM-DD" in r.json()["detail"]
+        r = client.patch("/api/transactions/bulk", json={"filter": bad, "set": {"category": "X"}}, headers=auth_headers)
+        assert r.status_code == 400
+    assert {t["category"] for t in client.get("/api/transactions", headers=auth_headers).json()} == {"Sonstiges"}
+    assert len(client.get("/api/transactions", headers=auth_headers).json()) == 3
+
+
+def test_required_fields_cannot_be_cleared(auth_headers):
+    create(auth_headers, items(1))
+    for field in ("date", "amount", "currency"):
+        r = client.patch("/api/transactions/bulk", json={"filter": {"category": "Sonstiges"}, "set": {field: None}}, headers=auth_headers)
+        assert r.status_code == 400 and field in r.json()["detail"]
+    assert client.get("/api/transactions", headers=auth_headers).json()[0]["currency"] == "EUR"
+
+
+def test_delete_many(auth_headers):
+    ids = [i["id"] for i in create(auth_headers, items(5)).json()["items"]]
+    data = client.post("/api/transactions/bulk/delete", json={"ids": ids[:2] + [99999]}, headers=auth_headers).json()
+    assert data["deleted"] == 2
+    assert [i["status"] for i in data["items"]] == ["deleted", "deleted", "not_found"]
+    data = client.post("/api/transactions/bulk/delete", json={"filter": {"max_amount": -4.0}}, headers=auth_headers).json()
+    assert data["deleted"] == 2
+    assert [t["id"] for t in client.get("/api/transactions", headers=auth_headers).json()] == [ids[2]]
+    assert rollup_consistent()
+
+
+def test_recategorize_10k_rows_in_one_round_trip(auth_headers):
+    ids = [i["id"] for i in create(auth_headers, items(10000)).json()["items"]]
+    metrics.clear()
+    data = client.patch("/api/transactions/bulk", json={"ids": ids, "set": {"category": "Haushalt"}}, headers=auth_headers).json()
+    assert data["updated"] == 10000
+    text = client.get("/api/metrics").text
+    line = next(l for l in text.splitlines() if l.startswith('db_queries_per_request_sum{method="PATCH",route="/api/transactions/bulk"}'))
+    assert float(line.rsplit(" ", 1)[1]) < 20
+    assert rollup_consistent()
@@ -0,0 +1,123 @@
+import io
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+from ..main import app
+from .. import columnar_io
+
+client = TestClient(app)
+
+ROWS = [
+    ("2024-01-10", -20.0, "Kino", "Freizeit", "Cinemaxx"),
+    ("2024-02-15", -50.25, "Supermarkt", "Lebensmittel", None),
+    ("2024-03-01", 2500.0, "Gehalt", "Einnahmen", "Arbeitgeber"),
+    ("2024-03-20", -35.5, "Konzert", "Freizeit", None),
+    ("2024-03-21", -4.0, "Parken", None, None),
+]
+
+
+def seed(headers):
+    for d, amount, desc, cat, merchant in ROWS:
+        r = client.post("/api/transactions", json={"date": d, "amount": amount, "description": desc, "category": cat,
+                                                   "merchant": merchant}, headers=headers)
+        assert r.status_code == 200
+
+
+def export(headers, fmt, **params):
+    r = client.get("/api/transactions/export", headers=headers, params={"format": fmt, **params})
+    assert r.status_code == 200
+    return r
+
+
+def upload(headers, name, content):
+    return client.post("/api/transactions/import", files={"file": (name, content, "application/octet-stream")}, headers=headers)
+
+
+def register(username):
+    r = client.post("/api/auth/register", json={"username": username, "password": "geheim123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_parquet_export_is_typed_and_dictionary_encoded(auth_headers, monkeypatch):
+    monkeypatch.setattr(columnar_io, "ARROW_BATCH_SIZE", 2)
+    seed(auth_headers)
+    r = export(auth_headers, "parquet")
+    assert r.headers["content-type"] == "application/vnd.apache.parquet"
+    parquet = pq.ParquetFile(io.BytesIO(r.content))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.schema.field("date").type == pa.date32()
+    assert table.schema.field("amount").type == pa.float64()
+    assert pa.types.is_dictionary(table.schema.field("category").type)
+    assert table.column("date").to_pylist()[0] == date(2024, 3, 21)
+    assert table.column("category").to_pylist() == [None, "Freizeit", "Einnahmen", "Lebensmittel", "Freizeit"]
+    assert table.column("merchant").to_pylist()[2] == "Arbeitgeber"
+
+
+def test_arrow_stream_export_with_filters(auth_headers, monkeypatch):
+    monkeypatch.setattr(columnar_io, "ARROW_BATCH_SIZE", 1)
+    seed(auth_headers)
+    r = export(auth_headers, "arrow", from_date="2024-02-01")
+    assert r.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = ipc.open_stream(r.content).read_all()
+    assert table.column("description").to_pylist() == ["Parken", "Konzert", "Gehalt", "Supermarkt"]
+    assert table.column("amount").to_pylist() == [-4.0, -35.5, 2500.0, -50.25]
+    # Deltas über Batches hinweg: dieselbe Kategorie behält ihren Code
+    assert table.column("category").to_pylist() == [None, "Freizeit", "Einnahmen", "Lebensmittel"]
+
+
+def test_export_gzip_only_for_csv(auth_headers):
+    r = client.get("/api/transactions/export", headers=auth_headers, params={"format": "parquet", "gzip": True})
+    assert r.status_code == 400
+
+
+def test_empty_export_keeps_schema(auth_headers):
+    table = pq.read_table(io.BytesIO(export(auth_headers, "parquet").content))
+    assert table.num_rows == 0
+    assert table.schema.names == columnar_io.EXPORT_SCHEMA.names
+
+
+def test_round_trip_into_other_user_is_lossless(auth_headers):
+    seed(auth_headers)
+    for fmt, name in (("parquet", "backup.parquet"), ("arrow", "backup.arrows")):
+        other = register(f"restore_{fmt}")
+        r = upload(other, name, export(auth_headers, fmt).content)
+        assert r.status_code == 200
+        assert r.json()["imported"] == len(ROWS)
+        assert r.json()["errors"] == 0
+        fields = ("date", "amount", "description", "category", "merchant", "currency")
+        original = [{k: t[k] for k in fields} for t in client.get("/api/transactions", headers=auth_headers).json()]
+        restored = [{k: t[k] for k in fields} for t in client.get("/api/transactions", headers=other).json()]
+        assert restored == original
+        assert upload(other, name, export(auth_headers, fmt).content).json()["skipped_duplicates"] == len(ROWS)
+
+
+def test_import_maps_fields_casts_and_reports_missing_values(auth_headers):
+    table = pa.table({
+        "Buchungstag": pa.array(["2024-05-01", None, "2024-05-03"]),
+        "Betrag": pa.array([-10, -20, 30], pa.int32()),
+        "Text": ["Bäcker", "Fehlt", "Erstattung"],
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    r = client.post("/api/transactions/import", files={"file": ("bank.parquet", buffer.getvalue())}, headers=auth_headers,
+                    data={"date_field": "Buchungstag", "amount_field": "Betrag", "description_field": "Text"})
+    data = r.json()
+    assert data["imported"] == 2
+    assert data["error_details"] == [{"line": 2, "message": "Datum oder Betrag fehlt"}]
+    rows = client.get("/api/transactions", headers=auth_headers).json()
+    assert {(t["date"], t["amount"], t["currency"]) for t in rows} == {("2024-05-01", -10.0, "EUR"), ("2024-05-03", 30.0, "EUR")}
+
+
+def test_import_rejects_missing_column_and_garbage(auth_headers):
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({"amount": [1.0]}), buffer)
+    r = upload(auth_headers, "x.parquet", buffer.getvalue())
+    assert r.status_code == 400
+    assert "date" in r.json()["detail"]
+    assert upload(auth_headers, "x.arrow", b"kein arrow").status_code == 400
+    assert upload(auth_headers, "x.xlsx", b"").status_code == 400
+    assert client.get("/api/transactions", headers=auth_headers).json() == []
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+import anyio.to_thread
+from fastapi.testclient import TestClient
+from .. import db
+from ..db import DB_WRITE_POOL_SIZE, engine, read_engine, make_async_engine, make_engine, write_lock
+from ..main import app
+
+client = TestClient(app)
+
+
+def pragma(bind, name):
+    with bind.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_profile_applied_to_every_connection():
+    for bind in (engine, read_engine):
+        assert pragma(bind, "journal_mode") == "wal"
+        assert pragma(bind, "synchronous") == 1
+        assert pragma(bind, "busy_timeout") == 5000
+        assert pragma(bind, "temp_store") == 2
+    assert pragma(read_engine, "query_only") == 1
+    assert pragma(engine, "query_only") == 0
+
+
+def test_read_connections_reject_writes():
+    with read_engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("DELETE FROM user")
+
+
+def test_write_lock_covers_the_transaction_not_the_connection(tmp_path):
+    writer = make_engine(f"sqlite:///{tmp_path / 'w.db'}")
+    assert writer.pool.size() == DB_WRITE_POOL_SIZE and writer.pool._max_overflow == 0
+    with writer.connect() as first:
+        first.exec_driver_sql("CREATE TABLE t (x)")
+        assert write_lock.locked()
+        first.commit()
+        # Verbindung noch ausgecheckt, Sperre schon frei: ein zweiter Schreiber wartet nicht auf das Ende der Session
+        assert not write_lock.locked()
+        with writer.begin() as second:
+            second.exec_driver_sql("INSERT INTO t VALUES (1)")
+            assert write_lock.locked()
+        first.exec_driver_sql("SELECT COUNT(*) FROM t")
+    assert not write_lock.locked()
+
+
+def test_waiting_async_writers_share_one_thread(tmp_path):
+    url = f"sqlite:///{tmp_path / 'w.db'}"
+    with make_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (x)")
+
+    async def scenario():
+        writer = make_async_engine(url)
+
+        async def write(i):
+            async with writer.begin() as conn:
+                await conn.exec_driver_sql("INSERT INTO t VALUES (?)", (i,))
+
+        write_lock.acquire()
+        tasks = [asyncio.create_task(write(i)) for i in range(3)]
+        await asyncio.sleep(0.2)
+        borrowed = anyio.to_thread.current_default_thread_limiter().borrowed_tokens
+        write_lock.release()
+        await asyncio.gather(*tasks)
+        await writer.dispose()
+        return borrowed
+
+    assert asyncio.run(scenario()) == 1
+    with make_engine(url).connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM t").scalar() == 3
+
+
+def test_write_lock_timeout_answers_503(auth_headers, monkeypatch):
+    monkeypatch.setattr(db, "DB_WRITE_TIMEOUT", 0.1)
+    with write_lock:
+        r = client.post("/api/transactions", json={"date": "2024-01-01", "amount": -1.0}, headers=auth_headers)
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+
+
+def test_sync_and_async_writers_share_one_lock(tmp_path):
+    url = f"sqlite:///{tmp_path / 'w.db'}"
+    sync_writer, async_writer = make_engine(url), make_async_engine(url)
+    order = []
+
+    async def write_async():
+        async with async_writer.begin() as conn:
+            # ohne gemeinsame Sperre liefe das sofort und sähe die Tabelle noch nicht
+            order.append((await conn.exec_driver_sql("SELECT COUNT(*) FROM t")).scalar())
+        await async_writer.dispose()
+
+    with sync_writer.begin() as conn:
+        assert write_lock.locked()
+        conn.exec_driver_sql("CREATE TABLE t (x)")
+        conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+        waiting = threading.Thread(target=asyncio.run, args=(write_async(),))
+        waiting.start()
+        time.sleep(0.2)
+        assert order == []
+        order.append("sync")
+    waiting.join(5)
+    assert order == ["sync", 1]
+    assert not write_lock.locked()
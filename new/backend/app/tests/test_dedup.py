@@ -0,0 +1,60 @@
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from ..main import app
+from ..db import engine
+from ..models import Transaction
+from ..content_hash import amount_cents, content_hash
+
+client = TestClient(app)
+
+
+def create(headers, d, amount, desc, cat):
+    r = client.post("/api/transactions", json={"date": d, "amount": amount, "description": desc, "category": cat}, headers=headers)
+    return r.json()["transaction"]["id"]
+
+
+def stored_hash(transaction_id):
+    with Session(engine) as session:
+        return session.get(Transaction, transaction_id).content_hash
+
+
+def test_hash_normalizes_amount_and_text():
+    assert amount_cents(-12.5) == -1250
+    assert amount_cents(0.285) == 29
+    assert amount_cents(0.1 + 0.2) == 30
+    d = date(2024, 1, 5)
+    assert content_hash(d, 0.1 + 0.2, "  Supermarkt ", "LEBENSMITTEL") == content_hash(d, 0.3, "supermarkt", "Lebensmittel")
+    assert content_hash(d, -7.3, None, None) == content_hash(d, -7.3, "", " ")
+    assert content_hash(d, -7.3, "Straße", None) == content_hash(d, -7.3, "STRASSE", None)
+    assert content_hash(d, -7.3, "A", None) != content_hash(d, -7.31, "A", None)
+
+
+def test_hash_is_kept_for_create_update_and_import(auth_headers):
+    t = create(auth_headers, "2024-01-05", -12.5, "Supermarkt", "Lebensmittel")
+    assert stored_hash(t) == content_hash(date(2024, 1, 5), -12.5, "Supermarkt", "Lebensmittel")
+    client.patch(f"/api/transactions/{t}", json={"date": "2024-01-05", "amount": -13.0}, headers=auth_headers)
+    assert stored_hash(t) == content_hash(date(2024, 1, 5), -13.0, "Supermarkt", "Lebensmittel")
+
+    csv = "date,amount,description,category\n2024-01-05,\"-13,00\",SUPERMARKT ,lebensmittel\n2024-01-06,-1,Neu,\n"
+    r = client.post("/api/transactions/import", files={"file": ("a.csv", csv.encode(), "text/csv")}, headers=auth_headers)
+    assert r.json()["imported"] == 1
+    assert r.json()["skipped_duplicates"] == 1
+    assert "content_hash" not in client.get("/api/transactions", headers=auth_headers).json()[0]
+
+
+def test_cleanup_dry_run_then_delete_keeps_lowest_id(auth_headers):
+    first = create(auth_headers, "2024-02-01", -5.0, "Kaffee", "Freizeit")
+    dup1 = create(auth_headers, "2024-02-01", -5.0, "kaffee", "Freizeit")
+    other = create(auth_headers, "2024-02-02", -5.0, "Kaffee", "Freizeit")
+    dup2 = create(auth_headers, "2024-02-01", -5.0, "Kaffee ", "freizeit")
+
+    r = client.delete("/api/transactions/duplicates?dry_run=true", headers=auth_headers).json()
+    assert r["dry_run"] is True and r["deleted"] == 2
+    assert r["groups"] == [{"keep_id": first, "duplicate_ids": [dup1, dup2], "date": "2024-02-01",
+                            "amount": -5.0, "description": "Kaffee", "category": "Freizeit"}]
+    assert len(client.get("/api/transactions", headers=auth_headers).json()) == 4
+
+    assert client.delete("/api/transactions/duplicates", headers=auth_headers).json() == {"deleted": 2}
+    assert sorted(t["id"] for t in client.get("/api/transactions", headers=auth_headers).json()) == [first, other]
+    assert client.delete("/api/transactions/duplicates?dry_run=true", headers=auth_headers).json()["groups"] == []
@@ -0,0 +1,141 @@
+import io
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from ..main import app
+from ..db import engine
+from ..metrics import metrics
+from ..models_user import User
+from .. import response_cache as response_cache_module
+from ..response_cache import ResponseCache, etag_for, response_cache
+
+client = TestClient(app)
+
+TX = {"date": "2024-03-01", "amount": -12.5, "description": "Bäcker", "category": "Essen"}
+
+
+def queries_for(path: str) -> float:
+    for line in client.get("/api/metrics").text.splitlines():
+        if line.startswith(f'db_queries_per_request_sum{{method="GET",route="{path}"}}'):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_list_answers_304_until_data_changes(auth_headers):
+    client.post("/api/transactions", json=TX, headers=auth_headers)
+    first = client.get("/api/transactions", headers=auth_headers)
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and first.headers["cache-control"] == "private, no-cache"
+
+    conditional = {**auth_headers, "If-None-Match": etag}
+    assert client.get("/api/transactions", headers=conditional).status_code == 304
+    assert client.get("/api/transactions?category=Essen", headers=conditional).status_code == 200
+
+    tid = first.json()[0]["id"]
+    client.patch(f"/api/transactions/{tid}", json={**TX, "amount": -13.0}, headers=auth_headers)
+    changed = client.get("/api/transactions", headers=conditional)
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()[0]["amount"] == -13.0
+
+
+def test_304_skips_the_query(auth_headers):
+    client.post("/api/transactions", json=TX, headers=auth_headers)
+    etag = client.get("/api/stats/monthly-category", headers=auth_headers).headers["etag"]
+    metrics.clear()
+    r = client.get("/api/stats/monthly-category", headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    # nur der Versions-Lookup, keine Statistikabfrage
+    assert queries_for("/api/stats/monthly-category") == 1
+
+
+def test_every_mutation_bumps_the_version(auth_headers):
+    def etag():
+        return client.get("/api/transactions", headers=auth_headers).headers["etag"]
+
+    seen = {etag()}
+    r = client.post("/api/transactions", json=TX, headers=auth_headers)
+    tid = r.json()["transaction"]["id"]
+    seen.add(etag())
+    client.post("/api/transactions", json=TX, headers=auth_headers)
+    seen.add(etag())
+    client.delete("/api/transactions/duplicates", headers=auth_headers)
+    seen.add(etag())
+    csv = "date,amount,description,category\n2024-04-01,-5.0,Kiosk,Essen\n"
+    client.post("/api/transactions/import", files={"file": ("t.csv", io.BytesIO(csv.encode()), "text/csv")}, headers=auth_headers)
+    seen.add(etag())
+    client.delete(f"/api/transactions/{tid}", headers=auth_headers)
+    seen.add(etag())
+    assert len(seen) == 6
+
+    # Vorgänge ohne Änderung lassen die Version stehen
+    client.delete("/api/transactions/duplicates", headers=auth_headers)
+    client.post("/api/transactions/import", files={"file": ("t.csv", io.BytesIO(csv.encode()), "text/csv")}, headers=auth_headers)
+    assert etag() in seen
+
+
+def test_cached_body_matches_fresh_response(auth_headers):
+    client.post("/api/transactions", json=TX, headers=auth_headers)
+    response_cache.clear()
+    fresh = client.get("/api/transactions?limit=5&include_total=true", headers=auth_headers)
+    hits = response_cache.hits
+    cached = client.get("/api/transactions?include_total=true&limit=5", headers=auth_headers)
+    assert response_cache.hits == hits + 1
+    assert cached.content == fresh.content
+    assert cached.json()["total"] == 1
+
+
+def test_response_cache_evicts_by_size():
+    cache = ResponseCache(max_bytes=100)
+    cache.set((1, 0, "/a", ()), b"x" * 20)
+    cache.set((1, 0, "/b", ()), b"x" * 20)
+    cache.get((1, 0, "/a", ()))
+    for i in range(4):
+        cache.set((2, 0, f"/c{i}", ()), b"x" * 20)
+    assert cache.size <= 100
+    assert cache.get((1, 0, "/a", ())) is not None
+    assert cache.get((1, 0, "/b", ())) is None
+    cache.set((3, 0, "/gross", ()), b"x" * 60)
+    assert cache.get((3, 0, "/gross", ())) is None
+    cache.invalidate_user(2)
+    assert cache.stats()["entries"] == 1 and cache.size == 20
+
+
+def test_seed_bumps_all_users(auth_headers):
+    before = client.get("/api/transactions", headers=auth_headers).headers["etag"]
+    assert client.post("/api/seed-demo-data", headers=auth_headers).status_code == 200
+    assert client.get("/api/transactions", headers=auth_headers).headers["etag"] != before
+
+
+def register(username):
+    r = client.post("/api/auth/register", json={"username": username, "password": f"{username}123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_etag_changes_with_release(monkeypatch):
+    key = (1, 3, "/api/transactions", ())
+    before = etag_for(key)
+    monkeypatch.setattr(response_cache_module, "ETAG_RELEASE", "anderer-stand/99")
+    assert etag_for(key) != before
+
+
+def test_reused_user_id_never_matches_old_etag(auth_headers):
+    admin = register("chefin")
+    with Session(engine) as session:
+        user = session.get(User, 2)
+        user.is_admin = True
+        session.add(user)
+        session.commit()
+    old = register("alt")
+    client.post("/api/transactions", json=TX, headers=old)
+    stale = client.get("/api/transactions", headers=old).headers["etag"]
+    assert client.delete("/api/admin/users/3", headers=admin).status_code == 200
+
+    # SQLite vergibt die höchste gelöschte id erneut; der neue Zähler startet trotzdem oberhalb
+    new = register("neu")
+    with Session(engine) as session:
+        assert session.get(User, 3).username == "neu"
+    client.post("/api/transactions", json=TX, headers=new)
+    r = client.get("/api/transactions", headers={**new, "If-None-Match": stale})
+    assert r.status_code == 200
+    assert r.headers["etag"] != stale
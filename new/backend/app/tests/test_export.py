@@ -0,0 +1,50 @@
+import csv
+import gzip
+from io import StringIO
+from fastapi.testclient import TestClient
+from ..main import app
+from .. import exporter
+
+client = TestClient(app)
+
+
+def seed(headers):
+    rows = [
+        ("2024-01-10", -20.0, "Kino", "Freizeit"),
+        ("2024-02-15", -50.0, "Supermarkt", "Lebensmittel"),
+        ("2024-03-01", 2500.0, "Gehalt", "Einnahmen"),
+        ("2024-03-20", -35.5, "Konzert", "Freizeit"),
+    ]
+    for d, amount, desc, cat in rows:
+        r = client.post("/api/transactions", json={"date": d, "amount": amount, "description": desc, "category": cat}, headers=headers)
+        assert r.status_code == 200
+
+
+def parse(text):
+    return list(csv.reader(StringIO(text)))
+
+
+def test_export_streams_all_rows_in_chunks(auth_headers, monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_CHUNK_SIZE", 1)
+    seed(auth_headers)
+    r = client.get("/api/transactions/export", headers=auth_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = parse(r.text)
+    assert rows[0] == exporter.EXPORT_HEADER
+    assert [row[1] for row in rows[1:]] == ["2024-03-20", "2024-03-01", "2024-02-15", "2024-01-10"]
+
+
+def test_export_filters_and_gzip(auth_headers):
+    seed(auth_headers)
+    with client.stream("GET", "/api/transactions/export", headers=auth_headers,
+                       params={"from_date": "2024-02-01", "category": "Freizeit", "gzip": True}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        raw = b"".join(r.iter_raw())
+    rows = parse(gzip.decompress(raw).decode("utf-8"))
+    assert [row[3] for row in rows[1:]] == ["Konzert"]
+
+
+def test_export_empty_has_header(auth_headers):
+    r = client.get("/api/transactions/export", headers=auth_headers)
+    assert parse(r.text) == [exporter.EXPORT_HEADER]
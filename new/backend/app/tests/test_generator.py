@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from ..main import app
+from ..db import engine
+from ..generator import generate
+from ..models import Transaction
+from ..models_user import User
+from ..query_plans import plan_problems
+from .. import rollup
+
+client = TestClient(app)
+
+
+def user_rows(username):
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == username)).one()
+        statement = select(Transaction.date, Transaction.amount, Transaction.description, Transaction.merchant,
+                           Transaction.category, Transaction.content_hash).where(Transaction.user_id == user.id)
+        return session.exec(statement.order_by(Transaction.id)).all()
+
+
+def test_generator_is_deterministic_and_consistent():
+    result = generate(users=2, years=1, seed=7, prefix="a", batch_size=100)
+    assert result["users"] == 2 and result["rows"] > 500
+    assert result["rows_per_sec"] > 0
+    generate(users=1, years=1, seed=7, prefix="b")
+    generate(users=1, years=1, seed=8, prefix="c")
+    assert user_rows("a00001") == user_rows("b00001")
+    assert user_rows("a00001") != user_rows("c00001")
+    assert user_rows("a00001") != user_rows("a00002")
+
+    rows = user_rows("a00001")
+    categories = {r.category for r in rows}
+    assert {"Einnahmen", "Wohnen", "Lebensmittel"} <= categories
+    assert sum(r.description == "Miete" for r in rows) == 12
+    assert all(r.date.year == 2016 for r in rows)
+    with Session(engine) as session:
+        assert rollup.check(session) == []
+    with engine.connect() as conn:
+        assert plan_problems(conn) == {}
+
+    with pytest.raises(ValueError):
+        generate(users=1, years=1, prefix="a")
+
+
+def test_generated_users_can_log_in_and_search():
+    generate(users=1, years=1, prefix="s", password="geheim123")
+    r = client.post("/api/auth/token", data={"username": "s00001", "password": "geheim123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    hits = client.get("/api/transactions/search", params={"q": "miete"}, headers=headers).json()
+    assert len(hits) == 12
+    created = client.post("/api/transactions", json={"date": "2017-01-01", "amount": -1, "description": "Nachtrag Miete"},
+                          headers=headers).json()["transaction"]
+    hits = client.get("/api/transactions/search", params={"q": "nachtrag"}, headers=headers).json()
+    assert [h["transaction"]["id"] for h in hits] == [created["id"]]
@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+from ..main import app
+
+client = TestClient(app)
+
+CSV = (
+    "date,amount,description,category\n"
+    "2024-01-05,-12.5,Supermarkt,Lebensmittel\n"
+    "2024-01-05,-12.5,Supermarkt,Lebensmittel\n"
+    "2024-01-06,\"-7,30\",Bäcker,\n"
+    "kein-datum,1,Fehler,\n"
+    "2024-02-01,2500,Gehalt,Einnahmen\n"
+)
+
+
+def upload(headers, content, **form):
+    return client.post(
+        "/api/transactions/import",
+        files={"file": ("umsatz.csv", content.encode("utf-8"), "text/csv")},
+        data=form,
+        headers=headers,
+    )
+
+
+def test_import_dedups_within_file_and_against_existing(auth_headers):
+    r = upload(auth_headers, CSV)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["imported"] == 3
+    assert data["skipped_duplicates"] == 1
+    assert data["errors"] == 1
+    assert data["rows"] == 5
+    assert set(data["timings"]) >= {"parse", "dedup", "insert", "commit", "total"}
+
+    r = upload(auth_headers, CSV)
+    assert r.json()["imported"] == 0
+    assert r.json()["skipped_duplicates"] == 4
+
+    rows = client.get("/api/transactions", headers=auth_headers).json()
+    assert len(rows) == 3
+    baecker = next(t for t in rows if t["description"] == "Bäcker")
+    assert baecker["amount"] == -7.3
+    assert baecker["category"] is None
+    assert baecker["currency"] == "EUR"
+
+
+def test_import_custom_field_names_across_batches(auth_headers, monkeypatch):
+    from .. import importer
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 2)
+    lines = ["Buchungstag,Betrag,Text,Kat"]
+    lines += [f"2024-03-{d:02d},-{d},Kauf {d},Shopping" for d in range(1, 8)]
+    lines.append("2024-03-01,-1,Kauf 1,Shopping")
+    r = upload(auth_headers, "\n".join(lines) + "\n", date_field="Buchungstag", amount_field="Betrag",
+               description_field="Text", category_field="Kat")
+    assert r.json()["imported"] == 7
+    assert r.json()["skipped_duplicates"] == 1
+
+
+def test_import_rejects_non_csv(auth_headers):
+    r = client.post("/api/transactions/import", files={"file": ("x.txt", b"a", "text/plain")}, headers=auth_headers)
+    assert r.status_code == 400
@@ -0,0 +1,192 @@
+import io
+import os
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlmodel import Session
+from ..main import app
+from ..db import engine
+from .. import import_jobs, importer
+from ..importer import CsvFieldMap
+from ..import_jobs import _now, claim, cleanup_spool, create_job, import_workers, recover, run_job, spool_path
+from ..models import ImportJob
+
+client = TestClient(app)
+
+CSV = (
+    "date,amount,description,category\n"
+    "2024-01-05,-12.5,Supermarkt,Lebensmittel\n"
+    "2024-01-05,-12.5,Supermarkt,Lebensmittel\n"
+    "2024-01-06,\"-7,30\",\"Bäcker\nFiliale 2\",\n"
+    "kein-datum,1,Fehler,\n"
+    "2024-02-01,abc,Gehalt,Einnahmen\n"
+    "2024-02-02,2500,Gehalt,Einnahmen\n"
+)
+FIELDS = CsvFieldMap("date", "amount", "description", "category")
+
+
+def start(headers, content):
+    r = client.post("/api/imports", files={"file": ("umsatz.csv", content.encode("utf-8"), "text/csv")}, headers=headers)
+    assert r.status_code == 202
+    return r.json()
+
+
+def finished(headers, job_id):
+    import_workers.wait(job_id, timeout=10)
+    return client.get(f"/api/imports/{job_id}", headers=headers).json()
+
+
+def big_csv(n):
+    return "date,amount,description,category\n" + "".join(f"2024-03-{1 + i % 28:02d},-{i}.5,Kauf {i},Shopping\n" for i in range(n))
+
+
+def new_job(content: str) -> str:
+    with Session(engine) as session:
+        return create_job(session, 1, "t.csv", io.BytesIO(content.encode()), FIELDS).id
+
+
+def test_background_import_reports_progress_and_error_lines(auth_headers):
+    job = start(auth_headers, CSV)
+    assert job["status"] in ("queued", "running", "completed")
+    job = finished(auth_headers, job["id"])
+    assert job["status"] == "completed" and job["progress"] == 1.0
+    assert (job["rows"], job["imported"], job["skipped_duplicates"], job["errors"]) == (6, 3, 1, 2)
+    assert [e["line"] for e in job["error_details"]] == [6, 7]
+    assert job["rows_per_sec"] > 0
+    assert not os.path.exists(spool_path(job["id"]))
+    assert len(client.get("/api/transactions", headers=auth_headers).json()) == 3
+    assert [j["id"] for j in client.get("/api/imports", headers=auth_headers).json()] == [job["id"]]
+
+
+def test_jobs_are_private(auth_headers):
+    job = finished(auth_headers, start(auth_headers, CSV)["id"])
+    r = client.post("/api/auth/register", json={"username": "andere", "password": "andere123"})
+    other = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    assert client.get(f"/api/imports/{job['id']}", headers=other).status_code == 404
+    assert client.post(f"/api/imports/{job['id']}/resume", headers=auth_headers).status_code == 409
+
+
+def test_cancel_before_start_and_resume(auth_headers):
+    job_id = new_job(big_csv(10))
+    assert client.post(f"/api/imports/{job_id}/cancel", headers=auth_headers).json()["cancel_requested"] is True
+    run_job(job_id)
+    job = client.get(f"/api/imports/{job_id}", headers=auth_headers).json()
+    assert job["status"] == "cancelled" and job["imported"] == 0
+    assert client.post(f"/api/imports/{job_id}/cancel", headers=auth_headers).status_code == 409
+
+    assert client.post(f"/api/imports/{job_id}/resume", headers=auth_headers).status_code == 202
+    job = finished(auth_headers, job_id)
+    assert job["status"] == "completed" and job["imported"] == 10
+
+
+def test_failure_keeps_committed_chunks_and_resume_continues(auth_headers, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 4)
+    original = import_jobs.import_batch
+    calls = []
+
+    def crash_on_third_chunk(*args):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("Platte voll")
+        return original(*args)
+
+    monkeypatch.setattr(import_jobs, "import_batch", crash_on_third_chunk)
+    job_id = new_job(big_csv(10) + "2024-03-01,-0.5,Kauf 0,Shopping\n")
+    run_job(job_id)
+    job = client.get(f"/api/imports/{job_id}", headers=auth_headers).json()
+    assert job["status"] == "failed" and job["message"] == "Platte voll"
+    assert (job["rows"], job["imported"]) == (8, 8)
+    assert 0 < job["progress"] <= 1
+
+    monkeypatch.setattr(import_jobs, "import_batch", original)
+    client.post(f"/api/imports/{job_id}/resume", headers=auth_headers)
+    job = finished(auth_headers, job_id)
+    assert job["status"] == "completed"
+    # die Wiederholung von Zeile 2 in der letzten Zeile wird über den Index als Duplikat erkannt
+    assert (job["rows"], job["imported"], job["skipped_duplicates"]) == (11, 10, 1)
+    assert len(client.get("/api/transactions", headers=auth_headers).json()) == 10
+
+
+def set_running(job_id, owner, heartbeat_at):
+    with Session(engine) as session:
+        job = session.get(ImportJob, job_id)
+        job.status, job.owner, job.heartbeat_at = "running", owner, heartbeat_at
+        session.add(job)
+        session.commit()
+
+
+def test_interrupted_jobs_are_recovered_on_startup(auth_headers):
+    job_id = new_job(big_csv(5))
+    set_running(job_id, "abgestuerzt:1", "2024-01-01T00:00:00+00:00")
+    assert recover() == 1
+    assert finished(auth_headers, job_id)["imported"] == 5
+
+
+def test_job_is_claimed_only_once():
+    job_id = new_job(big_csv(3))
+    with Session(engine) as session:
+        assert claim(session, job_id, "worker-a") is True
+        assert claim(session, job_id, "worker-b") is False
+        assert session.get(ImportJob, job_id).owner == "worker-a"
+    # ein zweiter Worker läuft nicht parallel los
+    run_job(job_id, owner="worker-b")
+    with Session(engine) as session:
+        job = session.get(ImportJob, job_id)
+        assert (job.status, job.owner, job.imported) == ("running", "worker-a", 0)
+
+
+def test_recover_leaves_jobs_with_live_lease_alone(auth_headers):
+    job_id = new_job(big_csv(3))
+    set_running(job_id, "anderer-prozess:7", _now())
+    assert recover() == 0
+    assert client.get(f"/api/imports/{job_id}", headers=auth_headers).json()["status"] == "running"
+    assert recover(lease_seconds=0) == 1
+    assert finished(auth_headers, job_id)["imported"] == 3
+
+
+def test_worker_stops_when_lease_was_taken_over(auth_headers, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 2)
+    original = import_jobs.import_batch
+
+    def taken_over_after_first_chunk(session, *args):
+        imported = original(session, *args)
+        session.execute(update(ImportJob).where(ImportJob.id == job_id).values(owner="anderer-prozess:7"))
+        return imported
+
+    monkeypatch.setattr(import_jobs, "import_batch", taken_over_after_first_chunk)
+    job_id = new_job(big_csv(6))
+    run_job(job_id)
+    job = client.get(f"/api/imports/{job_id}", headers=auth_headers).json()
+    assert job["status"] == "running" and job["imported"] == 2
+
+
+def test_expired_spool_files_are_removed(auth_headers):
+    kept, expired = new_job(big_csv(3)), new_job(big_csv(3))
+    for job_id in (kept, expired):
+        client.post(f"/api/imports/{job_id}/cancel", headers=auth_headers)
+        run_job(job_id)
+    with Session(engine) as session:
+        job = session.get(ImportJob, expired)
+        job.finished_at = "2024-01-01T00:00:00+00:00"
+        session.add(job)
+        session.commit()
+    orphan, fresh_orphan = spool_path("verwaist"), spool_path("gerade-hochgeladen")
+    for path in (orphan, fresh_orphan):
+        open(path, "w").close()
+    os.utime(orphan, (0, 0))
+
+    assert cleanup_spool() == 2
+    assert os.path.exists(spool_path(kept)) and os.path.exists(fresh_orphan)
+    assert not os.path.exists(spool_path(expired)) and not os.path.exists(orphan)
+    assert client.post(f"/api/imports/{expired}/resume", headers=auth_headers).status_code == 409
+    os.remove(fresh_orphan)
+
+
+def test_delete_job_removes_spool_file(auth_headers):
+    job_id = new_job(big_csv(3))
+    assert client.delete(f"/api/imports/{job_id}", headers=auth_headers).status_code == 409
+    client.post(f"/api/imports/{job_id}/cancel", headers=auth_headers)
+    run_job(job_id)
+    assert client.delete(f"/api/imports/{job_id}", headers=auth_headers).json() == {"deleted": True}
+    assert not os.path.exists(spool_path(job_id))
+    assert client.get(f"/api/imports/{job_id}", headers=auth_headers).status_code == 404
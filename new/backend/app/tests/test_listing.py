@@ -0,0 +1,82 @@
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from ..main import app
+from .. import listing
+from ..db import read_engine
+from ..listing import MODEL_FIELDS, list_statement
+from ..models_user import User
+
+client = TestClient(app)
+
+
+def seed(headers):
+    ids = []
+    for i, d in enumerate(["2024-01-01", "2024-01-02", "2024-01-02", "2024-01-02", "2024-01-03"]):
+        cat = "Freizeit" if i % 2 else "Lebensmittel"
+        r = client.post("/api/transactions", json={"date": d, "amount": -(i + 1), "description": f"Kauf {i}", "category": cat}, headers=headers)
+        ids.append(r.json()["transaction"]["id"])
+    return ids
+
+
+def test_keyset_pages_cover_all_rows_once(auth_headers):
+    ids = seed(auth_headers)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/transactions", params=params, headers=auth_headers).json()
+        seen += [t["id"] for t in data["items"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+
+def test_field_projection_and_totals(auth_headers):
+    seed(auth_headers)
+    data = client.get("/api/transactions", params={"limit": 10, "fields": "id,amount", "include_total": True}, headers=auth_headers).json()
+    assert set(data["items"][0]) == {"id", "amount"}
+    assert data["total"] == 5
+    data = client.get("/api/transactions", params={"limit": 1, "category": "Freizeit", "include_total": True}, headers=auth_headers).json()
+    assert data["total"] == 2
+    data = client.get("/api/transactions", params={"limit": 1, "min_amount": -2, "include_total": True}, headers=auth_headers).json()
+    assert data["total"] == 2
+
+
+def test_unpaged_listing_unchanged_and_bad_input(auth_headers):
+    seed(auth_headers)
+    rows = client.get("/api/transactions", headers=auth_headers).json()
+    assert isinstance(rows, list) and len(rows) == 5
+    assert {"id", "date", "amount", "category", "user_id"} <= set(rows[0])
+    assert client.get("/api/transactions", params={"fields": "id,passwort"}, headers=auth_headers).status_code == 400
+    assert client.get("/api/transactions", params={"cursor": "kaputt"}, headers=auth_headers).status_code == 400
+
+
+def test_fast_listing_matches_orm_serialization(auth_headers):
+    seed(auth_headers)
+    client.post("/api/transactions", json={"date": "2024-01-04", "amount": 2500, "description": "Gehalt „März“ – ü",
+                                           "merchant": "Arbeitgeber", "currency": "CHF"}, headers=auth_headers)
+    with Session(read_engine) as session:
+        user_id = session.exec(select(User.id).where(User.username == "tester")).one()
+        expected = jsonable_encoder(session.exec(list_statement(user_id, [])).all())
+    rows = client.get("/api/transactions", headers=auth_headers).json()
+    assert rows == expected
+    assert list(rows[0]) == list(MODEL_FIELDS)
+    assert rows[0]["amount"] == 2500.0 and rows[0]["category"] is None
+    projected = client.get("/api/transactions", params={"fields": "date,amount", "category": "Freizeit"}, headers=auth_headers).json()
+    assert projected == [{"date": "2024-01-02", "amount": -4.0}, {"date": "2024-01-02", "amount": -2.0}]
+
+
+def test_ndjson_streams_same_objects(auth_headers, monkeypatch):
+    monkeypatch.setattr(listing, "NDJSON_BATCH_SIZE", 2)
+    seed(auth_headers)
+    expected = client.get("/api/transactions", params={"q": "Kauf"}, headers=auth_headers).json()
+    r = client.get("/api/transactions", params={"q": "Kauf", "format": "ndjson"}, headers=auth_headers)
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in r.text.splitlines()] == expected
+    r = client.get("/api/transactions", params={"fields": "id", "format": "ndjson"}, headers=auth_headers)
+    assert all(set(json.loads(line)) == {"id"} for line in r.text.splitlines())
+    assert client.get("/api/transactions", params={"limit": 2, "format": "ndjson"}, headers=auth_headers).status_code == 400
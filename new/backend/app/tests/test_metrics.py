@@ -0,0 +1,57 @@
+import re
+
+from fastapi.testclient import TestClient
+from .. import metrics as metrics_module
+from ..main import app
+from ..metrics import metrics
+
+client = TestClient(app)
+
+
+def sample(text: str, name: str, **labels) -> float:
+    wanted = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    for line in text.splitlines():
+        if line.startswith(f"{name}{{{wanted}}} ") or (not labels and line.startswith(f"{name} ")):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} {labels} fehlt")
+
+
+def test_metrics_count_requests_per_route_template(auth_headers):
+    metrics.clear()
+    client.post("/api/transactions", json={"date": "2024-01-05", "amount": -10.0, "category": "Essen"}, headers=auth_headers)
+    client.get("/api/transactions", headers=auth_headers)
+    client.delete("/api/transactions/999999", headers=auth_headers)
+    client.get("/api/gibt-es-nicht")
+
+    r = client.get("/api/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    assert sample(text, "http_requests_total", method="GET", route="/api/transactions", status=200) == 1
+    assert sample(text, "http_requests_total", method="DELETE", route="/api/transactions/{transaction_id}", status=404) == 1
+    assert sample(text, "http_requests_total", method="GET", route="unmatched", status=404) == 1
+    assert sample(text, "http_request_duration_seconds_count", method="POST", route="/api/transactions") == 1
+    assert sample(text, "http_request_duration_seconds_bucket", method="POST", route="/api/transactions", le="+Inf") == 1
+    # der laufende /api/metrics-Aufruf selbst ist noch nicht abgeschlossen
+    assert sample(text, "http_requests_in_flight") == 1
+
+
+def test_metrics_count_queries_and_db_time(auth_headers):
+    metrics.clear()
+    client.get("/api/transactions", headers=auth_headers)
+    client.get("/api/health")
+    text = client.get("/api/metrics").text
+    assert sample(text, "db_queries_per_request_sum", method="GET", route="/api/transactions") >= 1
+    assert sample(text, "db_query_seconds_total", method="GET", route="/api/transactions") > 0
+    assert sample(text, "db_queries_per_request_sum", method="GET", route="/api/health") == 0
+
+
+def test_server_timing_header(auth_headers, monkeypatch):
+    assert "server-timing" not in client.get("/api/transactions", headers=auth_headers).headers
+    monkeypatch.setattr(metrics_module, "SERVER_TIMING", True)
+    header = client.get("/api/transactions", headers=auth_headers).headers["server-timing"]
+    match = re.fullmatch(r'db;dur=([\d.]+);desc="(\d+) queries", app;dur=([\d.]+), total;dur=([\d.]+)', header)
+    assert match
+    db, queries, app_ms, total = float(match[1]), int(match[2]), float(match[3]), float(match[4])
+    assert queries >= 1
+    assert abs(db + app_ms - total) < 0.02
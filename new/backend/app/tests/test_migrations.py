@@ -0,0 +1,53 @@
+from sqlalchemy import create_engine, text
+from datetime import date
+from ..content_hash import content_hash
+from ..db import engine
+from ..migrations import MIGRATIONS, migrate
+from ..query_plans import plan_problems
+
+
+def test_migrate_is_idempotent():
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS schema_migrations")
+    assert len(migrate()) == len(MIGRATIONS)
+    assert migrate() == []
+    with engine.connect() as conn:
+        versions = [row[0] for row in conn.exec_driver_sql("SELECT version FROM schema_migrations ORDER BY version")]
+    assert versions == [v for v, _, _ in MIGRATIONS]
+
+
+def test_migrate_upgrades_legacy_schema(tmp_path):
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR, hashed_password VARCHAR, is_active BOOLEAN)")
+        conn.exec_driver_sql('CREATE TABLE "transaction" (id INTEGER PRIMARY KEY, date DATE, amount FLOAT, currency VARCHAR, description VARCHAR, merchant VARCHAR, category VARCHAR, user_id INTEGER)')
+        conn.exec_driver_sql("CREATE TABLE monthlycategoryrollup (user_id INTEGER, month VARCHAR, category VARCHAR, currency VARCHAR, total FLOAT, count INTEGER, min_amount FLOAT, max_amount FLOAT, sum_squares FLOAT, PRIMARY KEY (user_id, month, category, currency))")
+        conn.exec_driver_sql("INSERT INTO user VALUES (1, 'alt', 'x', 1)")
+        conn.exec_driver_sql("INSERT INTO \"transaction\" VALUES (1, '2024-01-05', -10.0, 'EUR', 'Kino', NULL, 'Freizeit', 1)")
+    migrate(legacy)
+    with legacy.connect() as conn:
+        cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info('user')")]
+        indexes = [row[1] for row in conn.exec_driver_sql("PRAGMA index_list('transaction')")]
+        rollup_rows = conn.execute(text("SELECT month, total, count FROM monthlycategoryrollup")).all()
+        stored_hash = conn.exec_driver_sql('SELECT content_hash FROM "transaction" WHERE id = 1').scalar()
+        triggers = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    with legacy.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO \"transaction\" (date, amount, currency, description, user_id) VALUES ('2024-02-01', -5.0, 'EUR', 'Bäcker', 1)")
+        modified = conn.exec_driver_sql('SELECT modified_at FROM "transaction" ORDER BY id').scalars().all()
+        found = conn.exec_driver_sql("SELECT rowid FROM transaction_fts WHERE transaction_fts MATCH 'kino OR backer' ORDER BY rowid").scalars().all()
+    assert "is_admin" in cols
+    assert {"ix_transaction_user_date_id", "ix_transaction_user_category_date"} <= set(indexes)
+    assert rollup_rows == [("2024-01", -10.0, 1)]
+    assert "ix_transaction_user_content_hash" in indexes
+    assert stored_hash == content_hash(date(2024, 1, 5), -10.0, "Kino", "Freizeit")
+    # modified_at kommt beim Einfügen aus dem Spalten-Default, nicht aus einem Trigger
+    assert "transaction_modified_ai" not in triggers
+    assert {"transaction_modified_au", "transaction_fts_ai"} <= triggers
+    assert all(modified)
+    assert found == [1, 2]
+
+
+def test_hot_queries_use_indexes_without_sorting():
+    migrate()
+    with engine.connect() as conn:
+        assert plan_problems(conn) == {}
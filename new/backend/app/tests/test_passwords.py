@@ -0,0 +1,36 @@
+import asyncio
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from ..main import app
+from ..db import engine
+from ..models_user import User
+from ..passwords import PasswordHasher
+from .. import auth
+
+client = TestClient(app)
+
+
+def login(username, password):
+    return client.post("/api/auth/token", data={"username": username, "password": password})
+
+
+def test_hasher_runs_in_pool_and_records_metrics():
+    hasher = PasswordHasher(rounds=4, workers=2)
+    hashed = hasher.hash("geheim")
+    assert hasher.verify("geheim", hashed)
+    assert not hasher.verify("falsch", hashed)
+    assert asyncio.run(hasher.verify_and_update_async("geheim", hashed)) == (True, None)
+    stats = hasher.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["hash"]["count"] == 1 and stats["verify"]["count"] == 3
+
+
+def test_login_rehashes_when_cost_changes(monkeypatch):
+    client.post("/api/auth/register", json={"username": "wechsel", "password": "wechsel123"})
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(rounds=5, workers=1))
+    assert login("wechsel", "wechsel123").status_code == 200
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == "wechsel")).one()
+        assert user.hashed_password.startswith("$2b$05$")
+    assert login("wechsel", "falsch").status_code == 401
+    assert login("wechsel", "wechsel123").status_code == 200
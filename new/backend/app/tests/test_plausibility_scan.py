@@ -0,0 +1,66 @@
+import random
+from datetime import date
+import pytest
+from fastapi.testclient import TestClient
+from ..main import app
+from ..rules_engine import Rule
+from ..plausibility_scan import evaluate_batch, vectorize
+
+client = TestClient(app)
+
+CONDITIONS = [
+    "abs(amount) < 0.01",
+    "abs(amount) > 10000",
+    "amount < -100 and category == 'Freizeit'",
+    "not category or currency != 'EUR'",
+    "-amount % 7 >= 3",
+    "merchant is None",
+    "0 < amount <= 50",
+]
+
+
+@pytest.mark.parametrize("condition", CONDITIONS)
+def test_vectorized_rules_match_row_evaluation(condition):
+    rng = random.Random(7)
+    rows = [
+        (i, date(2024, 1, 1), rng.choice([0.0, 0.001, -20000.0, 12.5, -150.0, 3000.0]),
+         rng.choice(["EUR", "USD"]), "x", rng.choice([None, "", "Shop"]), rng.choice([None, "", "Freizeit", "Wohnen"]))
+        for i in range(300)
+    ]
+    rule = Rule("r", "", condition, "info")
+    assert vectorize(rule) is not None
+    vectorized = [tid for tid, _ in evaluate_batch(rows, [(rule, vectorize(rule))])]
+    per_row = [tid for tid, _ in evaluate_batch(rows, [(rule, None)])]
+    assert vectorized == per_row
+
+
+def test_unsupported_conditions_fall_back_to_rows():
+    assert vectorize(Rule("m", "", "merchant and merchant.lower() == 'test'", "info")) is None
+    assert vectorize(Rule("d", "", "amount / amount > 1", "info")) is None
+
+
+def create(headers, amount, merchant=None):
+    r = client.post("/api/transactions", json={"date": "2024-01-10", "amount": amount, "description": "x", "merchant": merchant}, headers=headers)
+    return r.json()["transaction"]["id"]
+
+
+def test_scan_endpoint_full_then_incremental(auth_headers):
+    zero = create(auth_headers, 0.0)
+    big = create(auth_headers, 25000.0)
+    create(auth_headers, -20.0, merchant="Test GmbH")
+    normal = create(auth_headers, -30.0)
+
+    summary = client.post("/api/plausibility/scan", headers=auth_headers).json()
+    assert summary["mode"] == "full" and summary["scanned"] == 4 and summary["findings"] == 3
+    assert "very_large" in summary["vectorized_rules"] and "suspicious_merchant" in summary["row_rules"]
+
+    client.patch(f"/api/transactions/{normal}", json={"date": "2024-01-10", "amount": 50000.0, "description": "x"}, headers=auth_headers)
+    client.delete(f"/api/transactions/{zero}", headers=auth_headers)
+    summary = client.post("/api/plausibility/scan", headers=auth_headers).json()
+    assert summary["mode"] == "incremental" and summary["scanned"] == 1
+
+    findings = client.get("/api/plausibility/findings", headers=auth_headers).json()
+    assert sorted((f["transaction_id"], f["rule_id"]) for f in findings) == sorted([
+        (big, "very_large"), (normal, "very_large"), (normal - 1, "suspicious_merchant"),
+    ])
+    assert client.post("/api/plausibility/scan", params={"full": True}, headers=auth_headers).json()["findings"] == 3
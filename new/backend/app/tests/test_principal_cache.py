@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from ..main import app
+from ..db import engine
+from ..models_user import User
+from ..principal_cache import TTLCache, principal_cache
+
+client = TestClient(app)
+
+
+def make_admin_headers():
+    r = client.post("/api/auth/register", json={"username": "chefin", "password": "chefin123"})
+    with Session(engine) as session:
+        admin = session.get(User, 2)
+        admin.is_admin = True
+        session.add(admin)
+        session.commit()
+    principal_cache.clear()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_repeated_requests_hit_the_cache(auth_headers):
+    client.get("/api/transactions", headers=auth_headers)
+    before = principal_cache.stats()["tokens"]["hits"]
+    for _ in range(3):
+        assert client.get("/api/transactions", headers=auth_headers).status_code == 200
+    assert client.get("/api/auth/me", headers=auth_headers).json()["username"] == "tester"
+    assert principal_cache.stats()["tokens"]["hits"] == before + 4
+
+
+def test_deactivation_takes_effect_immediately(auth_headers):
+    admin_headers = make_admin_headers()
+    assert client.get("/api/transactions", headers=auth_headers).status_code == 200
+    r = client.patch("/api/admin/users/1", json={"is_active": False}, headers=admin_headers)
+    assert r.status_code == 200
+    assert client.get("/api/transactions", headers=auth_headers).status_code == 403
+    stats = client.get("/api/admin/cache/stats", headers=admin_headers).json()["principal"]
+    assert stats["tokens"]["misses"] >= 1
+
+
+def test_ttl_cache_expiry_and_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.evictions == 1
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is None
@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from ..main import app
+from ..db import engine
+from ..models import MonthlyCategoryRollup
+from .. import rollup
+
+client = TestClient(app)
+
+
+def create(headers, d, amount, desc, cat):
+    r = client.post("/api/transactions", json={"date": d, "amount": amount, "description": desc, "category": cat}, headers=headers)
+    return r.json()["transaction"]["id"]
+
+
+def buckets():
+    with Session(engine) as session:
+        rows = session.exec(select(MonthlyCategoryRollup)).all()
+        return {(r.month, r.category): (r.total, r.count, r.min_amount, r.max_amount, r.sum_squares) for r in rows}
+
+
+def assert_consistent():
+    with Session(engine) as session:
+        assert rollup.check(session) == []
+
+
+def test_rollup_follows_create_update_delete(auth_headers):
+    a = create(auth_headers, "2024-01-10", -20.0, "Kino", "Freizeit")
+    b = create(auth_headers, "2024-01-12", -5.0, "Konzert", "Freizeit")
+    create(auth_headers, "2024-01-15", -50.0, "Supermarkt", None)
+    assert buckets()[("2024-01", "Freizeit")] == (-25.0, 2, -20.0, -5.0, 425.0)
+    assert buckets()[("2024-01", "Unbekannt")][1] == 1
+    assert_consistent()
+
+    client.patch(f"/api/transactions/{a}", json={"date": "2024-02-01", "amount": -20.0, "description": "Kino", "category": "Kultur"}, headers=auth_headers)
+    assert buckets()[("2024-01", "Freizeit")] == (-5.0, 1, -5.0, -5.0, 25.0)
+    assert buckets()[("2024-02", "Kultur")] == (-20.0, 1, -20.0, -20.0, 400.0)
+    assert_consistent()
+
+    client.delete(f"/api/transactions/{b}", headers=auth_headers)
+    assert ("2024-01", "Freizeit") not in buckets()
+    assert_consistent()
+
+
+def test_rollup_follows_import_and_dedup(auth_headers):
+    csv = "date,amount,description,category\n2024-03-01,-1,A,X\n2024-03-02,-2,B,X\n"
+    client.post("/api/transactions/import", files={"file": ("a.csv", csv.encode(), "text/csv")}, headers=auth_headers)
+    create(auth_headers, "2024-03-02", -2.0, "B", "X")
+    assert buckets()[("2024-03", "X")][:2] == (-5.0, 3)
+    assert client.delete("/api/transactions/duplicates", headers=auth_headers).json()["deleted"] == 1
+    assert buckets()[("2024-03", "X")] == (-3.0, 2, -2.0, -1.0, 5.0)
+    assert_consistent()
+
+
+def test_rebuild_and_check_detect_drift(auth_headers):
+    create(auth_headers, "2024-01-10", -20.0, "Kino", "Freizeit")
+    with Session(engine) as session:
+        session.exec(select(MonthlyCategoryRollup)).one().total = 99.0
+        session.commit()
+        assert len(rollup.check(session)) == 1
+        assert rollup.rebuild(session) == 1
+        session.commit()
+        assert rollup.check(session) == []
+    stats = client.get("/api/stats/monthly-category", headers=auth_headers).json()
+    assert stats["items"] == [{"month": "2024-01", "category": "Freizeit", "sum": -20.0}]
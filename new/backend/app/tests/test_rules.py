@@ -1,6 +1,10 @@
+import os
+import time
+import pytest
 from ..rules import check_plausibility
 from datetime import date
 from ..models import Transaction
+from ..rules_engine import Rule, RuleError, RuleSet, evaluate_rules
 
 
 def test_zero_amount():
@@ -13,3 +17,40 @@ def test_large_amount():
     t = Transaction(date=date.today(), amount=20000.0)
     issues = check_plausibility(t)
     assert any(i['id']=='very_large' for i in issues)
+
+
+def test_suspicious_merchant():
+    t = Transaction(date=date.today(), amount=-5.0, merchant="Unknown Shop")
+    assert any(i['id'] == 'suspicious_merchant' for i in check_plausibility(t))
+    t = Transaction(date=date.today(), amount=-5.0, merchant=None)
+    assert not any(i['id'] == 'suspicious_merchant' for i in check_plausibility(t))
+
+
+@pytest.mark.parametrize("condition", [
+    "amount >",
+    "__import__('os').system('x')",
+    "amount.__class__",
+    "saldo > 0",
+    "(lambda: 1)()",
+])
+def test_invalid_rules_rejected_at_load(condition):
+    with pytest.raises(RuleError):
+        Rule("kaputt", "", condition, "error")
+
+
+def test_rule_file_hot_reload_and_stats(tmp_path):
+    path = tmp_path / "rules.yaml"
+    path.write_text("rules:\n  - id: big\n    condition: 'amount > 100'\n")
+    rule_set = RuleSet(path)
+    assert [i['id'] for i in evaluate_rules({"amount": 500}, rule_set.current())] == ['big']
+    assert rule_set.stats()[0]["hits"] == 1 and rule_set.stats()[0]["evaluations"] == 1
+
+    path.write_text("rules:\n  - id: small\n    condition: 'amount < 0'\n")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert rule_set.reload_if_changed()
+    assert [r.id for r in rule_set.current()] == ['small']
+
+    path.write_text("rules:\n  - id: broken\n    condition: 'amount >'\n")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 2 * 10**9))
+    assert not rule_set.reload_if_changed()
+    assert [r.id for r in rule_set.rules] == ['small']
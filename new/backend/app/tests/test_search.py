@@ -0,0 +1,67 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from ..main import app
+from ..db import engine
+from ..search import match_filter
+
+client = TestClient(app)
+
+
+def create(headers, desc, merchant=None, cat=None, d="2024-01-10"):
+    r = client.post("/api/transactions", json={"date": d, "amount": -10.0, "description": desc, "merchant": merchant, "category": cat}, headers=headers)
+    return r.json()["transaction"]["id"]
+
+
+def other_user_headers():
+    r = client.post("/api/auth/register", json={"username": "andere", "password": "andere123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_search_prefix_ranking_and_snippets(auth_headers):
+    create(auth_headers, "Supermarkt Einkauf", cat="Lebensmittel")
+    create(auth_headers, "Bäcker", merchant="Supermarkt Nord")
+    create(auth_headers, "Kino")
+    create(other_user_headers(), "Supermarkt fremd")
+    results = client.get("/api/transactions/search", params={"q": "super"}, headers=auth_headers).json()
+    assert {r["transaction"]["description"] for r in results} == {"Supermarkt Einkauf", "Bäcker"}
+    assert all("<mark>" in r["snippet"] for r in results)
+    assert results[0]["rank"] <= results[1]["rank"]
+    backer = client.get("/api/transactions/search", params={"q": "backer"}, headers=auth_headers).json()
+    assert [r["transaction"]["description"] for r in backer] == ["Bäcker"]
+
+
+def test_list_q_uses_index_kept_in_sync_by_triggers(auth_headers):
+    tid = create(auth_headers, "Tankstelle", cat="Mobilität")
+    assert len(client.get("/api/transactions", params={"q": "tank"}, headers=auth_headers).json()) == 1
+    client.patch(f"/api/transactions/{tid}", json={"date": "2024-01-10", "amount": -10.0, "description": "Werkstatt"}, headers=auth_headers)
+    assert client.get("/api/transactions", params={"q": "tank"}, headers=auth_headers).json() == []
+    assert len(client.get("/api/transactions", params={"q": "werk"}, headers=auth_headers).json()) == 1
+    client.delete(f"/api/transactions/{tid}", headers=auth_headers)
+    assert client.get("/api/transactions/search", params={"q": "werk"}, headers=auth_headers).json() == []
+
+
+def test_search_imported_rows(auth_headers):
+    csv = "date,amount,description,category\n2024-03-01,-1,Apotheke,Gesundheit\n"
+    client.post("/api/transactions/import", files={"file": ("a.csv", csv.encode(), "text/csv")}, headers=auth_headers)
+    assert len(client.get("/api/transactions/search", params={"q": "gesund"}, headers=auth_headers).json()) == 1
+
+
+def test_list_q_without_word_characters_falls_back_to_substring(auth_headers):
+    create(auth_headers, "Miete & Nebenkosten")
+    create(auth_headers, "Sport-Verein")
+    create(auth_headers, "Kino")
+    listed = lambda q: [t["description"] for t in client.get("/api/transactions", params={"q": q}, headers=auth_headers).json()]
+    assert listed("&") == ["Miete & Nebenkosten"]
+    assert listed("-") == ["Sport-Verein"]
+    assert listed("#") == []
+
+
+def test_match_subquery_is_scoped_to_the_user(auth_headers):
+    mine = create(auth_headers, "Supermarkt Nord")
+    other = other_user_headers()
+    create(other, "Supermarkt Süd")
+    assert [t["id"] for t in client.get("/api/transactions", params={"q": "super"}, headers=auth_headers).json()] == [mine]
+    # die Unterabfrage selbst filtert nach Nutzer, nicht erst die äußere Abfrage
+    with Session(engine) as session:
+        subquery = match_filter(1, "super").right.element
+        assert session.exec(subquery).all() == [mine]
@@ -0,0 +1,33 @@
+import pytest
+from fastapi.testclient import TestClient
+from ..main import app
+from .. import migrations, startup
+
+client = TestClient(app)
+
+
+def test_cold_start_within_budget_and_lazy(tmp_path):
+    env = {"DATABASE_URL": f"sqlite:///{tmp_path / 'cold.db'}", "IMPORT_SPOOL_DIR": str(tmp_path / "spool")}
+    first = startup.cold_start(env)
+    assert first["status"] == 200
+    assert first["migrations"][-1] == "0011_import_job_lease"
+
+    # Folgestarts migrieren nicht mehr; Budget gilt für Import, Start und erste Antwort
+    runs = [startup.cold_start(env) for _ in range(2)]
+    assert all(r["migrations"] == [] for r in runs)
+    assert set(runs[0]["phases"]) == {"import", "database", "import_jobs", "first_request"}
+    assert runs[0]["lazy_modules_loaded"] == []
+    best = min(r["ready"] for r in runs)
+    assert best < startup.STARTUP_BUDGET_SECONDS, runs
+
+
+def test_outdated_schema_is_not_migrated_when_disabled(monkeypatch):
+    monkeypatch.setattr(startup, "MIGRATE_ON_STARTUP", False)
+    monkeypatch.setattr(migrations, "schema_current", lambda: False)
+    with pytest.raises(RuntimeError):
+        startup.prepare_database()
+
+
+def test_startup_phases_in_metrics():
+    text = client.get("/api/metrics").text
+    assert 'app_startup_seconds{phase="import"}' in text
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+from ..main import app
+
+client = TestClient(app)
+
+
+def seed(headers):
+    rows = [
+        ("2023-12-31", -10.0, "Silvester", "Freizeit"),
+        ("2024-01-10", -20.0, "Kino", "Freizeit"),
+        ("2024-01-12", -5.0, "Konzert", "Freizeit"),
+        ("2024-01-15", -50.0, "Supermarkt", None),
+        ("2024-02-01", 2500.0, "Gehalt", "Einnahmen"),
+        ("2025-01-01", -1.0, "Neujahr", "Freizeit"),
+    ]
+    for d, amount, desc, cat in rows:
+        client.post("/api/transactions", json={"date": d, "amount": amount, "description": desc, "category": cat}, headers=headers)
+
+
+def test_monthly_category_grouped_in_sql_with_year_filter(auth_headers):
+    seed(auth_headers)
+    data = client.get("/api/stats/monthly-category", params={"year": 2024}, headers=auth_headers).json()
+    assert data["items"] == [
+        {"month": "2024-01", "category": "Freizeit", "sum": -25.0},
+        {"month": "2024-01", "category": "Unbekannt", "sum": -50.0},
+        {"month": "2024-02", "category": "Einnahmen", "sum": 2500.0},
+    ]
+    assert data["month_totals"] == [{"month": "2024-01", "sum": -75.0}, {"month": "2024-02", "sum": 2500.0}]
+    assert {c["category"]: c["sum"] for c in data["category_totals"]} == {"Freizeit": -25.0, "Unbekannt": -50.0, "Einnahmen": 2500.0}
+
+
+def test_monthly_category_all_years(auth_headers):
+    seed(auth_headers)
+    data = client.get("/api/stats/monthly-category", headers=auth_headers).json()
+    assert [i["month"] for i in data["items"]][0] == "2023-12"
+    assert len(data["month_totals"]) == 4
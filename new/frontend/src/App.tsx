@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react'
 import AuthForm from './AuthForm'
-import MonthlyCategoryChart from './MonthlyCategoryChart'
+import MonthlyCategoryChart, { MonthlyCategoryStats } from './MonthlyCategoryChart'
 import AdminPanel from './AdminPanel'
 
 type Transaction = {
@@ -234,7 +234,7 @@ type ChartCardProps = Readonly<{
   availableYears: string[]
   chartLoading: boolean
   chartError: string | null
-  chartData: any[]
+  chartData: MonthlyCategoryStats | null
 }>
 
 function ChartCard({ chartYear, setChartYear, availableYears, chartLoading, chartError, chartData }: ChartCardProps) {
@@ -327,7 +327,7 @@ export default function App() {
     setFormSuccess('Transaktion aktualisiert!');
   }
 
-  const [chartData, setChartData] = useState<any[]>([])
+  const [chartData, setChartData] = useState<MonthlyCategoryStats | null>(null)
   const [chartLoading, setChartLoading] = useState(false)
   const [chartError, setChartError] = useState<string | null>(null)
   const currentYear = new Date().getFullYear()
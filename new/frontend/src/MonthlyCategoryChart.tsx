@@ -2,21 +2,29 @@
 import React from 'react';
 import { ResponsiveContainer, BarChart, Bar, XAxis, YAxis, Tooltip, Legend } from 'recharts';
 
-type Props = Readonly<{ data: any[] }>
+export type MonthlyCategoryStats = {
+  items: { month: string, category: string, sum: number }[]
+  month_totals: { month: string, sum: number }[]
+  category_totals: { category: string, sum: number }[]
+}
+
+type Props = Readonly<{ data: MonthlyCategoryStats | null }>
 
 export default function MonthlyCategoryChart({ data }: Props) {
   const grouped = React.useMemo(() => {
     const map: Record<string, any> = {};
-    data.forEach(({ month, category, sum }) => {
-      if (!map[month]) map[month] = { month };
+    data?.month_totals.forEach(({ month }) => {
+      map[month] = { month };
+    });
+    data?.items.forEach(({ month, category, sum }) => {
       map[month][category] = sum;
     });
     return Object.values(map);
   }, [data]);
- 
-  const categories = Array.from(new Set(data.map(d => d.category)));
 
-  if (!data || data.length === 0) return <div>Keine Daten für Diagramm vorhanden.</div>;
+  const categories = data ? data.category_totals.map(c => c.category) : [];
+
+  if (!data || data.items.length === 0) return <div>Keine Daten für Diagramm vorhanden.</div>;
 
   return (
     <div style={{background:'#fff', borderRadius:12, boxShadow:'0 2px 16px 0 #dbeafe55', padding:24, marginTop:32}}>